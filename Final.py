@@ -1,6 +1,15 @@
 import streamlit as st
-import pandas as pd
-import time
+
+from carts import MAX_ORDER_QTY, shared_registry
+from images import menu_image
+from journal import shared_journal
+from kitchen import KitchenBusy, shared_kitchen
+from metrics import count, export_from_env, span
+from money import format_cents
+from price_lists import current_price_list
+from pricing import MENU, SLOTS, BandCart, compile_rules, slot_to_band
+from receipts import BREAKDOWN_COLUMNS, ITEM_COLUMNS, ReceiptRenderer
+from schedule import BandClock, Schedule
 
 ## CTD 1D ​SC02 Team 16​
 ## 1010143 Andy​
@@ -11,52 +20,89 @@ import time
 ## Configures the website to be the width of the browser -------------------------------- HAZIQ
 st.set_page_config(page_title="Cafe App", layout="wide")
 
-## Menu --------------------------------------------------------------------------------- HAZIQ
-coffee = {'Name' : 'Coffee', 'Price' : 3}
-frjuice = {'Name' : 'Fruit Juice', 'Price' : 2}
-cake = {'Name' : 'Cake', 'Price' : 6}
-menu = [coffee, frjuice, cake]
+## Timers for each part of the rerun (see metrics.py for where they are exposed) -------- ANDY
+export_from_env()
+rerun_timer = span("final.rerun").start()
+
+## Menu (kept in pricing.py so the pricing service sells the same items) --------------- HAZIQ
+menu = MENU
+
+## Compiling the menu and discount rules into lookup tables, once per process ------------ ANDY
+@st.cache_resource
+def load_tables():
+    return compile_rules(menu)
+
+tables = load_tables()
+
+## This outlet's price list when CAFE_PRICE_LISTS is set, picked up again on each rerun -- ANDY
+price_list = current_price_list()
+if price_list is not None:
+    tables = price_list.tables
+
+## Open orders of this terminal (tabs, tables, catering), shared by every session ------- WAI YAN
+## A new session, or one whose order was checked out, starts an order of its own -------- WAI YAN
+registry = shared_registry(load_tables().catalog)
+PROD_KEYS = {"prod1": "Coffee", "prod2": "Fruit Juice", "prod3": "Cake"}
+with st.sidebar:
+  st.subheader("Open orders")
+  ids = {order.name: order.order_id for order in registry.open_orders()}
+  if st.button("New order") or st.session_state.get("order") not in ids:
+    st.session_state.order = registry.get(registry.open()).name
+    ids = {order.name: order.order_id for order in registry.open_orders()}
+  order_id = ids[st.radio("Order", list(ids), key="order")]
+
+## Loading the order into the inputs when it was switched or changed elsewhere ----------- WAI YAN
+version = registry.get(order_id).version
+order_cart = registry.cart(order_id)
+if st.session_state.get("loaded") != (order_id, version):
+  for key, item in PROD_KEYS.items():
+    st.session_state[key] = order_cart[item]
 
 ## Checking user input and assigning zero as default value if there is no input --------- HAZIQ
 prod1 = int(st.session_state.get("prod1",0))
 prod2 = int(st.session_state.get("prod2",0))
 prod3 = int(st.session_state.get("prod3",0))
 
+## Saving the inputs back into the open order ------------------------------------------- WAI YAN
+quantities = {"Coffee": prod1, "Fruit Juice": prod2, "Cake": prod3}
+if any(order_cart[item] != qty for item, qty in quantities.items()):
+  version = registry.update(order_id, quantities)
+st.session_state.loaded = (order_id, version)
+
 ## Start of interface ------------------------------------------------------------------- HAZIQ
 st.title('Welcome to our Cafe interface!')
 st.write('Please select your order:')
 
 ## Seperating one line into 3 columns --------------------------------------------------- HAZIQ
+menu_timer = span("final.render.menu").start()
 col1, col2, col3 = st.columns(3)
 
 ## Assigning to different columns ------------------------------------------------------- HAZIQ
+## (tiles are local thumbnails, see images.py; a placeholder if a source is down) ------- HAZIQ
 with col1:
-  st.image('https://cdn.shopify.com/s/files/1/0669/0966/7619/files/espresso-shot-crema-in-white-cup-on-wood-table-wrexham-bean.webp?v=1745257519')
-  st.number_input("Coffee  >>>  $3.00 each", min_value=0, max_value=10, step=1, key="prod1")
+  st.image(menu_image('https://cdn.shopify.com/s/files/1/0669/0966/7619/files/espresso-shot-crema-in-white-cup-on-wood-table-wrexham-bean.webp?v=1745257519'))
+  st.number_input(f"Coffee  >>>  {format_cents(tables.unit_price('Coffee'))} each", min_value=0, max_value=MAX_ORDER_QTY, step=1, key="prod1")
 
 with col2:
-  st.image('https://emilylaurae.com/wp-content/uploads/2022/08/passion-fruit-juice-2.jpg')
-  st.number_input("Fruit Juice  >>>  $2.00 each", min_value=0, max_value=10, step=1, key="prod2")
+  st.image(menu_image('https://emilylaurae.com/wp-content/uploads/2022/08/passion-fruit-juice-2.jpg'))
+  st.number_input(f"Fruit Juice  >>>  {format_cents(tables.unit_price('Fruit Juice'))} each", min_value=0, max_value=MAX_ORDER_QTY, step=1, key="prod2")
 
 with col3:
-  st.image('https://static.vecteezy.com/system/resources/previews/001/738/638/large_2x/chocolate-cake-slice-free-photo.jpg')
-  st.number_input("Cake Slice  >>>  $6.00 each", min_value=0, max_value=10, step=1, key="prod3")
-
-## Time slots ----------------------------------------------------------------------------- ANDY
-SLOTS = ["09:00–11:59", "12:00–14:59", "15:00–17:59", "18:00–20:59"]
-
-## Checking user input and returning time of day ------------------------------------------ ANDY
-def slot_to_band(s: str) -> str:
-    if s == "09:00–11:59":
-        return "morning"
-    elif s in ("12:00–14:59", "15:00–17:59"):
-        return "afternoon"
-    else:
-        return "evening"
-
-## Buttons for user to select time of day ------------------------------------------------ ANDY
+  st.image(menu_image('https://static.vecteezy.com/system/resources/previews/001/738/638/large_2x/chocolate-cake-slice-free-photo.jpg'))
+  st.number_input(f"Cake Slice  >>>  {format_cents(tables.unit_price('Cake'))} each", min_value=0, max_value=MAX_ORDER_QTY, step=1, key="prod3")
+menu_timer.stop()
+
+## Slot schedule, resolved again only when the current slot ends ------------------------ ANDY
+@st.cache_resource
+def load_clock():
+    return BandClock(Schedule.from_slots(SLOTS, slot_to_band))
+
+now = load_clock().current()
+current_slot = SLOTS.index(now.entries[0].name) if now.entries else 0
+
+## Buttons for user to select time of day, starting on the slot we are in ---------------- ANDY
 st.subheader("Choose time of day")
-slot = st.radio("Time slot", SLOTS, index=0, horizontal=True)
+slot = st.radio("Time slot", SLOTS, index=current_slot, horizontal=True)
 band = slot_to_band(slot)
 st.caption(
     f"""• Active band: :rainbow[**{band}**] \n
@@ -66,137 +112,103 @@ st.caption(
 • Bulk: more than 3 of the same item = extra 10% off (before time discount)"""
 )
 
-## Function for checking morning combo --------------------------------------------------- ANDY
-def has_combo(order_now):
-    if order_now["Coffee"] >= 1 and order_now["Cake"] >= 1:
-        return True
-    else:
-        return False
-
 ## Assinging user's input into a dictionary ---------------------------------------------- WAI YAN
 order_now = {"Coffee": prod1, "Fruit Juice":prod2, "Cake":prod3}
 
-## Assigning true or false if morning combo is in effect --------------------------------- WAI YAN
-morning = has_combo(order_now)
-
-## Assigning prices to each item in the menu --------------------------------------------- KHANSKY
-def find_price(item_name):
-    for category in menu:
-        if(item_name == category['Name']):
-            return category['Price']
-
 ## Start of cart ------------------------------------------------------------------------- WAI YAN
 st.subheader("Cart (with discounts)")
 
-## Assigning values for cart ------------------------------------------------------------- WAI YAN
-rows = []
-total_raw = 0.0
-total_bulk_disc = 0.0
-total_time_disc = 0.0
-grand_total = 0.0
-
-## Looping to calculate the total price, including time and bulk discounts --------------- WAI YAN
+## Running cart kept in the session: only the items that changed get repriced ---------- WAI YAN
+## (started afresh when a new price list comes in)
+pricing_timer = span("final.pricing").start()
+if "cart" not in st.session_state or st.session_state.cart.tables is not tables:
+    st.session_state.cart = BandCart(tables, band)
+cart = st.session_state.cart
+cart.set_band(band)
 for item, qty in order_now.items():
-    if qty <=0:
-        continue
-    unit = find_price(item)
-    raw = round(unit*qty,2)
-
-    before_time_disc = raw
-    if (qty >=3):
-        before_time_disc = round(raw*0.9,2)
-        
-    time_disc_fac = 0.0
-    if (band == "evening"):
-        time_disc_fac = 0.3
-    elif (band == "afternoon" and item == "Fruit Juice"):
-        time_disc_fac = 0.2
-    elif (band == "morning" and morning and item in {"Coffee", "Cake"}):
-        time_disc_fac = 0.2
-
-    time_disc = round(before_time_disc * time_disc_fac, 2)
-    after_time_disc = round(before_time_disc - time_disc, 2)
-
-    bulk_disc = round(raw - before_time_disc, 2)
-
-    ## To show a total breakdown of the discounts in a table later on ------------------- WAI YAN
-    rows.append({
-        "Item": item,
-        "Qty": qty,
-        "Unit ($)": unit,
-        "Raw ($)": raw,
-        "Bulk - ($)": bulk_disc,
-        "Before time discount($)": before_time_disc,
-        "Time disc - ($)": time_disc,
-        "After time discount ($)": after_time_disc
-    })
-    
-    total_raw += raw
-    total_bulk_disc += bulk_disc
-    total_time_disc += time_disc
-    grand_total += after_time_disc
+    cart.set_qty(item, qty)
+
+## Priced order and totals (amounts in cents) -------------------------------------------- WAI YAN
+priced = cart.priced()
+priced["price_list"] = price_list.version if price_list is not None else 0
+rows = priced["lines"]
+total_raw = priced["total_raw"]
+total_bulk_disc = priced["total_bulk_disc"]
+total_time_disc = priced["total_time_disc"]
+grand_total = priced["grand_total"]
+pricing_timer.stop()
+
+## Tables are formatted straight from the priced lines, no DataFrame per rerun ---------- WAI YAN
+@st.cache_resource
+def load_renderers():
+    return ReceiptRenderer(BREAKDOWN_COLUMNS), ReceiptRenderer(ITEM_COLUMNS)
+
+breakdown, item_list = load_renderers()
 
 ## If a product is selected, display the breakdown in table format ---------------------- WAI YAN
+cart_timer = span("final.render.cart").start()
 if rows:
-    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+    st.markdown(breakdown.html(rows), unsafe_allow_html=True)
     st.markdown(
         f"""
-**Raw total:** ${total_raw:.2f}\n 
-**Bulk discounts:** −${total_bulk_disc:.2f}\n
-**Time-band discounts:** −${total_time_disc:.2f}  
-### **Cart total now: ${grand_total:.2f}**
+**Raw total:** {format_cents(total_raw)}\n 
+**Bulk discounts:** −{format_cents(total_bulk_disc)}\n
+**Time-band discounts:** −{format_cents(total_time_disc)}  
+### **Cart total now: {format_cents(grand_total)}**
 """
     )
 
 ## Returns a string if no product is selected ------------------------------------------- WAI YAN
 else:
     st.info("Your cart is empty. Add some items from the menu above!")
+cart_timer.stop()
 
 st.divider()
 
-## Finalising products for checkout ----------------------------------------------------- KHANSKY
-def receipt(full_list):
-    ## Creates a new list that will be used for checkout -------------------------------- KHANSKY
-    idlist = []
-    quantitylist = []
-    pricelist = []
-    subtotal = []
-
-    ## Seperates the full_list into 4 seperate columns: Name, Qty, Price, Subtotal ------ KHANSKY
-    for individual_items, individual_qty in full_list:
-        price = find_price(individual_items)
-        idlist.append(individual_items)
-        quantitylist.append(individual_qty)
-        pricelist.append(price)
-        subtotal.append(individual_qty*price)
-
-    ## panda that into something pandable ----------------------------------------------- KHANSKY
-    fullframe = pd.DataFrame({'Item':idlist, 'Quantity':quantitylist, 'Price per Item($)':pricelist, 'Subtotal($)':subtotal})
+## Staged reveal for the checkout breakdown --------------------------------------------- KHANSKY
+## The browser fades each line in after its delay, so the script thread is not held ---- KHANSKY
+REVEAL_STEP_SECONDS = 1
+REVEAL_CSS = """<style>
+@keyframes cafe-reveal { from { opacity: 0; } to { opacity: 1; } }
+.cafe-reveal { opacity: 0; animation: cafe-reveal 0.3s ease-out forwards; }
+</style>"""
 
-    ## Returns the entire receipt ------------------------------------------------------- KHANSKY
-    return fullframe
+def reveal(html, step):
+    st.markdown(
+        f'<div class="cafe-reveal" style="animation-delay: {step * REVEAL_STEP_SECONDS}s">{html}</div>',
+        unsafe_allow_html=True,
+    )
 
 ## Upon pressing the checkout button, displays the entire receipt ----------------------- KHANSKY
 if st.button("CHECKOUT"):
-  full_list = [(coffee['Name'], prod1), (frjuice['Name'], prod2), (cake['Name'], prod3)]
+  checkout_timer = span("final.render.checkout").start()
+  ## Name, Qty, Price, Subtotal of each line, from the same priced lines -------------- KHANSKY
   st.subheader("Final receipt (items & subtotals)")
-  st.write(receipt(full_list))
+  st.markdown(item_list.html(rows), unsafe_allow_html=True)
 
-  time.sleep(1)
-
-  ## Displays modifiers in effect seperately -------------------------------------------- KHANSKY
+  ## Displays modifiers in effect seperately, one step at a time ------------------------ KHANSKY
   st.subheader("Discount breakdown at checkout")
   if rows:
-    st.dataframe(pd.DataFrame(rows), use_container_width=True)
-    time.sleep(1)  
-    st.markdown(f"**Raw total:** ${total_raw:.2f}\n ")
-    time.sleep(1)
-    st.markdown(f"**Bulk discounts:** −${total_bulk_disc:.2f}\n ")
-    time.sleep(1)
-    st.markdown(f"**Time-band discounts:** −${total_time_disc:.2f}\n ")
-    time.sleep(1)
-    st.markdown(f"### **Total due: ${grand_total:.2f}** ")  
+    journal_id = shared_journal().append_priced(priced, band)
+    registry.close(order_id)
+    count("final.checkouts")
+    ## Sends the paid order to the kitchen as station tickets ------------------------- KHANSKY
+    try:
+      ahead = shared_kitchen().send(journal_id, [(row[0], row[1]) for row in rows])
+      st.caption(f"Order #{journal_id} sent to the kitchen ({ahead} orders ahead).")
+    except KitchenBusy:
+      count("final.kitchen_busy")
+      st.warning(f"The kitchen queue is full: order #{journal_id} was not sent, please call it out.")
+    st.markdown(breakdown.html(rows), unsafe_allow_html=True)
+    st.markdown(REVEAL_CSS, unsafe_allow_html=True)
+    reveal(f"<b>Raw total:</b> {format_cents(total_raw)}", 1)
+    reveal(f"<b>Bulk discounts:</b> −{format_cents(total_bulk_disc)}", 2)
+    reveal(f"<b>Time-band discounts:</b> −{format_cents(total_time_disc)}", 3)
+    reveal(f"<h3>Total due: {format_cents(grand_total)}</h3>", 4)
 
   ## Returns a string when no items were selected after checkout ------------------------ KHANSKY
   else:
       st.info("No items were selected at checkout.")
+  checkout_timer.stop()
+
+rerun_timer.stop()
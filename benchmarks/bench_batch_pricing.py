@@ -0,0 +1,48 @@
+"""
+Benchmark: scalar ``calculate_totals`` vs ``calculate_totals_batch``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch_pricing [n_carts]
+
+Generates random carts, prices them both ways, checks that every total
+matches to the cent and prints the timings and speed-up.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import cafe_app
+
+
+def main(n_carts: int = 1_000_000) -> None:
+    rng = np.random.default_rng(16)
+    quantities = rng.integers(0, 5, size=(n_carts, len(cafe_app.MENU)))
+    pool = ["", "WELCOME10", "friend5", " welcome10 ", "BOGUS"]
+    codes = [pool[i] for i in rng.integers(0, len(pool), size=n_carts)]
+    names = [item["name"] for item in cafe_app.MENU]
+
+    carts = [dict(zip(names, row)) for row in quantities.tolist()]
+    start = time.perf_counter()
+    scalar = [cafe_app.calculate_totals(cart, code) for cart, code in zip(carts, codes)]
+    scalar_s = time.perf_counter() - start
+
+    voucher_ids, distinct = cafe_app.encode_voucher_column(codes)
+    start = time.perf_counter()
+    batch = cafe_app.calculate_totals_batch(quantities, voucher_ids, distinct)
+    batch_s = time.perf_counter() - start
+
+    for key in ("bulk_total", "after_voucher", "promo_discount", "final_total"):
+        expected = np.array([result[key] for result in scalar])
+        assert np.array_equal(expected, batch[key]), f"{key} differs"
+
+    print(f"carts:   {n_carts:,}")
+    print(f"scalar:  {scalar_s:8.3f} s")
+    print(f"batch:   {batch_s:8.3f} s")
+    print(f"speed-up: {scalar_s / batch_s:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
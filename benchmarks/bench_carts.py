@@ -0,0 +1,167 @@
+"""
+Benchmark: 100 cashiers sharing open orders, ``CartRegistry`` vs one lock.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_carts
+
+A thread pool of 100 cashiers works on open orders: mostly reading a cart
+(to redraw it), sometimes changing a quantity, now and then closing an
+order and opening a new one.  The baseline keeps ``{order id: {item:
+qty}}`` behind one lock, copying a cart to read it; ``carts.CartRegistry``
+reads without a lock and locks only the stripe of the order being changed.  Both run with
+1,000 open orders spread out and with 10 hot orders everyone works on, and
+the benchmark prints throughput and the p50 / p99 / max latency of reads and
+writes.  Finally it compares the memory of 10,000 open orders on the
+3-item menu of ``Final.py`` and on a 200-item menu, with a few items and
+with a catering-sized order.
+"""
+
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pricing_rules import make_menu
+from carts import CartRegistry
+from catalog import Catalog
+from pricing import MENU
+
+CASHIERS = 100
+OPS_PER_CASHIER = 2000
+READ_SHARE = 0.8
+CLOSE_SHARE = 0.01
+
+
+class LockedRegistry:
+    # The obvious version: one lock around a dict of dict carts
+    def __init__(self, catalog):
+        self.names = catalog.names
+        self.orders = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def open(self):
+        with self.lock:
+            order_id = self.next_id
+            self.next_id += 1
+            self.orders[order_id] = {}
+            return order_id
+
+    def read(self, order_id):
+        with self.lock:
+            return dict(self.orders[order_id])
+
+    def add(self, order_id, name, delta):
+        with self.lock:
+            cart = self.orders[order_id]
+            cart[name] = max(0, cart.get(name, 0) + delta)
+
+    def close(self, order_id):
+        with self.lock:
+            return self.orders.pop(order_id)
+
+
+class SharedRegistry:
+    # The same operations on CartRegistry
+    def __init__(self, catalog):
+        self.registry = CartRegistry(catalog)
+
+    def open(self):
+        return self.registry.open()
+
+    def read(self, order_id):
+        return self.registry.cart(order_id)
+
+    def add(self, order_id, name, delta):
+        self.registry.add(order_id, name, delta)
+
+    def close(self, order_id):
+        return self.registry.close(order_id)
+
+
+def percentile(values, q) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(registry, catalog, n_orders) -> dict:
+    slots = [registry.open() for _ in range(n_orders)]
+    slot_locks = [threading.Lock() for _ in slots]  # who may close and replace a slot
+    reads, writes = [], []
+    names = catalog.names
+
+    def cashier(seed):
+        rng = random.Random(seed)
+        my_reads, my_writes = [], []
+        for _ in range(OPS_PER_CASHIER):
+            slot = rng.randrange(n_orders)
+            roll = rng.random()
+            if roll < CLOSE_SHARE and slot_locks[slot].acquire(blocking=False):
+                try:
+                    registry.close(slots[slot])
+                    slots[slot] = registry.open()
+                finally:
+                    slot_locks[slot].release()
+                continue
+            t0 = time.perf_counter()
+            try:
+                if roll < READ_SHARE:
+                    registry.read(slots[slot])
+                    my_reads.append(time.perf_counter() - t0)
+                else:
+                    registry.add(slots[slot], rng.choice(names), rng.choice((1, 1, 2, -1)))
+                    my_writes.append(time.perf_counter() - t0)
+            except (KeyError, ValueError):
+                pass  # closed by another cashier a moment ago
+        reads.extend(my_reads)
+        writes.extend(my_writes)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CASHIERS) as pool:
+        list(pool.map(cashier, range(CASHIERS)))
+    elapsed = time.perf_counter() - start
+    reads.sort()
+    writes.sort()
+    return {"ops": (len(reads) + len(writes)) / elapsed, "reads": reads, "writes": writes}
+
+
+def memory_per_order(registry, names, n_orders=10_000) -> float:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for _ in range(n_orders):
+        order_id = registry.open()
+        for name in names:
+            registry.add(order_id, name, 2)
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return used / n_orders
+
+
+def main() -> None:
+    catalog = Catalog.from_menu(MENU)
+    print(f"{CASHIERS} cashiers x {OPS_PER_CASHIER} ops, {READ_SHARE:.0%} reads")
+    print(f"{'registry':<16} {'orders':>6} {'ops/s':>9} {'read p50':>9} {'p99':>7} {'max':>7}"
+          f" {'write p50':>10} {'p99':>7} {'max':>7}   (us)")
+    for n_orders in (1000, 10):
+        for label, kind in (("one lock", LockedRegistry), ("CartRegistry", SharedRegistry)):
+            result = run(kind(catalog), catalog, n_orders)
+            r, w = result["reads"], result["writes"]
+            print(f"{label:<16} {n_orders:>6} {result['ops']:>9,.0f}"
+                  f" {percentile(r, 0.5) * 1e6:>9.1f} {percentile(r, 0.99) * 1e6:>7.0f}"
+                  f" {r[-1] * 1e6:>7.0f} {percentile(w, 0.5) * 1e6:>10.1f}"
+                  f" {percentile(w, 0.99) * 1e6:>7.0f} {w[-1] * 1e6:>7.0f}")
+
+    for label, menu, n_items in (("3-item menu, 3 items", MENU, 3),
+                                 ("200-item menu, 3 items", make_menu(200), 3),
+                                 ("200-item menu, 40 items", make_menu(200), 40)):
+        catalog = Catalog.from_menu(menu)
+        names = catalog.names[:n_items]
+        dicts = memory_per_order(LockedRegistry(catalog), names)
+        vectors = memory_per_order(CartRegistry(catalog), names)
+        print(f"{label:<24} {dicts:6.0f} B per open order as dicts,"
+              f" {vectors:6.0f} B in CartRegistry")
+
+
+if __name__ == "__main__":
+    main()
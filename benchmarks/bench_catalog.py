@@ -0,0 +1,123 @@
+"""
+Benchmark: compact catalog carts vs name-keyed dicts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_catalog [n_carts]
+
+Builds ``n_carts`` random carts (default 1M) of the ``pricing.py`` menu three
+ways (dicts of name to quantity, ``catalog.Cart`` objects and one
+``catalog.CartArray``) and prints the memory each takes per 1M carts, as
+traced by ``tracemalloc``.  Then it compares the memory taken by receipt rows
+as dicts (``pricing.price_cart``) and as ``LineItem`` records.  Finally it
+times pricing the carts both ways without the result cache:
+``PricingTables._price_order`` plus dict rows vs ``price_cart_vector``.
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+
+from catalog import CartArray
+from pricing import BANDS, LINE_FIELDS, default_tables
+
+N_TIMED = 200_000
+
+
+def traced_mib(build):
+    """Return ``(result, MiB allocated by build())``."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, (after - before) / 2**20
+
+
+def best_of(run, repeat=3):
+    """Return ``(best seconds, last result)`` of ``repeat`` calls of ``run()``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(n_carts: int = 1_000_000) -> None:
+    rng = random.Random(16)
+    tables = default_tables()
+    catalog = tables.catalog
+    names = catalog.names
+    rows = [[rng.randint(0, 5) for _ in names] for _ in range(n_carts)]
+    bands = [rng.choice(BANDS) for _ in range(n_carts)]
+    per_million = 1_000_000 / n_carts
+
+    print(f"{n_carts:,} carts of a {len(catalog)}-item menu")
+    dict_carts, dict_mib = traced_mib(
+        lambda: [{name: q for name, q in zip(names, row) if q} for row in rows])
+    print(f"  dict carts       {dict_mib * per_million:8.1f} MiB per 1M carts")
+
+    def build_carts():
+        carts = []
+        for row in rows:
+            cart = catalog.cart()
+            cart.qty = array("H", row)
+            carts.append(cart)
+        return carts
+
+    carts, cart_mib = traced_mib(build_carts)
+    print(f"  Cart objects     {cart_mib * per_million:8.1f} MiB per 1M carts")
+
+    def build_array():
+        packed = CartArray(catalog)
+        for cart in carts:
+            packed.append(cart)
+        return packed
+
+    packed, array_mib = traced_mib(build_array)
+    print(f"  one CartArray    {array_mib * per_million:8.1f} MiB per 1M carts")
+    assert packed[n_carts // 2].as_dict() == dict_carts[n_carts // 2]
+
+    sample = range(min(n_carts, N_TIMED))
+    dict_rows, dict_rows_mib = traced_mib(lambda: [
+        [dict(zip(LINE_FIELDS, line))
+         for line in tables._price_order(tuple(dict_carts[i].items()), bands[i])["lines"]]
+        for i in sample])
+    line_rows, line_rows_mib = traced_mib(lambda: [
+        tables.price_cart_vector(carts[i], bands[i])["lines"] for i in sample])
+    n_lines = sum(len(lines) for lines in line_rows)
+    print(f"receipt rows ({n_lines:,} lines, incl. each cart's list or tuple)")
+    print(f"  dict rows        {dict_rows_mib * 1_000_000 / n_lines:8.1f} MiB per 1M lines")
+    print(f"  LineItem rows    {line_rows_mib * 1_000_000 / n_lines:8.1f} MiB per 1M lines")
+    del dict_rows, line_rows
+
+    def run_dicts():
+        for i in sample:
+            priced = tables._price_order(tuple(dict_carts[i].items()), bands[i])
+            [dict(zip(LINE_FIELDS, line)) for line in priced["lines"]]
+        return priced
+
+    def run_vectors():
+        for i in sample:
+            vector = tables.price_cart_vector(carts[i], bands[i])
+        return vector
+
+    # Best of three with the collector off, like timeit: with millions of
+    # live objects, GC passes would otherwise dominate both loops
+    gc.disable()
+    dict_s, priced = best_of(run_dicts)
+    vector_s, vector = best_of(run_vectors)
+    gc.enable()
+    assert vector["grand_total"] == priced["grand_total"]
+    print(f"pricing {len(sample):,} carts, no cache")
+    print(f"  dict cart + dict rows   {dict_s / len(sample) * 1e6:6.2f} us per cart")
+    print(f"  Cart + LineItem rows    {vector_s / len(sample) * 1e6:6.2f} us per cart"
+          f"  ({dict_s / vector_s:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,105 @@
+"""
+Load test: concurrent CHECKOUTs against Final.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_checkout_load [script.py ...]
+
+Each simulated till is an ``AppTest`` session in a process of its own
+(``AppTest`` is not safe to drive from several threads of one process), in
+its own working directory so the tills do not share a journal file.  For 1,
+4 and 16 concurrent tills it keeps ringing up an order (3 coffees and a
+cake) and pressing CHECKOUT for a fixed time, and reports completed
+checkouts per second and the median latency of the CHECKOUT rerun.  The
+tills start timing together, once every one has loaded the app.  A
+checkout closes the till's open order (see carts.py), so every iteration
+enters the items again on the fresh order.  If any till fails, the run
+fails with its traceback.
+
+Set ``CAFE_OFFLINE=1`` to keep image downloads out of the warm-up.  To
+compare with the old blocking handler, pass a copy of it as well, e.g.
+
+    git show <old-rev>:Final.py > /tmp/Final_blocking.py
+    python -m benchmarks.bench_checkout_load Final.py /tmp/Final_blocking.py
+"""
+
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DURATION_SECONDS = 12
+CONCURRENCY = (1, 4, 16)
+START_TIMEOUT = 120  # seconds for every till to load the app
+
+
+def till(script, barrier, results):
+    try:
+        from streamlit.testing.v1 import AppTest
+
+        os.chdir(tempfile.mkdtemp(prefix="till-"))
+        at = AppTest.from_file(script, default_timeout=60)
+        at.run()
+        barrier.wait(START_TIMEOUT)
+        latencies = []
+        start = time.perf_counter()
+        while time.perf_counter() < start + DURATION_SECONDS:
+            # The rerun after a checkout opened a fresh, empty order
+            at.number_input[0].set_value(3)
+            at.number_input[2].set_value(1)
+            at.run()
+            next(button for button in at.button if button.label == "CHECKOUT").click()
+            begin = time.perf_counter()
+            at.run()
+            latencies.append(time.perf_counter() - begin)
+            if at.exception or not any("Total due" in block.value for block in at.markdown):
+                raise RuntimeError(f"CHECKOUT did not price the order: {list(at.exception)}")
+            at.run()
+        results.put(("ok", latencies, time.perf_counter() - start))
+    except BaseException:
+        barrier.abort()
+        results.put(("error", traceback.format_exc(), None))
+
+
+def run(script, concurrency):
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(concurrency), context.Queue()
+    workers = [context.Process(target=till, args=(script, barrier, results))
+               for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    outcomes = []
+    try:
+        for _ in workers:
+            outcomes.append(results.get(timeout=START_TIMEOUT + DURATION_SECONDS * 10))
+    except queue.Empty:
+        raise RuntimeError(f"{concurrency - len(outcomes)} tills did not report back") from None
+    finally:
+        for worker in workers:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
+    errors = [detail for status, detail, _ in outcomes if status != "ok"]
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {concurrency} tills failed:\n" + "\n".join(errors))
+    latencies = [latency for _, till_latencies, _ in outcomes for latency in till_latencies]
+    throughput = sum(len(till_latencies) / elapsed for _, till_latencies, elapsed in outcomes)
+    return throughput, statistics.median(latencies)
+
+
+def main(scripts) -> None:
+    print(f"{'script':32} {'tills':>5} {'checkouts/s':>12} {'p50 latency (s)':>16}")
+    for script in scripts:
+        path = os.path.abspath(script)
+        for concurrency in CONCURRENCY:
+            throughput, p50 = run(path, concurrency)
+            print(f"{script:32} {concurrency:>5} {throughput:>12.1f} {p50:>16.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, "Final.py")])
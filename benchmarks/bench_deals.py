@@ -0,0 +1,109 @@
+"""
+Benchmark: the deal-stacking solver on catering carts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_deals
+
+Checks ``solve_deals`` against exhaustive search on small random carts, then
+times it on 200-line catering carts with 60 and with 170 overlapping combo,
+bundle and multi-buy deals, and compares its saving with a plain greedy pick
+(best saving per unit first).
+"""
+
+import itertools
+import random
+import statistics
+import time
+
+from promotions import Deal, solve_deals
+
+N_ITEMS = 200
+N_CARTS = 20
+
+
+def make_deals(rng, items, n_pairs, n_bundles, n_multibuys) -> list:
+    deals = []
+    for i in range(n_pairs):
+        a, b = rng.sample(items, 2)
+        deals.append(Deal(f"combo {i}", {a: 1, b: 1}, amount=rng.randint(50, 200)))
+    for i in range(n_bundles):
+        a, b, c = rng.sample(items, 3)
+        deals.append(Deal(f"bundle {i}", {a: 1, b: 1, c: rng.randint(1, 2)},
+                          rate=rng.choice((0.10, 0.15, 0.20))))
+    for i in range(n_multibuys):
+        deals.append(Deal(f"3 for 2 #{i}", {rng.choice(items): 3}, rate=1 / 3,
+                          max_uses=rng.choice((None, 2))))
+    return deals
+
+
+def exhaustive(cart, deals, prices) -> int:
+    best = 0
+    ranges = [range(0, min(cart.get(i, 0) // k for i, k in d.items.items()) + 1) for d in deals]
+    for counts in itertools.product(*ranges):
+        if any(d.max_uses is not None and c > d.max_uses for d, c in zip(deals, counts)):
+            continue
+        used = {}
+        for deal, count in zip(deals, counts):
+            for item, k in deal.items.items():
+                used[item] = used.get(item, 0) + count * k
+        if all(used[item] <= cart.get(item, 0) for item in used):
+            best = max(best, sum(c * d.saving(prices) for d, c in zip(deals, counts)))
+    return best
+
+
+def greedy(cart, deals, prices) -> int:
+    left = dict(cart)
+    saving = 0
+    ranked = sorted(deals, key=lambda d: -d.saving(prices) / sum(d.items.values()))
+    for deal in ranked:
+        count = min(left.get(i, 0) // k for i, k in deal.items.items())
+        if deal.max_uses is not None:
+            count = min(count, deal.max_uses)
+        if count > 0 and deal.saving(prices) > 0:
+            for item, k in deal.items.items():
+                left[item] -= count * k
+            saving += count * deal.saving(prices)
+    return saving
+
+
+def main() -> None:
+    rng = random.Random(16)
+
+    small_items = [f"Item {i}" for i in range(5)]
+    small_prices = {item: rng.randint(100, 900) for item in small_items}
+    for _ in range(300):
+        deals = make_deals(rng, small_items, 3, 1, 1)
+        cart = {item: rng.randint(0, 5) for item in small_items}
+        solved = solve_deals(cart, deals, small_prices)
+        assert solved["optimal"]
+        assert solved["saving"] == exhaustive(cart, deals, small_prices)
+    print("300 small carts: same saving as exhaustive search")
+
+    items = [f"Item {i}" for i in range(N_ITEMS)]
+    prices = {item: rng.randint(100, 900) for item in items}
+    print(f"carts of {N_ITEMS} lines, 1-30 of each item")
+    print(f"{'deals':>6} {'median ms':>10} {'max ms':>7} {'proved optimal':>15}"
+          f" {'saving vs greedy':>17}")
+    for n_pairs, n_bundles, n_multibuys in ((30, 10, 20), (100, 40, 30)):
+        deals = make_deals(rng, items, n_pairs, n_bundles, n_multibuys)
+        times = []
+        proved = solved_total = greedy_total = 0
+        for _ in range(N_CARTS):
+            cart = {item: rng.randint(1, 30) for item in items}
+            start = time.perf_counter()
+            solved = solve_deals(cart, deals, prices)
+            times.append(time.perf_counter() - start)
+            proved += solved["optimal"]
+            solved_total += solved["saving"]
+            greedy_total += greedy(cart, deals, prices)
+            used = solved["units"]
+            assert all(used[item] <= cart[item] for item in used)
+        print(f"{len(deals):>6} {statistics.median(times) * 1e3:>10.1f}"
+              f" {max(times) * 1e3:>7.1f} {proved:>8} of {N_CARTS:<3}"
+              f" {(solved_total / greedy_total - 1) * 100:>+16.2f}%")
+    print(f"deal uses on the last receipt: {len(solved['uses'])}, e.g. {solved['uses'][:2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark: menu tiles from remote originals vs local thumbnails.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_images
+
+No network needed.  Three synthetic photos the size of the menu originals
+(3000x2000 JPEG, 1600x1200 PNG) are served from a local HTTP server that
+adds ``LATENCY`` per request and sends at ``BANDWIDTH``, standing in for the
+third-party hosts.  Prints:
+
+* page weight: the originals against their thumbnails;
+* time for the three tiles to arrive, fetched in parallel as a browser
+  would, from the slow host against thumbnails at the same bandwidth but
+  without the third-party round trip;
+* what ``AssetStore.get`` costs cold (download and resize, once), from disk
+  (a fresh process) and from memory (every later rerun);
+* the time of the menu block of ``Final.py`` under ``AppTest`` with URLs and
+  with thumbnails (the ``final.render.menu`` timer, see metrics.py).
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+import timeit
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+import images
+from images import AssetStore
+from metrics import REGISTRY
+
+LATENCY = 0.15  # seconds per request
+BANDWIDTH = 10e6 / 8  # bytes per second (10 Mbit/s)
+RERUNS = 20
+
+
+def photo(size, fmt) -> bytes:
+    # Noise over a gradient compresses about as badly as a real photo
+    noise = Image.effect_noise(size, 40)
+    gradient = Image.linear_gradient("L").resize(size)
+    image = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    out = io.BytesIO()
+    image.save(out, fmt, **({"quality": 92} if fmt == "JPEG" else {}))
+    return out.getvalue()
+
+
+def slow_server(files):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            data = files.get(self.path)
+            time.sleep(LATENCY)
+            if data is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            chunk = 64 << 10
+            for start in range(0, len(data), chunk):
+                self.wfile.write(data[start:start + chunk])
+                time.sleep(min(chunk, len(data) - start) / BANDWIDTH)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parallel_fetch(urls) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(urls)) as pool:
+        list(pool.map(lambda url: urllib.request.urlopen(url).read(), urls))
+    return time.perf_counter() - start
+
+
+def menu_block_ms(script) -> float:
+    from streamlit.testing.v1 import AppTest
+
+    REGISTRY.reset()
+    app = AppTest.from_string(script, default_timeout=60)
+    app.run()
+    for i in range(RERUNS):
+        app.number_input[0].set_value(i % 5).run()
+    timer = REGISTRY.snapshot()["timers"]["final.render.menu"]
+    return timer["mean"] * 1e3
+
+
+def main() -> None:
+    files = {
+        "/coffee.jpg": photo((3000, 2000), "JPEG"),
+        "/juice.jpg": photo((3000, 2000), "JPEG"),
+        "/cake.png": photo((1600, 1200), "PNG"),
+    }
+    server = slow_server(files)
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [base + path for path in files]
+    original_bytes = sum(len(data) for data in files.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = AssetStore(directory, offline=False)
+        start = time.perf_counter()
+        thumbs = [store.get(url) for url in urls]
+        cold_s = time.perf_counter() - start
+        thumb_bytes = sum(len(data) for data in thumbs)
+
+        fresh = AssetStore(directory, offline=True)
+        start = time.perf_counter()
+        assert [fresh.get(url) for url in urls] == thumbs
+        disk_ms = (time.perf_counter() - start) * 1e3
+        memory_us = min(timeit.repeat(lambda: [fresh.get(url) for url in urls],
+                                      number=1000, repeat=5)) / 1000 * 1e6
+        offline = AssetStore(os.path.join(directory, "empty"), offline=True)
+        assert offline.get(urls[0]) == offline.placeholder()
+
+        remote_s = min(parallel_fetch(urls) for _ in range(3))
+        local_s = max(len(data) for data in thumbs) / BANDWIDTH
+
+        print(f"page weight: originals {original_bytes / 1e6:.2f} MB,"
+              f" thumbnails {thumb_bytes / 1e3:.0f} kB"
+              f" ({original_bytes / thumb_bytes:.0f}x smaller)")
+        print(f"tiles arrive: remote {remote_s * 1e3:.0f} ms, thumbnails {local_s * 1e3:.0f} ms"
+              f" ({LATENCY * 1e3:.0f} ms latency, {BANDWIDTH * 8 / 1e6:.0f} Mbit/s)")
+        print(f"AssetStore.get x3: cold {cold_s * 1e3:.0f} ms (once), disk {disk_ms:.2f} ms,"
+              f" memory {memory_us:.1f} us")
+
+        # Final.py with the stored thumbnails against the bare URLs
+        images.shared_assets.cache_clear()
+        cwd = os.getcwd()
+        with open(os.path.join(cwd, "Final.py"), encoding="utf-8") as f:
+            script = f.read()
+        os.chdir(directory)
+        try:
+            # The real URLs, stored as if fetched earlier
+            store = images.shared_assets()
+            for url, data in zip(images.MENU_IMAGE_URLS, files.values()):
+                store.add(url, data)
+            with_urls = menu_block_ms(script.replace("st.image(menu_image(", "st.image(("))
+            with_thumbs = menu_block_ms(script)
+        finally:
+            os.chdir(cwd)
+        print(f"Final.py menu block per rerun: URLs {with_urls:.2f} ms,"
+              f" thumbnails {with_thumbs:.2f} ms (server side)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Import-time check for the pricing modules.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time
+
+Imports each module in a fresh interpreter with ``python -X importtime``,
+takes the best cumulative time of a few runs and compares it with the
+budget below.  It also fails if a module drags in Streamlit, pandas or
+NumPy at import time; those belong on the render / batch paths only.
+Exits with status 1 on any regression, so it can run in CI.
+"""
+
+import subprocess
+import sys
+
+RUNS = 5
+
+# Module -> budget in milliseconds (cumulative import time, best of RUNS).
+BUDGETS_MS = {
+    "money": 10,
+    "pricing": 15,
+    "cafe_app": 20,
+}
+
+HEAVY = ("streamlit", "pandas", "numpy")
+
+
+def import_profile(module: str) -> dict:
+    """Return {imported module: cumulative microseconds} for one import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def main() -> int:
+    failed = False
+    print(f"{'module':12} {'best ms':>8} {'budget ms':>10}  heavy imports")
+    for module, budget in BUDGETS_MS.items():
+        profiles = [import_profile(module) for _ in range(RUNS)]
+        best_ms = min(profile[module] for profile in profiles) / 1000
+        heavy = sorted({name.split(".")[0] for name in profiles[0]
+                        if name.split(".")[0] in HEAVY})
+        ok = best_ms <= budget and not heavy
+        failed |= not ok
+        print(f"{module:12} {best_ms:>8.1f} {budget:>10}  {', '.join(heavy) or '-'}"
+              f"{'' if ok else '   <-- REGRESSION'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
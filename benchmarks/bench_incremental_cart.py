@@ -0,0 +1,51 @@
+"""
+Benchmark: repricing a whole cart vs ``BandCart`` on single-item changes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_incremental_cart
+
+For catering carts of 10, 100 and 1000 lines, bumps one random item at a
+time and compares repricing the full order (what Final.py did on every
+rerun) with ``BandCart.set_qty``, checking both give the same totals.
+"""
+
+import random
+import time
+
+from benchmarks.bench_pricing_rules import make_menu
+from pricing import BandCart, compile_rules
+
+BUMPS = 2000
+
+
+def main() -> None:
+    rng = random.Random(16)
+    print(f"{'lines':>6} {'full reprice (us)':>18} {'incremental (us)':>17} {'speed-up':>9}")
+    for n_lines in (10, 100, 1000):
+        tables = compile_rules(make_menu(n_lines))
+        items = list(tables.item_ids)
+        cart = BandCart(tables, "morning")
+        for item in items:
+            cart.set_qty(item, rng.randint(1, 20))
+        bumps = [(rng.choice(items), rng.randint(0, 20)) for _ in range(BUMPS)]
+
+        quantities = dict(cart.qty)
+        start = time.perf_counter()
+        for item, qty in bumps:
+            quantities[item] = qty
+            full = tables._price_order(tuple(quantities.items()), "morning")
+        full_s = (time.perf_counter() - start) / BUMPS
+
+        start = time.perf_counter()
+        for item, qty in bumps:
+            cart.set_qty(item, qty)
+        incremental_s = (time.perf_counter() - start) / BUMPS
+
+        assert cart.grand_total == full["grand_total"]
+        print(f"{n_lines:>6} {full_s * 1e6:>18.1f} {incremental_s * 1e6:>17.2f}"
+              f" {full_s / incremental_s:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: order journal append rate and memory-mapped aggregation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_journal [n_orders]
+
+Appends ``n_orders`` priced carts (default 1M) to a journal in a temporary
+directory with the default batched fsync, then reopens it with
+``JournalReader`` and times whole-journal totals and revenue by item.
+"""
+
+import random
+import sys
+import tempfile
+import time
+
+from journal import JournalReader, OrderJournal
+from pricing import BANDS, MENU, default_tables
+
+
+def main(n_orders: int = 1_000_000) -> None:
+    rng = random.Random(16)
+    tables = default_tables()
+    names = [item["Name"] for item in MENU]
+    samples = []
+    for _ in range(1000):
+        band = rng.choice(BANDS)
+        order = tuple((name, rng.randint(0, 5)) for name in names)
+        samples.append((tables.price_order(order, band), band))
+
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        with OrderJournal(path) as journal:
+            for i in range(n_orders):
+                priced, band = samples[i % len(samples)]
+                journal.append_priced(priced, band)
+        append_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reader = JournalReader(path)
+        totals = reader.totals()
+        by_item = reader.revenue_by_item()
+        aggregate_s = time.perf_counter() - start
+
+        expected = sum(samples[i % len(samples)][0]["grand_total"] for i in range(n_orders))
+        assert totals["grand_total"] == expected
+
+        print(f"orders:       {n_orders:,} ({len(reader.lines):,} lines)")
+        print(f"append:       {n_orders / append_s:12,.0f} orders/s")
+        print(f"aggregate:    {aggregate_s:12.3f} s (totals + revenue by item)")
+        print(f"grand total:  ${totals['grand_total'] / 100:,.2f}")
+        for item, (qty, revenue) in by_item.items():
+            print(f"  {item:12} {qty:>10,} sold  ${revenue / 100:,.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,86 @@
+"""
+Benchmark: the kitchen ticket queue under steady trade and a rush.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_kitchen
+
+Orders of random Coffee / Fruit Juice / Cake quantities arrive at random
+(Poisson) times and are sent with ``Kitchen.send`` from the main thread, as
+the Streamlit apps do, waiting at most a simulated second for room in the
+queue.  Prep times are scaled so a simulated minute takes ``MINUTE`` real
+seconds.  For a steady hour and a ten-minute rush of 300 orders a minute,
+with and without batching, prints orders made and turned away, the peak
+number of orders queued or in progress, and order latency in simulated
+minutes.  Finally times the queue itself with zero prep time.
+"""
+
+import random
+import time
+
+from kitchen import Kitchen, KitchenBusy
+
+MINUTE = 0.05  # real seconds per simulated minute
+TIME_SCALE = MINUTE / 60
+ITEMS = ("Coffee", "Fruit Juice", "Cake")
+WORKERS = {"coffee bar": 4, "juice bar": 2, "cake counter": 1}
+
+
+def random_order(rng) -> list:
+    lines = [(item, rng.choice((0, 0, 1, 1, 2, 3))) for item in ITEMS]
+    return [line for line in lines if line[1]] or [("Coffee", 1)]
+
+
+def run(rng, per_minute, minutes, batch_items) -> dict:
+    kitchen = Kitchen(workers=WORKERS, batch_items=batch_items,
+                      time_scale=TIME_SCALE).start()
+    peak = 0
+    next_at = time.perf_counter()
+    end = next_at + minutes * MINUTE
+    order_id = 0
+    while next_at < end:
+        next_at += rng.expovariate(per_minute / MINUTE)
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+        try:
+            kitchen.send(order_id, random_order(rng), timeout=MINUTE / 60)
+        except KitchenBusy:
+            pass
+        order_id += 1
+        stats = kitchen.stats()
+        peak = max(peak, stats["orders_waiting"] + stats["in_progress"])
+    while kitchen.stats()["completed"] + kitchen.rejected + kitchen.failed < order_id:
+        time.sleep(MINUTE)
+    kitchen.stop()
+    stats = kitchen.stats()
+    stats["peak"] = peak
+    return stats
+
+
+def main() -> None:
+    rng = random.Random(16)
+    print(f"{'trade':<22} {'batch':>5} {'made':>6} {'turned':>7} {'peak':>5}"
+          f" {'p50 min':>8} {'p99 min':>8}")
+    for label, per_minute, minutes in (("steady, 2/min x 60", 2, 60),
+                                       ("rush, 300/min x 10", 300, 10)):
+        for batch_items in (1, 6):
+            stats = run(rng, per_minute, minutes, batch_items)
+            latency = {q: seconds / TIME_SCALE / 60 for q, seconds in stats["latency"].items()}
+            print(f"{label:<22} {batch_items:>5} {stats['completed']:>6} {stats['rejected']:>7}"
+                  f" {stats['peak']:>5} {latency[0.5]:>8.1f} {latency[0.99]:>8.1f}")
+
+    # The queue itself: no prep time, as fast as orders can be sent
+    kitchen = Kitchen(prep_seconds={}, time_scale=0).start()
+    n_orders = 20_000
+    start = time.perf_counter()
+    for order_id in range(n_orders):
+        kitchen.send(order_id, random_order(rng))
+    while kitchen.stats()["completed"] < n_orders:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    kitchen.stop()
+    print(f"queue overhead: {n_orders / elapsed:,.0f} orders/s sent, split and made"
+          f" ({elapsed / n_orders * 1e6:.0f} us per order)")
+
+
+if __name__ == "__main__":
+    main()
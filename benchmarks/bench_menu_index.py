@@ -0,0 +1,83 @@
+"""
+Benchmark: menu lookups by linear scan vs ``catalog.MenuIndex``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_menu_index
+
+For menus of 10 to 10,000 items, each with three variants (like the ``Type``
+lists of ``streamlit_app (1).py``), times one price lookup with the old
+``find_price`` loops (exact match as in ``Final.py``, substring match as in
+``streamlit_app (1).py``) and with the index (exact name, a variant name
+typed in another case, and a three-letter prefix search returning up to 10
+names).
+"""
+
+import random
+import timeit
+
+from catalog import MenuIndex
+
+SIZES = (10, 100, 1000, 10_000)
+VARIANTS = ("Hot", "Iced", "Large")
+N_QUERIES = 1000
+
+
+def make_menu(rng, n_items) -> list:
+    words = ["".join(rng.choices("bcdfghklmnprstvz", k=2)) + rng.choice("aeiou")
+             for _ in range(200)]
+    names = set()
+    while len(names) < n_items:
+        names.add(" ".join(rng.sample(words, 2)).title())
+    return [{"Name": name, "Price": rng.randint(2, 12), "Type": list(VARIANTS)}
+            for name in sorted(names)]
+
+
+def scan_exact(menu, item_name):
+    for category in menu:
+        if item_name == category['Name']:
+            return category['Price']
+
+
+def scan_substring(menu, item_name):
+    for category in menu:
+        if item_name in category['Name']:
+            return category['Price']
+
+
+def per_query_us(run, queries) -> float:
+    def loop():
+        for query in queries:
+            run(query)
+    number = max(1, 20_000 // (len(queries) * 10))
+    return min(timeit.repeat(loop, number=number, repeat=3)) / number / len(queries) * 1e6
+
+
+def main() -> None:
+    rng = random.Random(16)
+    print(f"{'items':>6} {'scan ==':>9} {'scan in':>9} {'index':>7}"
+          f" {'variant':>8} {'prefix':>7}   (us per lookup)")
+    for n_items in SIZES:
+        menu = make_menu(rng, n_items)
+        index = MenuIndex.from_menu(menu)
+        picked = [rng.choice(menu) for _ in range(N_QUERIES)]
+        names = [item["Name"] for item in picked]
+        variants = [f"{rng.choice(VARIANTS)}  {item['Name']}".upper() for item in picked]
+        prefixes = [item["Name"][:3].lower() for item in picked]
+
+        for name, variant in zip(names, variants):
+            price = menu[index.sku(name)]["Price"]
+            assert price == scan_exact(menu, name) == menu[index.sku(variant)]["Price"]
+        assert all(index.search(prefix) for prefix in prefixes)
+
+        scan_queries = names[:max(10, 20_000 // n_items)]
+        print(f"{n_items:>6}"
+              f" {per_query_us(lambda q: scan_exact(menu, q), scan_queries):>9.2f}"
+              f" {per_query_us(lambda q: scan_substring(menu, q), scan_queries):>9.2f}"
+              f" {per_query_us(index.sku, names):>7.2f}"
+              f" {per_query_us(index.sku, variants):>8.2f}"
+              f" {per_query_us(index.search, prefixes):>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: the cost of the metrics timers and of the sampling profiler.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics
+
+Times a call through ``@timed`` and a ``with span(...)`` block against the
+bare call, then reruns ``Final.py`` and ``cafe_app.main`` under Streamlit's
+``AppTest`` (changing a quantity each time) and works out the share of
+rerun time spent in the timers: timings recorded per rerun times the cost of
+one, over the mean rerun time.  Finally prices carts with and without the
+profiler sampling every ``metrics.PROFILE_INTERVAL``, in ``PROFILE_PAIRS``
+pairs of runs timed in process CPU time, and takes the median of the
+per-pair slowdowns so one noisy run cannot pass or fail the check.  Exits
+with status 1 if the timers or the profiler take more than ``BUDGET`` of
+the time, so it can run in CI.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+import metrics
+from cafe_app import calculate_totals
+from metrics import REGISTRY, SamplingProfiler, span, timed
+
+BUDGET = 0.02
+RERUNS = 40
+PROFILE_PAIRS = 81
+PROFILE_CARTS = 10_000
+CART = {"Coffee": 2, "Latte": 1, "Muffin": 3}
+
+
+def bare():
+    return None
+
+
+def per_call_ns(func) -> float:
+    number = 200_000
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def rerun_share(script, label, observe_ns) -> bool:
+    from streamlit.testing.v1 import AppTest
+
+    REGISTRY.reset()
+    app = AppTest.from_string(script, default_timeout=30)
+    app.run()
+    inputs = app.number_input
+    for i in range(RERUNS):
+        inputs[i % len(inputs)].set_value(i % 5).run()
+    snap = REGISTRY.snapshot()
+    rerun = next(timer for name, timer in snap["timers"].items() if name.endswith(".rerun"))
+    observations = sum(timer["count"] for timer in snap["timers"].values())
+    per_rerun = observations / rerun["count"]
+    share = per_rerun * observe_ns * 1e-9 / rerun["mean"]
+    print(f"{label:<10} rerun {rerun['mean'] * 1e3:6.1f} ms, {per_rerun:4.1f} timings per"
+          f" rerun: {share:.3%} of rerun time")
+    for name, timer in snap["timers"].items():
+        print(f"    {name:<40} {timer['count']:>5} x {timer['mean'] * 1e3:8.3f} ms")
+    return share <= BUDGET
+
+
+def main() -> int:
+    plain_ns = per_call_ns(bare)
+    timed_bare = timed("bench.bare")(bare)
+    timed_ns = per_call_ns(timed_bare)
+
+    def with_span():
+        with span("bench.span"):
+            pass
+
+    span_ns = per_call_ns(with_span)
+    REGISTRY.enabled = False
+    off_ns = per_call_ns(timed_bare)
+    REGISTRY.enabled = True
+    observe_ns = max(timed_ns - plain_ns, span_ns)
+    print(f"bare call {plain_ns:.0f} ns, @timed {timed_ns:.0f} ns, span {span_ns:.0f} ns,"
+          f" @timed with metrics off {off_ns:.0f} ns")
+
+    ok = True
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # The apps open their order journal in the working directory
+        os.chdir(directory)
+        try:
+            with open(os.path.join(cwd, "Final.py"), encoding="utf-8") as f:
+                ok &= rerun_share(f.read(), "Final.py", observe_ns)
+            ok &= rerun_share("import cafe_app\ncafe_app.main()\n", "cafe_app", observe_ns)
+        finally:
+            os.chdir(cwd)
+
+    def price_carts():
+        for _ in range(PROFILE_CARTS):
+            calculate_totals(CART, "WELCOME10")
+
+    def cpu_seconds():
+        started = time.process_time()
+        price_carts()
+        return time.process_time() - started
+
+    def with_profiler():
+        profiler.start()
+        try:
+            return cpu_seconds()
+        finally:
+            profiler.stop()
+
+    # Pairs of runs without and with the profiler, taking turns at going first
+    # so a machine that speeds up or slows down does not favour either.  CPU
+    # time of the process (the sampler's included) leaves out other programs.
+    price_carts()
+    profiler = SamplingProfiler(metrics.PROFILE_INTERVAL)
+    base, profiled = [], []
+    for i in range(PROFILE_PAIRS):
+        if i % 2:
+            profiled.append(with_profiler())
+            base.append(cpu_seconds())
+        else:
+            base.append(cpu_seconds())
+            profiled.append(with_profiler())
+    overhead = statistics.median(p / b - 1 for b, p in zip(base, profiled))
+    print(f"profiler every {metrics.PROFILE_INTERVAL * 1e3:.0f} ms:"
+          f" {statistics.median(base) * 1e3:.0f} -> {statistics.median(profiled) * 1e3:.0f} ms"
+          f" CPU for {PROFILE_CARTS // 1000}k carts (median of {PROFILE_PAIRS} pairs"
+          f" {overhead:+.1%}), {profiler.samples} samples taking"
+          f" {profiler.busy / sum(profiled):.2%} of the CPU, top {profiler.top(1)}")
+    ok &= overhead <= BUDGET
+    print("OK" if ok else f"FAIL: over the {BUDGET:.0%} budget")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
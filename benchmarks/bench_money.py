@@ -0,0 +1,87 @@
+"""
+Benchmark: float ``round(..., 2)`` pricing vs integer-cent pricing.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_money [n_lines]
+
+Simulates ``n_lines`` cart lines (default 10M) with random prices,
+quantities and time-band rates, prices each one both ways and reports:
+
+* time per line for each path;
+* how many lines the float path prices differently from the defined
+  rounding policy (discounts rounded half up to the cent, see money.py);
+* how far a float running total drifts from the exact sum of the very same
+  lines.
+"""
+
+import random
+import sys
+import time
+
+from money import discounted, percent_of
+
+CHUNK = 100_000
+RATES = [(0.0, 0), (0.2, 2000), (0.3, 3000)]
+
+
+def float_line(unit, qty, rate):
+    # The float pipeline Final.py used: round after every step.
+    raw = round(unit * qty, 2)
+    before_time_disc = raw
+    if qty >= 3:
+        before_time_disc = round(raw * 0.9, 2)
+    time_disc = round(before_time_disc * rate, 2)
+    return round(before_time_disc - time_disc, 2)
+
+
+def cents_line(unit, qty, bp):
+    raw = unit * qty
+    if qty >= 3:
+        raw = discounted(raw, 1000)
+    return raw - percent_of(raw, bp)
+
+
+def main(n_lines: int = 10_000_000) -> None:
+    rng = random.Random(16)
+    float_s = cents_s = 0.0
+    float_total = 0.0
+    float_lines_cents = 0
+    cents_total = 0
+    off_policy = 0
+
+    done = 0
+    while done < n_lines:
+        size = min(CHUNK, n_lines - done)
+        unit_cents = [rng.randrange(50, 2000, 5) for _ in range(size)]
+        units = [c / 100 for c in unit_cents]
+        qtys = [rng.randint(1, 12) for _ in range(size)]
+        rates = [rng.choice(RATES) for _ in range(size)]
+
+        start = time.perf_counter()
+        float_lines = [float_line(u, q, r[0]) for u, q, r in zip(units, qtys, rates)]
+        float_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        int_lines = [cents_line(u, q, r[1]) for u, q, r in zip(unit_cents, qtys, rates)]
+        cents_s += time.perf_counter() - start
+
+        for f, c in zip(float_lines, int_lines):
+            float_total += f
+            float_lines_cents += round(f * 100)
+            cents_total += c
+            if round(f * 100) != c:
+                off_policy += 1
+        done += size
+
+    print(f"lines:                 {n_lines:,}")
+    print(f"float path:            {float_s / n_lines * 1e9:8.1f} ns/line")
+    print(f"int-cents path:        {cents_s / n_lines * 1e9:8.1f} ns/line")
+    print(f"lines off policy:      {off_policy:,}")
+    print(f"int-cents total:       ${cents_total / 100:,.2f}")
+    print(f"float path total:      ${float_lines_cents / 100:,.2f}")
+    print(f"float summing drift:   ${float_total - float_lines_cents / 100:+,.6f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
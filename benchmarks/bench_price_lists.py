@@ -0,0 +1,100 @@
+"""
+Benchmark: loading and hot-reloading per-outlet price lists.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_price_lists [n_outlets] [n_skus]
+
+Writes ``n_outlets`` price lists (default 50) of ``n_skus`` items (default
+2000) to a temporary directory and times starting a ``PriceBook``, a reload
+with nothing changed, with one outlet changed and with every outlet changed.
+During the full reloads a second thread keeps pricing carts from
+``book.get(outlet)`` snapshots; it checks every order was priced from a
+single version and reports its throughput and worst latency while reloads
+run.
+"""
+
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from price_lists import PriceBook, write_price_list
+
+CART_LINES = 5
+
+
+def price_list(outlet: int, n_skus: int, version: int) -> dict:
+    # The cents of every price are the version, so a cart shows which version priced it
+    return {
+        "version": version,
+        "menu": [{"Name": f"Item {i}", "Price": 1 + (outlet + i) % 20 + version / 100,
+                  "Category": f"Category {i % 20}"}
+                 for i in range(n_skus)] + [{"Name": "Coffee", "Price": 3},
+                                             {"Name": "Cake", "Price": 6}],
+    }
+
+
+def write_all(directory, n_outlets, n_skus, version) -> float:
+    start = time.perf_counter()
+    for outlet in range(n_outlets):
+        write_price_list(directory, f"outlet-{outlet}", price_list(outlet, n_skus, version))
+    return time.perf_counter() - start
+
+
+def main(n_outlets: int = 50, n_skus: int = 2000) -> None:
+    rng = random.Random(16)
+    with tempfile.TemporaryDirectory() as directory:
+        write_s = write_all(directory, n_outlets, n_skus, 1)
+        print(f"{n_outlets} outlets x {n_skus} SKUs written in {write_s:.2f} s")
+
+        start = time.perf_counter()
+        book = PriceBook(directory)
+        print(f"startup (load + compile all):   {time.perf_counter() - start:8.3f} s")
+
+        start = time.perf_counter()
+        assert book.reload() == []
+        print(f"reload, nothing changed:        {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+        write_price_list(directory, "outlet-0", price_list(0, n_skus, 2))
+        start = time.perf_counter()
+        assert book.reload() == ["outlet-0"]
+        print(f"reload, one outlet changed:     {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+        # Price carts in another thread while every outlet is reloaded
+        stop = threading.Event()
+        stats = {"orders": 0, "worst": 0.0}
+        outlets = book.outlets()
+        items = [f"Item {i}" for i in range(n_skus)]
+
+        def pricer():
+            while not stop.is_set():
+                snapshot = book.get(rng.choice(outlets))
+                order = tuple((item, 1) for item in rng.sample(items, CART_LINES))
+                t0 = time.perf_counter()
+                priced = snapshot.tables._price_order(order, "morning")
+                stats["worst"] = max(stats["worst"], time.perf_counter() - t0)
+                versions = {line[2] % 100 for line in priced["lines"]}
+                assert versions == {snapshot.version}, versions
+                stats["orders"] += 1
+
+        thread = threading.Thread(target=pricer)
+        thread.start()
+        reload_s = []
+        for version in (3, 4, 5):
+            write_all(directory, n_outlets, n_skus, version)
+            start = time.perf_counter()
+            assert len(book.reload()) == n_outlets
+            reload_s.append(time.perf_counter() - start)
+        stop.set()
+        thread.join()
+        assert stats["orders"], "the pricing thread failed"
+        print(f"reload, every outlet changed:   {min(reload_s):8.3f} s (best of 3)")
+        print(f"pricing alongside: {stats['orders']:,} orders, each from one version;"
+              f" worst {stats['worst'] * 1e3:.1f} ms"
+              f" (GIL switch interval {sys.getswitchinterval() * 1e3:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+Benchmark: Final.py's per-line branching vs compiled ``pricing`` tables.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pricing_rules
+
+For menus of 10, 100 and 1000 items, prices a cart holding every item with
+both the original loop (``find_price`` scan plus ``if``/``elif`` bands) and
+``PricingTables.price_line``, checks they agree (to within the one cent per
+line that the half-up rounding policy can move a tie) and prints the time
+per cart.
+"""
+
+import random
+import timeit
+
+from pricing import BANDS, compile_rules
+
+
+def make_menu(n_items: int) -> list:
+    menu = [
+        {'Name': 'Coffee', 'Price': 3},
+        {'Name': 'Fruit Juice', 'Price': 2},
+        {'Name': 'Cake', 'Price': 6},
+    ]
+    for i in range(len(menu), n_items):
+        menu.append({'Name': f'Item {i}', 'Price': round(random.uniform(1, 9), 2)})
+    return menu[:n_items]
+
+
+def legacy_price_cart(menu, order_now, band, morning) -> float:
+    # The loop body as it was in Final.py before the rules were compiled.
+    def find_price(item_name):
+        for category in menu:
+            if(item_name == category['Name']):
+                return category['Price']
+
+    grand_total = 0.0
+    for item, qty in order_now.items():
+        if qty <= 0:
+            continue
+        unit = find_price(item)
+        raw = round(unit*qty, 2)
+        before_time_disc = raw
+        if (qty >= 3):
+            before_time_disc = round(raw*0.9, 2)
+        time_disc_fac = 0.0
+        if (band == "evening"):
+            time_disc_fac = 0.3
+        elif (band == "afternoon" and item == "Fruit Juice"):
+            time_disc_fac = 0.2
+        elif (band == "morning" and morning and item in {"Coffee", "Cake"}):
+            time_disc_fac = 0.2
+        time_disc = round(before_time_disc * time_disc_fac, 2)
+        grand_total += round(before_time_disc - time_disc, 2)
+    return grand_total
+
+
+def compiled_price_cart(tables, order_now, band, morning) -> int:
+    grand_total = 0
+    for item, qty in order_now.items():
+        if qty <= 0:
+            continue
+        grand_total += tables.price_line(item, qty, band, morning)[5]
+    return grand_total
+
+
+def main() -> None:
+    random.seed(16)
+    print(f"{'items':>6} {'legacy (ms/cart)':>18} {'compiled (ms/cart)':>20} {'speed-up':>9}")
+    for n_items in (10, 100, 1000):
+        menu = make_menu(n_items)
+        tables = compile_rules(menu)
+        order_now = {item['Name']: random.randint(1, 5) for item in menu}
+        morning = tables.has_combo(order_now)
+        for band in BANDS:
+            legacy = legacy_price_cart(menu, order_now, band, morning)
+            compiled = compiled_price_cart(tables, order_now, band, morning)
+            assert abs(round(legacy * 100) - compiled) <= n_items
+
+        number = max(1, 20_000 // n_items)
+        legacy = min(timeit.repeat(
+            lambda: legacy_price_cart(menu, order_now, "evening", morning),
+            number=number, repeat=5)) / number
+        compiled = min(timeit.repeat(
+            lambda: compiled_price_cart(tables, order_now, "evening", morning),
+            number=number, repeat=5)) / number
+        print(f"{n_items:>6} {legacy * 1e3:>18.3f} {compiled * 1e3:>20.3f} {legacy / compiled:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Load generator for ``pricing_service.py``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pricing_service [--connections 32]
+        [--seconds 10] [--batch 1]
+
+Starts the service in a subprocess, opens ``--connections`` keep-alive
+connections and has each one send random carts back to back (``--batch``
+carts per request) for ``--seconds``.  Reports requests and carts per
+second and p50/p99 request latency.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from pricing import MENU, SLOTS
+
+HOST = "127.0.0.1"
+PORT = 8599
+
+
+def random_cart(rng):
+    return {
+        "items": {item["Name"]: rng.randint(0, 5) for item in MENU},
+        "slot": rng.choice(SLOTS),
+    }
+
+
+async def client(rng, batch, stop_at, latencies):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    try:
+        while time.perf_counter() < stop_at:
+            carts = [random_cart(rng) for _ in range(batch)]
+            body = json.dumps(carts if batch > 1 else carts[0]).encode()
+            request = (
+                f"POST /price HTTP/1.1\r\nHost: {HOST}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            reply = await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            assert head.startswith(b"HTTP/1.1 200"), reply
+    finally:
+        writer.close()
+
+
+async def wait_until_up():
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection(HOST, PORT)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("pricing service did not start")
+
+
+async def load(connections, seconds, batch):
+    await wait_until_up()
+    latencies = []
+    stop_at = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(random.Random(i), batch, stop_at, latencies) for i in range(connections)
+    ))
+    return latencies, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "pricing_service.py", "--host", HOST, "--port", str(PORT)]
+    )
+    try:
+        latencies, elapsed = asyncio.run(load(args.connections, args.seconds, args.batch))
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"connections: {args.connections}, carts/request: {args.batch}")
+    print(f"requests/s:  {len(latencies) / elapsed:10,.0f}")
+    print(f"carts/s:     {len(latencies) * args.batch / elapsed:10,.0f}")
+    print(f"p50 latency: {p50 * 1e3:10.2f} ms")
+    print(f"p99 latency: {p99 * 1e3:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
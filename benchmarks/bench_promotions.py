@@ -0,0 +1,135 @@
+"""
+Benchmark: indexed promotion matching vs checking every rule.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_promotions
+
+First checks that ``PromotionEngine`` with the rules of ``pricing.py``
+prices every small cart exactly like the compiled tables.  Then, on a menu of
+500 items in 25 categories, prices a 10-line cart with 10, 100 and 1000
+active promotions (item and category discounts, bulk tiers and combos), both
+through the engine's index and by scanning every rule, checks they agree and
+prints the time per cart.
+"""
+
+import itertools
+import random
+import timeit
+
+from money import to_cents
+from pricing import BANDS, BULK_TIERS, COMBO_ITEMS, MENU, TIME_BAND_RULES, default_tables
+from promotions import (LINE_STAGES, STAGES, Promotion, PromotionEngine, apply_stage,
+                        promotions_from_rules)
+
+N_ITEMS = 500
+N_CATEGORIES = 25
+CART_LINES = 10
+
+
+def check_default_rules() -> int:
+    tables = default_tables()
+    engine = PromotionEngine(
+        {item['Name']: to_cents(item['Price']) for item in MENU},
+        promotions_from_rules(BULK_TIERS, TIME_BAND_RULES, COMBO_ITEMS),
+    )
+    checked = 0
+    for quantities in itertools.product(range(5), repeat=len(MENU)):
+        order = tuple((item['Name'], q) for item, q in zip(MENU, quantities) if q)
+        for band in BANDS:
+            expected = tables.price_order(order, band)
+            priced = engine.price(dict(order), band)
+            assert priced["lines"] == expected["lines"]
+            assert priced["grand_total"] == expected["grand_total"]
+            checked += 1
+    return checked
+
+
+def make_promotions(rng, n_rules, items, categories) -> list:
+    promotions = []
+    for i in range(n_rules):
+        kind = rng.randrange(4)
+        band = rng.choice((None,) + BANDS)
+        priority = rng.randrange(10)
+        stackable = rng.random() < 0.3
+        rate = rng.choice((0.05, 0.10, 0.15, 0.20))
+        if kind == 0:
+            promotions.append(Promotion(f"item {i}", "time", rate=rate,
+                                        items=rng.sample(items, 2), band=band,
+                                        priority=priority, stackable=stackable))
+        elif kind == 1:
+            promotions.append(Promotion(f"category {i}", "time", rate=rate,
+                                        categories=[rng.choice(categories)], band=band,
+                                        priority=priority, stackable=stackable))
+        elif kind == 2:
+            promotions.append(Promotion(f"bulk {i}", "bulk", rate=rate,
+                                        items=[rng.choice(items)],
+                                        min_qty=rng.randint(2, 5), priority=priority))
+        else:
+            promotions.append(Promotion(f"combo {i}", "order", amount=rng.randint(50, 300),
+                                        requires=rng.sample(items, 2), band=band,
+                                        priority=priority, stackable=stackable))
+    return promotions
+
+
+def rank_rules(engine) -> dict:
+    ranked = sorted(enumerate(engine.promotions), key=lambda e: (e[1].priority, e[0]))
+    return {stage: [rule for _, rule in ranked if rule.stage == stage] for stage in STAGES}
+
+
+def scan_price(engine, by_stage, cart, band) -> int:
+    # The same stages, but every rule is checked for every line.
+    order = [(item, qty) for item, qty in cart.items() if qty > 0]
+    present = {item for item, _ in order}
+    present_categories = {engine.categories[item] for item in present}
+    after_lines = units = 0
+    for item, qty in order:
+        cents = engine.prices[item] * qty
+        for stage in LINE_STAGES:
+            rules = [rule for rule in by_stage[stage]
+                     if rule.applies_to_line(item, engine.categories[item])
+                     and (rule.band is None or rule.band == band)]
+            cents -= apply_stage(rules, cents, qty, band, present, present_categories, [])
+        after_lines += cents
+        units += qty
+    order_rules = [rule for rule in by_stage["order"] if rule.band is None or rule.band == band]
+    return after_lines - apply_stage(order_rules, after_lines, units, band, present,
+                                     present_categories, [])
+
+
+def main() -> None:
+    print(f"default rules: {check_default_rules():,} carts priced the same as pricing.py")
+
+    rng = random.Random(16)
+    items = [f"Item {i}" for i in range(N_ITEMS)]
+    prices = {item: rng.randint(100, 900) for item in items}
+    categories = [f"Category {i}" for i in range(N_CATEGORIES)]
+    item_categories = {item: categories[i % N_CATEGORIES] for i, item in enumerate(items)}
+    carts = [{item: rng.randint(1, 6) for item in rng.sample(items, CART_LINES)}
+             for _ in range(200)]
+
+    print(f"{'rules':>6} {'scan (us/cart)':>15} {'indexed (us/cart)':>18} {'speed-up':>9}")
+    for n_rules in (10, 100, 1000):
+        engine = PromotionEngine(prices, make_promotions(rng, n_rules, items, categories),
+                                 item_categories)
+        by_stage = rank_rules(engine)
+        for cart in carts:
+            for band in BANDS:
+                assert engine.price(cart, band)["grand_total"] == scan_price(engine, by_stage, cart, band)
+
+        def run_indexed():
+            for cart in carts:
+                engine.price(cart, "morning")
+
+        def run_scan():
+            for cart in carts:
+                scan_price(engine, by_stage, cart, "morning")
+
+        number = 5
+        indexed = min(timeit.repeat(run_indexed, number=number, repeat=5)) / number / len(carts)
+        scan = min(timeit.repeat(run_scan, number=1, repeat=3)) / len(carts)
+        print(f"{n_rules:>6} {scan * 1e6:>15.1f} {indexed * 1e6:>18.1f} {scan / indexed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
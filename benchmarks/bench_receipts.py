@@ -0,0 +1,69 @@
+"""
+Benchmark: rendering a receipt with pandas vs ``receipts.ReceiptRenderer``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_receipts
+
+For carts of 3, 20 and 100 lines, times what ``Final.py`` did on each rerun
+(a dict per line, then ``pd.DataFrame``; Streamlit still has to serialize
+the frame after that) against the renderer's HTML table, column dict,
+plain-text and ESC/POS output.  pandas is imported before timing, so its
+import cost is not counted.
+"""
+
+import random
+import timeit
+
+import pandas as pd
+
+from benchmarks.bench_pricing_rules import make_menu
+from money import to_dollars
+from pricing import compile_rules
+from receipts import BREAKDOWN_COLUMNS, ReceiptRenderer
+
+
+def dataframe(lines):
+    # cart_frame() as it was in Final.py
+    frame_rows = []
+    for item, qty, unit, raw, bulk_disc, before_time_disc, time_disc, after_time_disc in lines:
+        frame_rows.append({
+            "Item": item,
+            "Qty": qty,
+            "Unit ($)": to_dollars(unit),
+            "Raw ($)": to_dollars(raw),
+            "Bulk - ($)": to_dollars(bulk_disc),
+            "Before time discount($)": to_dollars(before_time_disc),
+            "Time disc - ($)": to_dollars(time_disc),
+            "After time discount ($)": to_dollars(after_time_disc)
+        })
+    return pd.DataFrame(frame_rows)
+
+
+def per_call_us(func, *args) -> float:
+    number = 200
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    random.seed(16)
+    tables = compile_rules(make_menu(100))
+    items = list(tables.item_ids)
+    renderer = ReceiptRenderer(BREAKDOWN_COLUMNS)
+    print(f"{'lines':>6} {'DataFrame':>10} {'html':>7} {'table':>7} {'text':>7}"
+          f" {'escpos':>7}   (us per receipt)")
+    for n_lines in (3, 20, 100):
+        order = tuple((item, random.randint(1, 6)) for item in items[:n_lines])
+        priced = tables.price_order(order, "morning")
+        lines = priced["lines"]
+        totals = [("Total", priced["grand_total"])]
+        assert len(dataframe(lines)) == len(renderer.rows(lines)) == n_lines
+        print(f"{n_lines:>6} {per_call_us(dataframe, lines):>10.1f}"
+              f" {per_call_us(renderer.html, lines, totals):>7.1f}"
+              f" {per_call_us(renderer.table, lines):>7.1f}"
+              f" {per_call_us(renderer.text, lines, totals):>7.1f}"
+              f" {per_call_us(renderer.escpos, lines, totals, 'Cafe'):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: Final.py rerun latency with and without the Streamlit caches.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rerun [n_reruns]
+
+Drives ``Final.py`` with Streamlit's ``AppTest`` the way a cashier does:
+bumping quantities and switching time slots between a handful of carts.
+"Cold" clears ``st.cache_resource`` before every rerun, so the tables,
+clock and renderers are built again; "cached" leaves the caches alone.  Reports median wall and CPU time per rerun, and
+the mean of the ``final.pricing`` span (see metrics.py), the part of the
+rerun that prices the cart.  ``AppTest`` itself adds a fixed cost to the
+first two columns.
+
+Final.py prices through a ``BandCart`` kept in the session, so the
+``price_order`` LRU does not serve its reruns (it serves the pricing
+service and the journal/rollup tools).  Pricing is about 0.1 ms of a
+~20 ms rerun either way; what the caches save here is rebuilding the
+tables, clock and renderers.  Five runs of 40-60 reruns on one CPU gave
+19.3-28.2 ms CPU cold against 16.4-24.2 ms cached, a gain between none and
+about a third that moves with the noise.  The rest is Streamlit's own
+script run and element handling, which these caches cannot reach.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from metrics import REGISTRY
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Final.py")
+SLOTS = ["09:00–11:59", "12:00–14:59", "18:00–20:59"]
+CARTS = [(1, 0, 1), (3, 4, 3), (2, 5, 7), (10, 3, 1)]
+
+
+def measure(n_reruns: int, clear: bool) -> tuple:
+    at = AppTest.from_file(SCRIPT, default_timeout=30)
+    at.run()
+    REGISTRY.reset()
+    wall, cpu = [], []
+    for i in range(n_reruns):
+        quantities = CARTS[i % len(CARTS)]
+        for box, qty in zip(at.number_input, quantities):
+            box.set_value(qty)
+        next(radio for radio in at.radio if radio.label == "Time slot").set_value(
+            SLOTS[i % len(SLOTS)])
+        if clear:
+            st.cache_resource.clear()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        at.run()
+        wall.append(time.perf_counter() - start_wall)
+        cpu.append(time.process_time() - start_cpu)
+    pricing = REGISTRY.snapshot()["timers"]["final.pricing"]["mean"]
+    return statistics.median(wall), statistics.median(cpu), pricing
+
+
+def main(n_reruns: int = 60) -> None:
+    cold = measure(n_reruns, clear=True)
+    cached = measure(n_reruns, clear=False)
+    print(f"{'':8} {'wall ms/rerun':>14} {'cpu ms/rerun':>13} {'pricing ms':>11}")
+    for name, (wall, cpu, pricing) in (("cold", cold), ("cached", cached)):
+        print(f"{name:8} {wall * 1e3:>14.1f} {cpu * 1e3:>13.1f} {pricing * 1e3:>11.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
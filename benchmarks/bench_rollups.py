@@ -0,0 +1,90 @@
+"""
+Benchmark: end-of-day rollups over a large order journal.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rollups [n_orders]
+
+Appends ``n_orders`` priced carts (default 10M) to a journal in a temporary
+directory, then builds a ``DailyRollup`` over it in one chunked pass and
+prints the rate and the process RSS before and after, which should barely
+move.  The totals are checked against ``JournalReader.totals``, and the first
+100k orders are also fed one at a time through ``JournalReader.replay`` to
+time the streaming path; the t-digest quantiles of ticket value are
+compared with exact ones.
+"""
+
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vouchers import rss_mib
+from journal import JournalReader, OrderJournal
+from pricing import BANDS, MENU, default_tables
+from rollups import DailyRollup
+
+N_STREAMED = 100_000
+
+
+def main(n_orders: int = 10_000_000) -> None:
+    rng = random.Random(16)
+    tables = default_tables()
+    names = [item["Name"] for item in MENU]
+    samples = []
+    for _ in range(1000):
+        band = rng.choice(BANDS)
+        order = tuple((name, rng.randint(0, 5)) for name in names)
+        # Some orders are journaled without a band
+        samples.append((tables.price_order(order, band), band if rng.random() < 0.9 else None))
+
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        with OrderJournal(path, sync_every=1 << 16) as journal:
+            for i in range(n_orders):
+                priced, band = samples[i % len(samples)]
+                journal.append_priced(priced, band, timestamp=1_700_000_000 + i * 0.01)
+        print(f"wrote {n_orders:,} orders in {time.perf_counter() - start:.1f} s")
+
+        rss_before = rss_mib()
+        start = time.perf_counter()
+        rollup = DailyRollup(utc_offset=0)
+        rollup.add_journal(path)
+        elapsed = time.perf_counter() - start
+        print(f"chunked rollup: {elapsed:.2f} s, {n_orders / elapsed:,.0f} orders/s,"
+              f" RSS {rss_before:.0f} -> {rss_mib():.0f} MiB")
+
+        reader = JournalReader(path)
+        totals = reader.totals()
+        report = rollup.report()
+        assert report["orders"] == n_orders
+        assert report["revenue"] == totals["grand_total"]
+        assert report["discounts"]["bulk"] == totals["bulk_disc"]
+        assert report["discounts"]["time"] == totals["time_disc"]
+        assert sum(row["revenue"] for row in report["by_item"].values()) == \
+            sum(revenue for _, revenue in reader.revenue_by_item().values())
+
+        n_streamed = min(N_STREAMED, n_orders)
+        start = time.perf_counter()
+        streamed = DailyRollup(utc_offset=0)
+        streamed.add_orders(reader.replay(stop=n_streamed))
+        elapsed = time.perf_counter() - start
+        assert streamed.revenue == int(reader.orders["grand_total"][:n_streamed].sum())
+        print(f"per-order rollup: {n_streamed / elapsed:,.0f} orders/s")
+
+        exact = np.percentile(reader.orders["grand_total"], [50, 90, 99])
+        del reader
+
+        estimated = [report["ticket_value"][f"p{q}"] for q in (50, 90, 99)]
+        print("ticket value p50/p90/p99: exact " + " / ".join(f"{v:,.0f}" for v in exact)
+              + ", t-digest " + " / ".join(f"{v:,.0f}" for v in estimated))
+        for name in ("basket_size", "ticket_value"):
+            summary = report[name]
+            print(f"{name}: " + ", ".join(
+                f"{key} {summary[key]:,.1f}" for key in ("mean", "p50", "p90", "p99", "max")))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,101 @@
+"""
+Benchmark: resolving the time band of an outlet with many schedule entries.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_schedule
+
+For outlets with 10 to 10,000 random entries (happy hours on some weekdays,
+holiday overrides, overlapping priorities), times building the ``Schedule``,
+one ``resolve`` against a scan of every entry, and ``BandClock.current`` when
+polled once a second, and checks the two resolutions agree.  A second pass
+builds 200 outlets of 100 entries each with ``schedules_by_outlet``.
+"""
+
+import datetime
+import random
+import time
+import timeit
+
+from schedule import (ALL_DAYS, DAY_SECONDS, HOLIDAY, BandClock, Schedule, ScheduleEntry,
+                      schedules_by_outlet)
+
+BANDS = ("morning", "afternoon", "evening", "happy hour")
+HOLIDAYS = [datetime.date(2026, 1, 1), datetime.date(2026, 12, 25)]
+START = 1_767_225_600  # 2026-01-01 00:00 UTC
+
+
+def make_rows(rng, n_entries, outlet="main") -> list:
+    rows = []
+    for i in range(n_entries):
+        start = rng.randrange(0, DAY_SECONDS - 1800, 300)
+        end = min(DAY_SECONDS, start + rng.randrange(1800, 4 * 3600, 300))
+        days = rng.sample(sorted(ALL_DAYS | {HOLIDAY}), rng.randint(1, 8))
+        rows.append({"outlet": outlet, "band": rng.choice(BANDS), "start": start, "end": end,
+                     "days": days, "rate": rng.choice((None, 0.1, 0.2, 0.3)),
+                     "name": f"entry {i}", "priority": rng.randrange(5)})
+    return rows
+
+
+def scan(schedule, timestamp) -> tuple:
+    # Every entry checked on every call
+    day, seconds = divmod(timestamp + schedule.utc_offset, DAY_SECONDS)
+    day_type = schedule.day_type(int(day))
+    active = [(i, e) for i, e in enumerate(schedule.entries)
+              if day_type in e.days and e.start <= seconds < e.end]
+    active.sort(key=lambda pair: (-pair[1].priority, pair[0]))
+    return tuple(e for _, e in active)
+
+
+def main() -> None:
+    rng = random.Random(16)
+    stamps = [START + rng.randrange(0, 365 * DAY_SECONDS) for _ in range(2000)]
+    print(f"{'entries':>8} {'build ms':>9} {'scan us':>8} {'resolve us':>11}"
+          f" {'clock us':>9} {'resolves/day':>13}")
+    for n_entries in (10, 100, 1000, 10_000):
+        rows = make_rows(rng, n_entries)
+        start = time.perf_counter()
+        schedule = schedules_by_outlet(rows, HOLIDAYS, utc_offset=0)["main"]
+        build_ms = (time.perf_counter() - start) * 1e3
+        for stamp in stamps[:200]:
+            assert schedule.resolve(stamp).entries == scan(schedule, stamp)
+
+        def run_resolve():
+            for stamp in stamps:
+                schedule.resolve(stamp)
+
+        scan_stamps = stamps[:max(20, 20_000 // n_entries)]
+
+        def run_scan():
+            for stamp in scan_stamps:
+                scan(schedule, stamp)
+
+        # A till polling the clock once a second for a day
+        clock = BandClock(schedule)
+        day = [START + 3 * DAY_SECONDS + s for s in range(DAY_SECONDS)]
+        resolves = 0
+        last = None
+        for now in day:
+            resolution = clock.current(now)
+            resolves += resolution is not last
+            last = resolution
+
+        def run_clock():
+            for now in day:
+                clock.current(now)
+
+        resolve_us = min(timeit.repeat(run_resolve, number=1, repeat=5)) / len(stamps) * 1e6
+        scan_us = min(timeit.repeat(run_scan, number=1, repeat=3)) / len(scan_stamps) * 1e6
+        clock_us = min(timeit.repeat(run_clock, number=1, repeat=3)) / len(day) * 1e6
+        print(f"{n_entries:>8} {build_ms:>9.1f} {scan_us:>8.1f} {resolve_us:>11.2f}"
+              f" {clock_us:>9.2f} {resolves:>13}")
+
+    rows = [row for outlet in range(200) for row in make_rows(rng, 100, f"outlet {outlet}")]
+    start = time.perf_counter()
+    schedules = schedules_by_outlet(rows, HOLIDAYS, utc_offset=0)
+    print(f"{len(schedules)} outlets x 100 entries built in"
+          f" {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
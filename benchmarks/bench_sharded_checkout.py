@@ -0,0 +1,287 @@
+"""
+Benchmark: checkout pricing on synthetic order streams, single process and
+sharded over a process pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sharded_checkout [--orders 200000] [--output out.json]
+
+Three pricing paths are driven with the same kind of order stream:
+
+``cafe_app``
+    ``cafe_app.calculate_totals`` (bulk discount, voucher, combo).
+``final``
+    The compiled tables behind ``Final.py`` (``PricingTables._price_order``,
+    bypassing its result cache), on a menu of ``--menu-size`` items.
+``streamlit_app``
+    ``line_total_with_discounts`` and ``has_combo`` from
+    ``streamlit_app (1).py``.  The script builds its UI at import time, so
+    only those definitions (and the menu data they use) are loaded from its
+    source.
+
+Orders are generated from ``--seed`` with a configurable number of lines,
+quantity distribution, time-band mix and voucher rate; ``cafe_app`` and
+``streamlit_app`` have fixed menus, so ``--menu-size`` only applies to
+``final``.  Each target is timed in this process and then with the stream
+split into one shard per worker of a ``ProcessPoolExecutor`` (every worker
+generates and prices its own shard).  The result is printed as JSON: orders
+per second, per-order latency percentiles and a log-scale histogram, and the
+speed-up and per-core scaling efficiency of each pool size.
+"""
+
+import argparse
+import ast
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STREAMLIT_APP = os.path.join(ROOT, "streamlit_app (1).py")
+TARGETS = ("cafe_app", "final", "streamlit_app")
+BANDS = ("morning", "afternoon", "evening")
+
+# Latency histogram: four buckets per doubling, from 128 ns up
+BUCKETS_PER_OCTAVE = 4
+FIRST_BUCKET_NS = 128
+N_BUCKETS = 96
+
+
+def bucket_of(ns: int) -> int:
+    if ns <= FIRST_BUCKET_NS:
+        return 0
+    index = 1 + int(math.log2(ns / FIRST_BUCKET_NS) * BUCKETS_PER_OCTAVE)
+    return min(N_BUCKETS - 1, index)
+
+
+def bucket_upper_ns(index: int) -> float:
+    return FIRST_BUCKET_NS * 2 ** (index / BUCKETS_PER_OCTAVE)
+
+
+def quantile(histogram, q: float) -> float:
+    """Upper bound of the bucket holding the ``q`` quantile, in microseconds."""
+    target = q * sum(histogram)
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if count and seen >= target:
+            return round(bucket_upper_ns(index) / 1000, 3)
+    return 0.0
+
+
+###############################################################################
+# Order streams
+###############################################################################
+
+
+def generate_orders(items, vouchers, stream: dict, n_orders: int, rng) -> list:
+    """
+    Return ``n_orders`` synthetic orders as ``(cart, band, voucher)``.
+
+    ``stream`` holds ``max_lines`` (lines per order, uniform from 1),
+    ``qty_dist`` (``"uniform"`` up to ``max_qty``, or ``"geometric"`` with
+    mean ``mean_qty``), ``band_mix`` (weights of ``BANDS``) and
+    ``voucher_rate`` (share of orders that enter a code).
+    """
+    orders = []
+    max_lines = min(stream["max_lines"], len(items))
+    p = 1 / stream["mean_qty"]
+    for _ in range(n_orders):
+        cart = {}
+        for item in rng.sample(items, rng.randint(1, max_lines)):
+            if stream["qty_dist"] == "uniform":
+                cart[item] = rng.randint(1, stream["max_qty"])
+            else:
+                qty = 1
+                while rng.random() > p and qty < stream["max_qty"]:
+                    qty += 1
+                cart[item] = qty
+        band = rng.choices(BANDS, weights=stream["band_mix"])[0]
+        voucher = rng.choice(vouchers) if rng.random() < stream["voucher_rate"] else ""
+        orders.append((cart, band, voucher))
+    return orders
+
+
+def load_streamlit_app_pricing() -> dict:
+    """Load the pricing definitions of ``streamlit_app (1).py`` without its UI."""
+    with open(STREAMLIT_APP, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    wanted_modules = {"money", "metrics", "variants"}
+    wanted_names = {"coffee", "frjuice", "cake", "VARIANTS"}
+    wanted_functions = {"has_combo", "line_total_with_discounts"}
+    body = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module in wanted_modules:
+            body.append(node)
+        elif isinstance(node, ast.Assign) and all(
+                isinstance(t, ast.Name) and t.id in wanted_names for t in node.targets):
+            body.append(node)
+        elif isinstance(node, ast.FunctionDef) and node.name in wanted_functions:
+            body.append(node)
+    namespace = {}
+    exec(compile(ast.Module(body=body, type_ignores=[]), STREAMLIT_APP, "exec"), namespace)
+    return namespace
+
+
+def make_target(target: str, stream: dict) -> tuple:
+    """Return ``(items, vouchers, price)`` where ``price(order)`` prices one order."""
+    if target == "cafe_app":
+        import cafe_app
+
+        items = [item["name"] for item in cafe_app.MENU]
+        vouchers = list(cafe_app.VOUCHERS) + ["NOT-A-CODE"]
+
+        def price(order):
+            cart, _, voucher = order
+            return cafe_app.calculate_totals(cart, voucher)["final_total"]
+
+    elif target == "final":
+        from benchmarks.bench_pricing_rules import make_menu
+        from pricing import compile_rules
+
+        random.seed(stream["seed"])
+        tables = compile_rules(make_menu(stream["menu_size"]))
+        items = list(tables.item_ids)
+        vouchers = [""]
+
+        def price(order):
+            cart, band, _ = order
+            return tables._price_order(tuple(cart.items()), band)["grand_total"]
+
+    elif target == "streamlit_app":
+        app = load_streamlit_app_pricing()
+        line_total, has_combo = app["line_total_with_discounts"], app["has_combo"]
+        items = list(app["VARIANTS"].names)
+        vouchers = [""]
+
+        def price(order):
+            cart, band, _ = order
+            combo = has_combo(cart)
+            return sum(line_total(item, qty, band, combo)[2] for item, qty in cart.items())
+
+    else:
+        raise ValueError(f"unknown target {target!r}, expected one of {TARGETS}")
+    return items, vouchers, price
+
+
+###############################################################################
+# Running shards
+###############################################################################
+
+
+_start_barrier = None
+
+
+def _init_worker(barrier) -> None:
+    global _start_barrier
+    _start_barrier = barrier
+
+
+def run_shard(target: str, stream: dict, shard: int, n_orders: int) -> dict:
+    """
+    Generate and price one shard.  Only the pricing is timed; in a pool, all
+    shards wait for each other before they start it.
+    """
+    items, vouchers, price = make_target(target, stream)
+    rng = random.Random(f"{stream['seed']}/{target}/{shard}")
+    orders = generate_orders(items, vouchers, stream, n_orders, rng)
+    if _start_barrier is not None:
+        _start_barrier.wait(timeout=600)
+    histogram = [0] * N_BUCKETS
+    # perf_counter is CLOCK_MONOTONIC, so stamps compare across processes
+    clock = time.perf_counter_ns
+    start = clock()
+    for order in orders:
+        t0 = clock()
+        price(order)
+        histogram[bucket_of(clock() - t0)] += 1
+    return {"orders": n_orders, "start": start, "end": clock(), "histogram": histogram}
+
+
+def summarize(shards) -> dict:
+    histogram = [sum(counts) for counts in zip(*(s["histogram"] for s in shards))]
+    orders = sum(s["orders"] for s in shards)
+    # From the first shard starting to the last one finishing
+    seconds = (max(s["end"] for s in shards) - min(s["start"] for s in shards)) / 1e9
+    return {
+        "orders": orders,
+        "seconds": seconds,
+        "orders_per_sec": orders / seconds,
+        "latency_us": {
+            "p50": quantile(histogram, 0.50),
+            "p90": quantile(histogram, 0.90),
+            "p99": quantile(histogram, 0.99),
+            "p999": quantile(histogram, 0.999),
+            "histogram": [[round(bucket_upper_ns(i) / 1000, 3), count]
+                          for i, count in enumerate(histogram) if count],
+        },
+    }
+
+
+def run_target(target: str, stream: dict, n_orders: int, worker_counts) -> list:
+    single = summarize([run_shard(target, stream, 0, n_orders)])
+    results = [dict(target=target, mode="single", workers=1, **single)]
+    for workers in worker_counts:
+        sizes = [n_orders // workers + (i < n_orders % workers) for i in range(workers)]
+        barrier = multiprocessing.Barrier(workers)
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(barrier,)) as pool:
+            shards = list(pool.map(run_shard, [target] * workers, [stream] * workers,
+                                   range(workers), sizes))
+        summary = summarize(shards)
+        speedup = summary["orders_per_sec"] / single["orders_per_sec"]
+        results.append(dict(target=target, mode="sharded", workers=workers, **summary,
+                            speedup=speedup, efficiency=speedup / workers))
+    return results
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--menu-size", type=int, default=20)
+    parser.add_argument("--max-lines", type=int, default=4)
+    parser.add_argument("--qty-dist", choices=("uniform", "geometric"), default="geometric")
+    parser.add_argument("--mean-qty", type=float, default=1.8)
+    parser.add_argument("--max-qty", type=int, default=10)
+    parser.add_argument("--band-mix", type=float, nargs=3, default=(0.4, 0.35, 0.25),
+                        metavar=("MORNING", "AFTERNOON", "EVENING"))
+    parser.add_argument("--voucher-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=16)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    stream = {
+        "seed": args.seed, "menu_size": args.menu_size, "max_lines": args.max_lines,
+        "qty_dist": args.qty_dist, "mean_qty": args.mean_qty, "max_qty": args.max_qty,
+        "band_mix": list(args.band_mix), "voucher_rate": args.voucher_rate,
+    }
+    report = {
+        "benchmark": "sharded_checkout",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "stream": stream,
+        "results": [],
+    }
+    for target in args.targets:
+        report["results"] += run_target(target, stream, args.orders, args.workers)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,141 @@
+"""
+Benchmark: pricing menu variants by walking option lists vs ``VariantCatalog``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_variants [n_combinations]
+
+Generates a menu of about ``n_combinations`` (default 50,000) variant
+combinations: items with three types (and plain) and the size, milk and
+extra shot modifiers of ``variants.MODIFIERS`` plus a four-way syrup, 384
+combinations per item.  Prints the build time and traced memory of
+``variants.VariantCatalog`` against a dict of every full name to its price,
+then the time to price one modified drink:
+
+* walk: find the item, then walk each option list for the chosen label and
+  add up the price differences, as the menu dicts would be read directly;
+* full-name dict: one lookup in the materialized dict;
+* ``VariantCatalog.resolve(item, options)``, then ``price(sku)``;
+* ``VariantCatalog.sku(name)`` then ``price(sku)``, first resolving each
+  name and then from the cache of resolved names (``variants.NAME_CACHE``);
+* ``price(sku)`` alone, for a SKU id the app already holds.
+"""
+
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+from money import to_cents
+from variants import MODIFIERS, VariantCatalog
+
+MODIFIERS_50K = {**MODIFIERS, "Syrup": {"No syrup": 0, "Vanilla syrup": 0.5,
+                                        "Caramel syrup": 0.5, "Hazelnut syrup": 0.6}}
+GROUPS = ("Size", "Milk", "Extra shot", "Syrup")
+TYPES = ("Hot", "Iced", "Decaf")
+PER_ITEM = (len(TYPES) + 1) * 3 * 4 * 2 * 4
+N_QUERIES = 5000
+
+
+def make_menu(rng, n_items) -> list:
+    return [{"Name": f"Drink {i}", "Price": rng.randint(2, 8),
+             "Category": rng.choice(("coffee", "tea", "juice")),
+             "Type": dict(zip(TYPES, (0, 0.5, 0.25))), "Modifiers": list(GROUPS)}
+            for i in range(n_items)]
+
+
+def in_cents(menu, modifiers):
+    # The menu with every price already in cents, so the walk pays no conversion
+    menu_by_name = {entry["Name"]: {**entry, "Price": to_cents(entry["Price"]),
+                                    "Type": {kind: to_cents(delta)
+                                             for kind, delta in entry["Type"].items()}}
+                    for entry in menu}
+    groups = {name: [(label, to_cents(delta)) for label, delta in options.items()]
+              for name, options in modifiers.items()}
+    return menu_by_name, groups
+
+
+def walk_price(menu_by_name, groups, item, type_, options) -> int:
+    # The nested lists read directly: every option list walked for its label
+    entry = menu_by_name[item]
+    price = entry["Price"]
+    if type_:
+        for kind, delta in entry["Type"].items():
+            if kind == type_:
+                price += delta
+    for group in entry["Modifiers"]:
+        for label, delta in groups[group]:
+            if label in options:
+                price += delta
+    return price
+
+
+def full_names(catalog) -> dict:
+    return {catalog.name(sku): catalog.prices[sku] for sku in range(len(catalog))}
+
+
+def traced(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, after - before
+
+
+def per_query_us(run, queries) -> float:
+    def loop():
+        for query in queries:
+            run(query)
+    return min(timeit.repeat(loop, number=5, repeat=5)) / 5 / len(queries) * 1e6
+
+
+def main(n_combinations: int = 50_000) -> None:
+    rng = random.Random(24)
+    n_items = -(-n_combinations // PER_ITEM)
+    menu = make_menu(rng, n_items)
+    catalog, build_s, catalog_bytes = traced(lambda: VariantCatalog(menu, MODIFIERS_50K))
+    names, names_s, names_bytes = traced(lambda: full_names(catalog))
+    print(f"{len(catalog):,} combinations of {n_items} items")
+    print(f"VariantCatalog: built in {build_s * 1e3:.0f} ms, {catalog_bytes / 2**20:.2f} MiB"
+          f" ({catalog_bytes / len(catalog):.1f} B per combination)")
+    print(f"full-name dict: built in {names_s * 1e3:.0f} ms, {names_bytes / 2**20:.2f} MiB"
+          f" ({names_bytes / len(catalog):.1f} B per combination)")
+
+    menu_by_name, groups = in_cents(menu, MODIFIERS_50K)
+    # Random drinks, as the name, the parts and the SKU id
+    skus = [rng.randrange(len(catalog)) for _ in range(N_QUERIES)]
+    queries = []
+    for sku in skus:
+        item_id, choices = catalog.decode(sku)
+        item_groups = catalog.groups[item_id]
+        type_ = item_groups[0].labels[choices[0]]
+        options = [group.labels[choice]
+                   for group, choice in zip(item_groups[1:], choices[1:]) if choice]
+        item = catalog.names[item_id]
+        queries.append((catalog.name(sku), item, type_, options,
+                        f"{type_} {item}" if type_ else item))
+    for sku, (name, item, type_, options, kind_item) in zip(skus, queries):
+        price = walk_price(menu_by_name, groups, item, type_, options)
+        assert price == names[name] == catalog.price(catalog.sku(name)) == catalog.price(sku)
+        assert catalog.resolve(kind_item, options) == sku
+
+    def sku_uncached(query):
+        catalog._resolved.clear()
+        return catalog.price(catalog.sku(query[0]))
+
+    print(f"{'walk':>8} {'dict':>8} {'resolve':>8} {'sku()':>8} {'cached':>8} {'price':>8}"
+          f"   (us per drink)")
+    print(f"{per_query_us(lambda q: walk_price(menu_by_name, groups, *q[1:4]), queries):>8.2f}"
+          f" {per_query_us(lambda q: names[q[0]], queries):>8.2f}"
+          f" {per_query_us(lambda q: catalog.price(catalog.resolve(q[4], q[3])), queries):>8.2f}"
+          f" {per_query_us(sku_uncached, queries):>8.2f}"
+          f" {per_query_us(lambda q: catalog.price(catalog.sku(q[0])), queries):>8.2f}"
+          f" {per_query_us(catalog.price, skus):>8.2f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+Benchmark: voucher store lookups at millions of codes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_vouchers [n_codes]
+
+Fills a ``VoucherStore`` in a temporary directory with ``n_codes`` random
+single-use codes (default 10M), reopens it as a till would, and reports:
+
+* lookup latency (p50 / p99) for valid codes from disk, valid codes from the
+  hot cache and invalid codes rejected by the Bloom filter;
+* redemptions per second;
+* resident memory of the process next to what a plain dict of the same
+  codes would need.
+"""
+
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from vouchers import VoucherStore
+
+SAMPLES = 20_000
+ALPHABET = string.ascii_uppercase + string.digits
+
+
+def rss_mib() -> float:
+    """Current resident set size of this process (Linux), in MiB."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def make_code(rng) -> str:
+    return "".join(rng.choices(ALPHABET, k=12))
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+
+def timed(fn, codes):
+    out = []
+    for code in codes:
+        start = time.perf_counter()
+        fn(code)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def main(n_codes: int = 10_000_000) -> None:
+    rng = random.Random(16)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vouchers.db")
+        sample = []
+
+        def codes():
+            for i in range(n_codes):
+                code = make_code(rng)
+                if i % (n_codes // SAMPLES or 1) == 0:
+                    sample.append(code)
+                yield code
+
+        start = time.perf_counter()
+        VoucherStore(path).add_codes(codes(), percent=15)
+        build_s = time.perf_counter() - start
+
+        store = VoucherStore(path)
+        rng.shuffle(sample)
+        cold = timed(store.lookup, sample[:SAMPLES // 2])
+        hot = timed(store.lookup, sample[:1000] * 10)
+        invalid = timed(store.lookup, [make_code(rng) + "X" for _ in range(SAMPLES)])
+        start = time.perf_counter()
+        redeemed = sum(store.redeem(code) is not None for code in sample[SAMPLES // 2:])
+        redeem_rate = len(sample[SAMPLES // 2:]) / (time.perf_counter() - start)
+        rss = rss_mib()
+
+        # A dict of the same codes: per-entry cost measured on a sample
+        probe = {make_code(rng): 15 for _ in range(100_000)}
+        per_entry = (sys.getsizeof(probe) + sum(sys.getsizeof(c) for c in probe)) / len(probe)
+
+        print(f"codes:            {n_codes:,} (built in {build_s:.1f} s)")
+        print(f"database:         {os.path.getsize(path) / 2**20:,.0f} MiB on disk")
+        print(f"bloom filter:     {len(store.bloom.bits) / 2**20:,.1f} MiB in memory")
+        print(f"process RSS:      {rss:,.0f} MiB after the lookups")
+        print(f"dict equivalent:  {per_entry * n_codes / 2**20:,.0f} MiB")
+        for name, timings in (("valid (disk)", cold), ("valid (hot)", hot),
+                              ("invalid", invalid)):
+            p50, p99 = percentiles(timings)
+            print(f"lookup {name:13} p50 {p50:7.1f} us   p99 {p99:7.1f} us")
+        print(f"redeem:           {redeem_rate:,.0f} codes/s ({redeemed:,} redeemed)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
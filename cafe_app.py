@@ -20,7 +20,9 @@ price after applying bulk discounts, voucher discounts and other promotions.
    ``st.number_input``.  Quantities are integers and defaults are zero.
 3. A text input allows the user to enter a voucher code.  Voucher codes
    are looked up in a dictionary where each code maps to a percentage
-   discount on the *subtotal*.
+   discount on the *subtotal*.  Large batches of single-use codes can be
+   kept in a voucher store (see vouchers.py) by pointing the
+   ``CAFE_VOUCHER_DB`` environment variable at its database file.
 4. The program applies a **bulk discount** for each item if the quantity
    meets a certain threshold.  In this example, buying three or more of
    the same item grants a 10 % discount on that item's cost.
@@ -36,7 +38,15 @@ to modify the thresholds, discount percentages and promotions to suit your
 own business scenario.
 """
 
-import streamlit as st
+import os
+from functools import lru_cache
+
+# Streamlit and NumPy are imported inside the functions that need them, so
+# batch jobs that only want ``calculate_totals`` start up in milliseconds.
+from catalog import Catalog
+from metrics import count, export_from_env, span, timed
+from money import BP_PER_UNIT, discounted, format_cents
+from promotions import Promotion, PromotionEngine, apply_stage
 
 ###############################################################################
 # Data definitions
@@ -51,6 +61,12 @@ MENU = [
     {"name": "Croissant", "price": 3.5},
 ]
 
+# All arithmetic is done in whole cents (see money.py), so the menu prices are
+# converted once here.  The catalog numbers the items in menu order (see
+# catalog.py), for compact carts and batches.
+CATALOG = Catalog.from_menu(MENU)
+PRICE_CENTS = dict(zip(CATALOG.names, CATALOG.prices))
+
 # Voucher codes map to percentage discounts.  The values represent the
 # percentage discount to be applied to the subtotal.  You can add more codes
 # or adjust the percentages here.
@@ -59,11 +75,44 @@ VOUCHERS = {
     "FRIEND5": 5,
 }
 
+# Environment variable naming the voucher store database for issued codes.
+VOUCHER_DB_ENV = "CAFE_VOUCHER_DB"
+
+# Environment variable naming the price list directory (see price_lists.py).
+# When it is set, the prices and voucher codes above are overridden by this
+# outlet's current price list.
+PRICE_LISTS_ENV = "CAFE_PRICE_LISTS"
+
+# Bulk discount: buying BULK_MIN_QTY or more of one item takes BULK_DISCOUNT_BP
+# basis points (1000 bp = 10 %) off that line.
+BULK_MIN_QTY = 3
+BULK_DISCOUNT_BP = 1000
+
+# Items that must all be in the cart for the combo promotion, and the flat
+# amount (in cents) it takes off the bill.
+COMBO_ITEMS = ("Coffee", "Muffin")
+COMBO_DISCOUNT = 100
+
+# Promotions taken off the bill after the voucher (see promotions.py).  Add
+# more order-stage promotions here; they are read once, when the first cart
+# is priced.
+PROMOTIONS = [
+    Promotion("Coffee & Muffin combo", "order", amount=COMBO_DISCOUNT, requires=COMBO_ITEMS),
+]
+
+# Columns of the receipt table as (header, field of pricing.LINE_FIELDS).
+RECEIPT_COLUMNS = (
+    ("Item", "item"),
+    ("Quantity", "qty"),
+    ("Unit Price", "unit"),
+    ("Total", "after_time_disc"),
+)
+
 ###############################################################################
 # Discount and promotion functions
 ###############################################################################
 
-def apply_bulk_discount(item_price: float, quantity: int) -> float:
+def apply_bulk_discount(item_price: int, quantity: int) -> int:
     """
     Apply a bulk discount on a single line item.
 
@@ -72,24 +121,52 @@ def apply_bulk_discount(item_price: float, quantity: int) -> float:
 
     Parameters
     ----------
-    item_price : float
-        The base price of the item (without any discount).
+    item_price : int
+        The base price of the item in cents (without any discount).
     quantity : int
         Number of units purchased.
 
     Returns
     -------
-    float
-        The total cost for the item after any bulk discount.
+    int
+        The total cost for the item in cents after any bulk discount, rounded
+        half up to the cent.
     """
     total = item_price * quantity
-    if quantity >= 3:
-        discount_rate = 0.10  # 10 %
-        total *= (1 - discount_rate)
+    if quantity >= BULK_MIN_QTY:
+        total = discounted(total, BULK_DISCOUNT_BP)
     return total
 
 
-def apply_voucher_discount(subtotal: float, code: str) -> float:
+def current_prices() -> tuple:
+    """
+    Return ``(price list version, {name: cents}, vouchers)`` to price one
+    order with.
+
+    Without a price list directory these are ``0``, ``PRICE_CENTS`` and
+    ``VOUCHERS``.  Otherwise they come from the current price list of this
+    outlet (``CAFE_OUTLET``): its prices for the items it lists, and its
+    voucher codes if it has any.  Take them once per order, so a reload in
+    the middle of pricing does not mix two price lists.
+    """
+    if not os.environ.get(PRICE_LISTS_ENV):
+        return 0, PRICE_CENTS, VOUCHERS
+    from price_lists import current_price_list
+
+    return price_list_prices(current_price_list())
+
+
+@lru_cache(maxsize=8)
+def price_list_prices(price_list) -> tuple:
+    """``current_prices`` for one ``PriceList``, worked out once per version."""
+    tables = price_list.tables
+    prices = {name: tables.unit_price(name) if name in tables.item_ids else cents
+              for name, cents in PRICE_CENTS.items()}
+    vouchers = VOUCHERS if price_list.vouchers is None else price_list.vouchers
+    return price_list.version, prices, vouchers
+
+
+def apply_voucher_discount(subtotal: int, code: str, vouchers: dict = None) -> int:
     """
     Apply a voucher discount based on a voucher code.
 
@@ -99,52 +176,133 @@ def apply_voucher_discount(subtotal: float, code: str) -> float:
 
     Parameters
     ----------
-    subtotal : float
-        The amount before the voucher is applied.
+    subtotal : int
+        The amount in cents before the voucher is applied.
     code : str
         The voucher code entered by the user.  Codes are case‑insensitive.
+    vouchers : dict, optional
+        Codes and their percentages; those of ``current_prices()`` by default.
 
     Returns
     -------
-    float
-        The new subtotal after applying the voucher discount.
+    int
+        The new subtotal in cents after applying the voucher discount.
+    """
+    return discounted(subtotal, voucher_bp(code, vouchers))
+
+
+def voucher_bp(code: str, vouchers: dict = None) -> int:
+    """
+    Return the discount for a voucher code in basis points (0 if invalid).
+
+    Codes are case-insensitive and surrounding spaces are ignored.  They are
+    looked up in ``vouchers`` (default: those of ``current_prices()``), then
+    in the voucher store.
     """
     if not code:
-        return subtotal
-    code = code.strip().upper()
-    discount_percent = VOUCHERS.get(code)
+        return 0
+    if vouchers is None:
+        vouchers = current_prices()[2]
+    discount_percent = vouchers.get(code.strip().upper())
+    if discount_percent is None:
+        store = voucher_store()
+        if store is not None:
+            discount_percent = store.lookup(code)
     if discount_percent:
-        return subtotal * (1 - discount_percent / 100)
-    return subtotal
+        return discount_percent * 100
+    return 0
+
+
+def voucher_store():
+    """Return the voucher store named by ``CAFE_VOUCHER_DB``, or None."""
+    path = os.environ.get(VOUCHER_DB_ENV)
+    if not path:
+        return None
+    from vouchers import open_store
+
+    return open_store(path)
+
+
+def redeem_voucher(code: str) -> bool:
+    """
+    Claim a voucher code for one order.
+
+    Codes in ``VOUCHERS`` (or the price list's codes, see ``current_prices``)
+    can be used any number of times.  Single-use codes from the voucher store
+    are marked as used; the function returns False if one has already been
+    used.  Unknown codes simply give no discount, so they also return True.
+    """
+    if not code or code.strip().upper() in current_prices()[2]:
+        return True
+    store = voucher_store()
+    if store is None or store.lookup(code) is None:
+        return True
+    return store.redeem(code) is not None
+
+
+def voucher_used(code: str) -> bool:
+    """Return True if ``code`` is a single-use code that has been redeemed."""
+    if not code or code.strip().upper() in current_prices()[2]:
+        return False
+    store = voucher_store()
+    return store is not None and store.is_redeemed(code)
+
+
+@lru_cache(maxsize=None)
+def promotion_engine() -> PromotionEngine:
+    """Return the engine for ``PROMOTIONS``, built once per process."""
+    return PromotionEngine(PRICE_CENTS, PROMOTIONS)
 
 
-def apply_combo_promotion(cart: dict) -> float:
+@lru_cache(maxsize=None)
+def order_rule_needs() -> tuple:
     """
-    Apply a promotion based on multiple items in the cart.
+    Return ``(rules, needs)`` for ``VoucherCart``: the order promotions in
+    priority order, and for each item the positions in ``rules`` of the
+    promotions that require it.
+    """
+    engine = promotion_engine()
+    rules = tuple(engine.order_rules(None, set(PRICE_CENTS), set(engine.categories.values())))
+    needs = {}
+    for position, rule in enumerate(rules):
+        for name in rule.requires:
+            needs.setdefault(name, []).append(position)
+    return rules, needs
+
+
+def apply_combo_promotion(cart: dict, subtotal: int = None) -> int:
+    """
+    Apply the promotions based on what is in the cart.
 
     In this example, if at least one Coffee and one Muffin are purchased,
     deduct a fixed $1 as a combo promotion.  Additional combos do not stack.
+    Only the promotions triggered by items in the cart are looked at.
 
     Parameters
     ----------
     cart : dict
         A dictionary mapping item names to quantities.
+    subtotal : int, optional
+        The amount in cents the promotions are taken off (after the voucher).
+        Defaults to the cart at menu prices.  A promotion never takes off
+        more than this.
 
     Returns
     -------
-    float
-        The total promotion discount (a positive number representing money
-        taken off the subtotal).
+    int
+        The total promotion discount in cents (a positive number representing
+        money taken off the subtotal).
     """
-    if cart.get("Coffee", 0) >= 1 and cart.get("Muffin", 0) >= 1:
-        return 1.0  # flat $1 discount
-    return 0.0
+    if subtotal is None:
+        subtotal = sum(PRICE_CENTS[name] * qty for name, qty in cart.items() if qty > 0)
+    return promotion_engine().order_discount(cart, subtotal)
 
 
 ###############################################################################
 # Calculation logic
 ###############################################################################
 
+@timed("cafe_app.calculate_totals")
 def calculate_totals(cart: dict, voucher_code: str) -> dict:
     """
     Calculate the subtotal, discounts and final total for the current cart.
@@ -159,34 +317,36 @@ def calculate_totals(cart: dict, voucher_code: str) -> dict:
     Returns
     -------
     dict
-        A dictionary containing the subtotal, bulk_discounted_total,
-        voucher_discounted_total, promo_discount, final_total and an itemized
-        breakdown for display.
+        A dictionary containing the bulk_total, after_voucher,
+        promo_discount, final_total and an itemized breakdown for display.
+        All amounts are in cents.  ``price_list`` is the version of the
+        price list used (0 for the built-in prices).
     """
+    version, prices, vouchers = current_prices()
     # Calculate line item totals (with bulk discounts)
     line_items = []
-    bulk_total = 0.0
+    bulk_total = 0
     for item in MENU:
         name = item["name"]
-        price = item["price"]
+        price = prices[name]
         qty = cart.get(name, 0)
         if qty > 0:
-            discounted = apply_bulk_discount(price, qty)
+            line_total = apply_bulk_discount(price, qty)
             line_items.append(
                 {
                     "name": name,
                     "qty": qty,
                     "unit_price": price,
-                    "total": discounted,
+                    "total": line_total,
                 }
             )
-            bulk_total += discounted
+            bulk_total += line_total
 
     # Apply voucher discount
-    after_voucher = apply_voucher_discount(bulk_total, voucher_code)
+    after_voucher = apply_voucher_discount(bulk_total, voucher_code, vouchers)
 
     # Calculate promotion discount (flat amount)
-    promo_discount = apply_combo_promotion(cart)
+    promo_discount = apply_combo_promotion(cart, after_voucher)
     final_total = after_voucher - promo_discount
 
     return {
@@ -195,77 +355,376 @@ def calculate_totals(cart: dict, voucher_code: str) -> dict:
         "after_voucher": after_voucher,
         "promo_discount": promo_discount,
         "final_total": final_total,
+        "price_list": version,
+    }
+
+
+###############################################################################
+# Incremental cart
+###############################################################################
+
+class VoucherCart:
+    """
+    A cart that keeps its totals up to date as quantities change.
+
+    ``calculate_totals`` reprices every line on each call.  This cart instead
+    updates one line and the running bulk total per ``set_qty`` call, so a
+    change costs the same whatever the size of the order.  ``totals``
+    returns the same dictionary as ``calculate_totals``; if the price list
+    changed since the lines were priced, it reprices them first.
+
+    Combo eligibility is kept the same way as in ``pricing.BandCart``: for
+    each order promotion, a count of its required items (Coffee and Muffin
+    for the combo) that are in the cart, updated only when an item's
+    quantity goes from zero to non-zero or back.  ``totals`` only evaluates
+    the promotions whose items are all there.
+    """
+
+    def __init__(self):
+        self.qty = {}
+        self.line_totals = {}
+        self.bulk_total = 0
+        self.units = 0
+        self.price_list, self.prices, _ = current_prices()
+        self._rules, self._needs = order_rule_needs()
+        self._present = [0] * len(self._rules)  # required items in the cart, per rule
+
+    def set_qty(self, name: str, qty: int) -> None:
+        """Set the quantity of menu item ``name`` and update the totals."""
+        old = self.qty.get(name, 0)
+        if qty == old:
+            return
+        self.units += qty - old
+        if (old > 0) != (qty > 0):
+            step = 1 if qty > 0 else -1
+            for position in self._needs.get(name, ()):
+                self._present[position] += step
+        self.bulk_total -= self.line_totals.pop(name, 0)
+        if qty > 0:
+            self.qty[name] = qty
+            self.line_totals[name] = apply_bulk_discount(self.prices[name], qty)
+            self.bulk_total += self.line_totals[name]
+        else:
+            self.qty.pop(name, None)
+
+    def add(self, name: str, delta: int) -> None:
+        """Change the quantity of ``name`` by ``delta``."""
+        self.set_qty(name, max(0, self.qty.get(name, 0) + delta))
+
+    @timed("cafe_app.cart_totals")
+    def totals(self, voucher_code: str) -> dict:
+        """Return the same dictionary as ``calculate_totals``."""
+        version, prices, vouchers = current_prices()
+        if prices is not self.prices:
+            self.price_list, self.prices = version, prices
+            self.line_totals = {name: apply_bulk_discount(prices[name], qty)
+                                for name, qty in self.qty.items()}
+            self.bulk_total = sum(self.line_totals.values())
+        after_voucher = apply_voucher_discount(self.bulk_total, voucher_code, vouchers)
+        eligible = [rule for rule, present in zip(self._rules, self._present)
+                    if present == len(rule.requires)]
+        promo_discount = 0
+        if eligible:
+            categories = promotion_engine().categories
+            promo_discount = apply_stage(
+                eligible, after_voucher, self.units, None, self.qty.keys(),
+                {categories[name] for name in self.qty if name in categories}, [],
+            )
+        return {
+            "line_items": [
+                {
+                    "name": item["name"],
+                    "qty": self.qty[item["name"]],
+                    "unit_price": prices[item["name"]],
+                    "total": self.line_totals[item["name"]],
+                }
+                for item in MENU
+                if item["name"] in self.qty
+            ],
+            "bulk_total": self.bulk_total,
+            "after_voucher": after_voucher,
+            "promo_discount": promo_discount,
+            "final_total": after_voucher - promo_discount,
+            "price_list": version,
+        }
+
+
+###############################################################################
+# Batch calculation (columnar carts)
+###############################################################################
+
+def encode_voucher_column(codes) -> tuple:
+    """
+    Dictionary-encode a column of voucher codes for ``calculate_totals_batch``.
+
+    Each distinct code is stored once and every cart refers to it by index,
+    so the (comparatively slow) string handling is done once per distinct
+    code rather than once per cart.
+
+    Parameters
+    ----------
+    codes : sequence of str
+        The voucher code entered for each cart.  Empty strings and ``None``
+        mean "no voucher".
+
+    Returns
+    -------
+    tuple
+        ``(voucher_ids, distinct_codes)`` where ``voucher_ids`` is an integer
+        array with one entry per cart and ``distinct_codes`` is a list of the
+        codes it indexes into.
+    """
+    import numpy as np
+
+    index = {}
+    voucher_ids = np.fromiter(
+        (index.setdefault(code, len(index)) for code in codes),
+        dtype=np.intp,
+        count=len(codes),
+    )
+    return voucher_ids, list(index)
+
+
+def _percent_of(cents, bp):
+    # Vectorized money.percent_of for non-negative amounts: round half up.
+    return (cents * bp + BP_PER_UNIT // 2) // BP_PER_UNIT
+
+
+def calculate_totals_batch(quantities, voucher_ids=None, voucher_codes=()) -> dict:
+    """
+    Calculate totals for many carts at once.
+
+    This gives exactly the same numbers as calling ``calculate_totals`` on
+    each cart in turn (the same integer cent arithmetic and rounding), but
+    works on whole columns with NumPy instead of one cart dictionary at a
+    time.  Use it to replay a day's worth of orders.
+
+    Parameters
+    ----------
+    quantities : array_like of int, shape (n_carts, len(MENU))
+        Quantity of each menu item per cart.  Columns follow the order of
+        ``MENU``, as in ``CartArray(CATALOG).quantities()``.
+    voucher_ids : array_like of int, optional
+        Per-cart index into ``voucher_codes`` (see ``encode_voucher_column``).
+        Omit it if no cart used a voucher.
+    voucher_codes : sequence of str
+        The distinct voucher codes referred to by ``voucher_ids``.
+
+    Returns
+    -------
+    dict
+        Integer arrays of length ``n_carts`` (amounts in cents) under the keys
+        bulk_total, after_voucher, promo_discount and final_total.
+    """
+    import numpy as np
+
+    qty = np.asarray(quantities, dtype=np.int64)
+    if qty.ndim != 2 or qty.shape[1] != len(MENU):
+        raise ValueError(
+            f"quantities must have shape (n_carts, {len(MENU)}), got {qty.shape}"
+        )
+
+    _, prices, vouchers = current_prices()
+    # Line totals with bulk discounts, summed column by column in MENU order
+    bulk_total = np.zeros(len(qty), dtype=np.int64)
+    for col, item in enumerate(MENU):
+        q = qty[:, col]
+        line = prices[item["name"]] * q
+        bp = np.where(q >= BULK_MIN_QTY, BULK_DISCOUNT_BP, 0)
+        bulk_total += line - _percent_of(line, bp)
+
+    # Voucher discount: one rate per distinct code
+    if voucher_ids is None:
+        after_voucher = bulk_total.copy()
+    else:
+        rates = np.array([voucher_bp(code, vouchers) for code in voucher_codes] or [0])
+        after_voucher = bulk_total - _percent_of(
+            bulk_total, rates[np.asarray(voucher_ids)]
+        )
+
+    promo_discount = _order_promotions_batch(qty, after_voucher)
+
+    return {
+        "bulk_total": bulk_total,
+        "after_voucher": after_voucher,
+        "promo_discount": promo_discount,
+        "final_total": after_voucher - promo_discount,
     }
 
 
+def _order_promotions_batch(qty, subtotal):
+    # promotions.apply_stage over whole columns: every order promotion is
+    # tried on every cart, in the engine's priority order.
+    import numpy as np
+
+    engine = promotion_engine()
+    names = [item["name"] for item in MENU]
+    present = qty > 0
+    units = qty.sum(axis=1)
+    left = subtotal.copy()
+    done = np.zeros(len(qty), dtype=bool)      # a non-stackable rule applied
+    stacking = np.zeros(len(qty), dtype=bool)  # a stackable rule applied
+    for rule in engine.order_rules(None, set(names), set(engine.categories.values())):
+        met = (units >= rule.min_qty) & ~done
+        if not rule.stackable:
+            met &= ~stacking
+        for name in rule.requires:
+            if name not in names:
+                met[:] = False
+                break
+            met &= present[:, names.index(name)]
+        for cat in rule.requires_categories:
+            cols = [i for i, name in enumerate(names) if engine.categories.get(name) == cat]
+            met &= present[:, cols].any(axis=1) if cols else False
+        if rule.amount is not None:
+            off = np.minimum(rule.amount, left)
+        else:
+            off = _percent_of(left, rule.bp)
+        left -= np.where(met, off, 0)
+        if rule.stackable:
+            stacking |= met
+        else:
+            done |= met
+    return subtotal - left
+
+
+def receipt_lines(result: dict) -> list:
+    """
+    Return the lines of a ``calculate_totals`` result as tuples in
+    ``pricing.LINE_FIELDS`` order, for receipts.py.  There is no time-band
+    discount here, so the last three amounts are all the bulk-discounted
+    line total.
+    """
+    lines = []
+    for item in result["line_items"]:
+        raw = item["unit_price"] * item["qty"]
+        lines.append((item["name"], item["qty"], item["unit_price"], raw,
+                      raw - item["total"], item["total"], 0, item["total"]))
+    return lines
+
+
+@lru_cache(maxsize=None)
+def receipt_renderer():
+    """Return the renderer for the receipt table, built once per process."""
+    from receipts import ReceiptRenderer
+
+    return ReceiptRenderer(RECEIPT_COLUMNS, "S$")
+
+
+def record_order(result: dict, voucher_code: str) -> int:
+    """
+    Append a result from ``calculate_totals`` to the order journal.
+
+    Returns the order id.  See journal.py for the file format.
+    """
+    from journal import shared_journal
+
+    lines = []
+    for item in result["line_items"]:
+        raw = item["unit_price"] * item["qty"]
+        lines.append(
+            (item["name"], item["qty"], item["unit_price"], raw, raw - item["total"], 0,
+             item["total"])
+        )
+    total_raw = sum(line[3] for line in lines)
+    return shared_journal().append(
+        lines,
+        voucher=voucher_code if voucher_bp(voucher_code) else "",
+        price_list=result.get("price_list", 0),
+        total_raw=total_raw,
+        bulk_disc=total_raw - result["bulk_total"],
+        voucher_disc=result["bulk_total"] - result["after_voucher"],
+        promo_disc=result["promo_discount"],
+        grand_total=result["final_total"],
+    )
+
+
 ###############################################################################
 # Streamlit user interface
 ###############################################################################
 
+@timed("cafe_app.rerun")
 def main() -> None:
     """Run the Streamlit app."""
+    import streamlit as st
+
+    export_from_env()
+
     st.set_page_config(page_title="Cafe POS Calculator", page_icon="☕")
     st.title("☕ Café POS Calculator – Discounts & Promotions")
     st.write(
         "Enter the quantity for each item, choose a voucher code if you have one,"
         " and click *Calculate* to see your total with discounts applied."
+        " *Checkout* records the order."
     )
 
-    # Initialize an empty cart
-    cart = {}
+    # The cart lives in the session and is updated one item at a time.  A
+    # checkout starts the next order: a new cart, and inputs keyed by the
+    # order number, so the recorded cart cannot be changed or recorded again
+    if "cart" not in st.session_state:
+        st.session_state.cart = VoucherCart()
+        st.session_state.order_no = 0
+    cart = st.session_state.cart
+    order_no = st.session_state.order_no
 
     # Layout: each item appears with a number input for quantity
-    st.header("Menu Items")
-    for item in MENU:
-        qty = st.number_input(
-            f"{item['name']} (S${item['price']:.2f})",
-            min_value=0,
-            step=1,
-            key=item["name"],
-        )
-        cart[item["name"]] = int(qty)
+    with span("cafe_app.render.menu"):
+        st.header("Menu Items")
+        for item in MENU:
+            qty = st.number_input(
+                f"{item['name']} ({format_cents(PRICE_CENTS[item['name']], 'S$')})",
+                min_value=0,
+                step=1,
+                key=f"{item['name']}#{order_no}",
+            )
+            cart.set_qty(item["name"], int(qty))
 
     # Voucher input
-    voucher_code = st.text_input("Voucher code (optional)")
-
-    # Calculate button
-    if st.button("Calculate"):
-        result = calculate_totals(cart, voucher_code)
+    voucher_code = st.text_input("Voucher code (optional)", key=f"voucher#{order_no}")
+
+    # Calculate prices the cart; only Checkout journals it
+    calculate, checkout = st.columns(2)
+    calculate = calculate.button("Calculate")
+    checkout = checkout.button("Checkout")
+    if calculate or checkout:
+        result = cart.totals(voucher_code)
         if not result["line_items"]:
             st.info("Please add at least one item to your cart.")
         else:
-            st.subheader("Receipt")
-            # Display itemized table
-            receipt_rows = []
-            for item in result["line_items"]:
-                receipt_rows.append(
-                    [
-                        item["name"],
-                        str(item["qty"]),
-                        f"S${item['unit_price']:.2f}",
-                        f"S${item['total']:.2f}",
-                    ]
-                )
-            st.table(
-                {
-                    "Item": [row[0] for row in receipt_rows],
-                    "Quantity": [row[1] for row in receipt_rows],
-                    "Unit Price": [row[2] for row in receipt_rows],
-                    "Total": [row[3] for row in receipt_rows],
-                }
-            )
-            # Show summary
-            st.write(f"**Subtotal (after bulk discounts):** S${result['bulk_total']:.2f}")
-            if voucher_code and result["bulk_total"] != result["after_voucher"]:
+            # Calculate only checks a single-use code; Checkout claims it
+            # for the order it records
+            if voucher_used(voucher_code) or (checkout and not redeem_voucher(voucher_code)):
+                count("cafe_app.vouchers_refused")
+                st.warning(f"Voucher '{voucher_code.strip().upper()}' has already been used.")
+                voucher_code = ""
+                result = cart.totals(voucher_code)
+            if checkout:
+                order_id = record_order(result, voucher_code)
+                count("cafe_app.orders")
+                st.session_state.cart = VoucherCart()
+                st.session_state.order_no = order_no + 1
+                st.caption(f"Order #{order_id} recorded; the next order starts empty.")
+            with span("cafe_app.render.receipt"):
+                st.subheader("Receipt")
+                # Display itemized table, formatted straight from the result
+                st.markdown(receipt_renderer().html(receipt_lines(result)), unsafe_allow_html=True)
+                # Show summary
                 st.write(
-                    f"**After voucher '{voucher_code.upper()}':** S${result['after_voucher']:.2f}"
+                    f"**Subtotal (after bulk discounts):** {format_cents(result['bulk_total'], 'S$')}"
                 )
-            if result["promo_discount"] > 0:
-                st.write(
-                    f"**Combo promotion discount:** -S${result['promo_discount']:.2f}"
+                if voucher_code and result["bulk_total"] != result["after_voucher"]:
+                    st.write(
+                        f"**After voucher '{voucher_code.upper()}':** "
+                        f"{format_cents(result['after_voucher'], 'S$')}"
+                    )
+                if result["promo_discount"] > 0:
+                    st.write(
+                        f"**Combo promotion discount:** -{format_cents(result['promo_discount'], 'S$')}"
+                    )
+                st.markdown("---")
+                st.success(
+                    f"**Final total payable:** {format_cents(result['final_total'], 'S$')}"
                 )
-            st.markdown("---")
-            st.success(f"**Final total payable:** S${result['final_total']:.2f}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""
+Open carts
+----------
+
+The apps keep one cart per browser session in ``st.session_state``.  A busy
+counter needs one terminal to hold many open orders at once (tabs, tables,
+a catering order being built up over the afternoon), and several cashiers
+may touch the same order.  ``CartRegistry`` holds every open order of a
+process, keyed by order id.
+
+Each order's quantities are one ``array('H')`` indexed by SKU id (two bytes
+per menu item, see catalog.py), published copy-on-write: a change takes the
+order's lock, copies the vector, edits the copy and swaps it in with one
+assignment.  Reading an order therefore takes no lock at all and always
+sees a whole cart.  Orders share ``LOCK_STRIPES`` locks by order id rather
+than having one each, which keeps an open order small; cashiers on
+different orders only wait for each other when their orders share a stripe
+and they change them at the same moment.  The registry lock is only taken
+to open, close or evict orders; looking an order up is a plain dictionary
+read.
+
+Orders left untouched for ``idle_seconds`` are evicted, checked at most
+every ``sweep_seconds`` when an order is opened (or by calling
+``evict_idle``).
+"""
+
+import itertools
+import threading
+import time
+from functools import lru_cache
+
+from catalog import MAX_QTY, Cart, Catalog
+
+IDLE_SECONDS = 4 * 3600.0  # an open order untouched this long is dropped
+SWEEP_SECONDS = 60.0
+LOCK_STRIPES = 64
+MAX_ORDER_QTY = 999  # largest quantity the apps let a cashier enter per item
+
+
+class OpenOrder:
+    """
+    One open order.  ``state`` is ``(version, quantity vector)``; the vector
+    is never changed once published, changes go through the registry.
+    """
+
+    __slots__ = ("order_id", "label", "state", "touched", "closed")
+
+    def __init__(self, order_id: int, label, qty, now: float):
+        self.order_id = order_id
+        self.label = label
+        self.state = (0, qty)
+        self.touched = now
+        self.closed = False
+
+    @property
+    def name(self) -> str:
+        """The label, or "Order <id>" if it has none."""
+        return self.label or f"Order {self.order_id}"
+
+    @property
+    def version(self) -> int:
+        return self.state[0]
+
+
+class CartRegistry:
+    """
+    The open orders of a process, safe to use from any number of threads.
+
+    Parameters
+    ----------
+    catalog : Catalog
+        The items the carts hold.
+    idle_seconds, sweep_seconds : float
+        Idle orders are evicted after ``idle_seconds``, looked for at most
+        every ``sweep_seconds``.
+    clock : callable
+        Returns the current time in seconds; ``time.monotonic`` by default.
+    """
+
+    def __init__(self, catalog: Catalog, idle_seconds: float = IDLE_SECONDS,
+                 sweep_seconds: float = SWEEP_SECONDS, clock=time.monotonic):
+        self.catalog = catalog
+        self.idle_seconds = idle_seconds
+        self.sweep_seconds = sweep_seconds
+        self.clock = clock
+        self.orders = {}  # order id -> OpenOrder
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._last_sweep = clock()
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self.orders
+
+    def open(self, label: str = None, quantities: dict = None) -> int:
+        """Open an order, optionally filled from ``{name: qty}``; returns its id."""
+        now = self.clock()
+        if now - self._last_sweep >= self.sweep_seconds:
+            self.evict_idle(now)
+        qty = self.catalog.cart(quantities).qty
+        with self._lock:
+            order_id = next(self._ids)
+            self.orders[order_id] = OpenOrder(order_id, label, qty, now)
+        return order_id
+
+    def get(self, order_id: int) -> OpenOrder:
+        """Return the open order ``order_id`` (no lock taken)."""
+        try:
+            return self.orders[order_id]
+        except KeyError:
+            raise ValueError(f"no open order {order_id}") from None
+
+    def cart(self, order_id: int) -> Cart:
+        """Return the current cart of ``order_id`` (no lock taken; do not change it)."""
+        return Cart(self.catalog, self.get(order_id).state[1])
+
+    def open_orders(self) -> list:
+        """Return the open orders, oldest first."""
+        return sorted(list(self.orders.values()), key=lambda order: order.order_id)
+
+    def update(self, order_id: int, quantities: dict = None, deltas: dict = None) -> int:
+        """
+        Set the quantities in ``quantities`` and add the ones in ``deltas``
+        (clamped to 0..``MAX_QTY``), as one change.  Returns the new version.
+        """
+        order = self.get(order_id)
+        catalog = self.catalog
+        with self._stripes[order_id % LOCK_STRIPES]:
+            if order.closed:
+                raise ValueError(f"no open order {order_id}")
+            version, qty = order.state
+            qty = qty[:]
+            for name, n in (quantities or {}).items():
+                if not 0 <= n <= MAX_QTY:
+                    raise ValueError(f"quantity for {name!r} must be between 0 and {MAX_QTY}")
+                qty[catalog.sku(name)] = n
+            for name, delta in (deltas or {}).items():
+                sku = catalog.sku(name)
+                qty[sku] = min(MAX_QTY, max(0, qty[sku] + delta))
+            # One assignment: readers see the old cart or the new one, never half
+            order.state = (version + 1, qty)
+            order.touched = self.clock()
+            return version + 1
+
+    def set_qty(self, order_id: int, name: str, qty: int) -> int:
+        """Set the quantity of ``name`` in ``order_id``; returns the new version."""
+        return self.update(order_id, quantities={name: qty})
+
+    def add(self, order_id: int, name: str, delta: int) -> int:
+        """Change the quantity of ``name`` in ``order_id`` by ``delta``."""
+        return self.update(order_id, deltas={name: delta})
+
+    def close(self, order_id: int) -> Cart:
+        """Remove ``order_id`` and return its final cart."""
+        order = self.get(order_id)
+        with self._stripes[order_id % LOCK_STRIPES]:
+            if order.closed:
+                raise ValueError(f"no open order {order_id}")
+            order.closed = True
+        self._remove([order_id])
+        return Cart(self.catalog, order.state[1])
+
+    def evict_idle(self, now: float = None) -> list:
+        """Remove the orders idle for ``idle_seconds``; returns their ids."""
+        if now is None:
+            now = self.clock()
+        self._last_sweep = now
+        evicted = []
+        for order in list(self.orders.values()):
+            if now - order.touched < self.idle_seconds:
+                continue
+            with self._stripes[order.order_id % LOCK_STRIPES]:
+                # Checked again: it may have changed while we waited
+                if not order.closed and now - order.touched >= self.idle_seconds:
+                    order.closed = True
+                    evicted.append(order.order_id)
+        self._remove(evicted)
+        return evicted
+
+    def _remove(self, order_ids) -> None:
+        if not order_ids:
+            return
+        with self._lock:
+            for order_id in order_ids:
+                self.orders.pop(order_id, None)
+
+
+@lru_cache(maxsize=None)
+def shared_registry(catalog: Catalog) -> CartRegistry:
+    """
+    Return the process-wide registry of open orders for ``catalog``.
+
+    Streamlit re-executes the app script on every rerun, but imported modules
+    stay loaded, so every session of a server sees the same open orders.
+    """
+    return CartRegistry(catalog)
@@ -0,0 +1,319 @@
+"""
+Compact catalog and carts
+-------------------------
+
+The apps describe their menus as lists of dicts (``{'Name': 'Coffee',
+'Price': 3}`` in ``Final.py`` and ``pricing.py``, ``{"name": "Coffee",
+"price": 4.5}`` in ``cafe_app.py``) and carts as dicts of item name to
+quantity.  That is convenient for a handful of items, but every cart and every
+receipt row is a hash table of its own.
+
+A ``Catalog`` numbers the menu items 0..n-1 (the *SKU id*, in menu order) and
+keeps their prices in cents in an ``array('i')`` and their categories as small
+integer codes, so the whole menu is three flat arrays and one name index:
+
+* a ``Cart`` is a quantity vector (``array('H')``) indexed by SKU id;
+* a ``CartArray`` packs many carts into one vector, ``len(catalog)``
+  quantities per cart, ready for ``cafe_app.calculate_totals_batch``;
+* a ``LineItem`` is one priced line with ``__slots__`` instead of a dict.
+
+``Catalog.from_menu`` reads any of the apps' menu formats, and
+``pricing.compile_rules`` builds one for its tables, so SKU ids match
+``PricingTables.item_ids`` (see ``PricingTables.price_cart_vector``).
+
+``MenuIndex`` finds items by exact or normalized name (including variants
+such as "Mocha Coffee") with hash lookups, and by name prefix for a search
+box, so neither gets slower as the menu grows.  ``variants.VariantCatalog``
+resolves item and type names through it.
+"""
+
+from array import array
+from bisect import bisect_left
+
+MAX_QTY = 0xFFFF  # quantities are stored as unsigned 16-bit integers
+
+
+class Catalog:
+    """
+    Menu items by SKU id.
+
+    Parameters
+    ----------
+    names : sequence of str
+        Item names; an item's position is its SKU id.
+    prices : sequence of int
+        Prices in cents.
+    categories : sequence of str, optional
+        The category of each item.  Defaults to no category ("").
+    """
+
+    __slots__ = ("names", "ids", "prices", "category_codes", "category_names")
+
+    def __init__(self, names, prices, categories=None):
+        self.names = tuple(names)
+        self.ids = {name: sku for sku, name in enumerate(self.names)}
+        if len(self.ids) != len(self.names):
+            raise ValueError("item names must be unique")
+        self.prices = array("i", prices)
+        if len(self.prices) != len(self.names):
+            raise ValueError("need one price per item")
+        if categories is None:
+            categories = [""] * len(self.names)
+        codes = {}
+        self.category_codes = array("H", (codes.setdefault(c, len(codes)) for c in categories))
+        if len(self.category_codes) != len(self.names):
+            raise ValueError("need one category per item")
+        self.category_names = tuple(codes)
+
+    @classmethod
+    def from_menu(cls, menu) -> "Catalog":
+        """
+        Build a catalog from a menu list as used by the apps.
+
+        Entries may use ``Name``/``Price``/``Category`` or
+        ``name``/``price``/``category`` keys; prices are in dollars.  Other
+        keys (such as ``Type``) are ignored.
+        """
+        from money import to_cents
+
+        names, prices, categories = [], [], []
+        for entry in menu:
+            names.append(entry["Name"] if "Name" in entry else entry["name"])
+            prices.append(to_cents(entry["Price"] if "Price" in entry else entry["price"]))
+            categories.append(entry.get("Category", entry.get("category", "")))
+        return cls(names, prices, categories)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.ids
+
+    def sku(self, name: str) -> int:
+        """Return the SKU id of ``name``."""
+        try:
+            return self.ids[name]
+        except KeyError:
+            raise ValueError(f"not on the menu: {name!r}") from None
+
+    def price(self, name: str) -> int:
+        """Return the price of ``name`` in cents."""
+        return self.prices[self.sku(name)]
+
+    def category(self, name: str) -> str:
+        """Return the category of ``name``."""
+        return self.category_names[self.category_codes[self.sku(name)]]
+
+    def cart(self, quantities: dict = None) -> "Cart":
+        """Return a new cart, optionally filled from ``{name: qty}``."""
+        cart = Cart(self)
+        if quantities:
+            for name, qty in quantities.items():
+                cart.set_qty(name, qty)
+        return cart
+
+
+class Cart:
+    """
+    Quantities of each catalog item, as one ``array('H')`` indexed by SKU id.
+
+    Quantities must be between 0 and ``MAX_QTY``.
+    """
+
+    __slots__ = ("catalog", "qty")
+
+    def __init__(self, catalog: Catalog, qty: array = None):
+        self.catalog = catalog
+        self.qty = array("H", bytes(2 * len(catalog))) if qty is None else qty
+
+    def set_qty(self, name: str, qty: int) -> None:
+        """Set the quantity of ``name``."""
+        if not 0 <= qty <= MAX_QTY:
+            raise ValueError(f"quantity for {name!r} must be between 0 and {MAX_QTY}")
+        self.qty[self.catalog.sku(name)] = qty
+
+    def add(self, name: str, delta: int) -> None:
+        """Change the quantity of ``name`` by ``delta``."""
+        sku = self.catalog.sku(name)
+        self.qty[sku] = min(MAX_QTY, max(0, self.qty[sku] + delta))
+
+    def __getitem__(self, name: str) -> int:
+        return self.qty[self.catalog.sku(name)]
+
+    def items(self):
+        """Yield ``(name, qty)`` for every item in the cart, in menu order."""
+        names = self.catalog.names
+        for sku, qty in enumerate(self.qty):
+            if qty:
+                yield names[sku], qty
+
+    def order(self) -> tuple:
+        """Return the cart as ``(name, qty)`` pairs for ``PricingTables.price_order``."""
+        return tuple(self.items())
+
+    def as_dict(self) -> dict:
+        """Return the cart as ``{name: qty}``."""
+        return dict(self.items())
+
+
+class CartArray:
+    """
+    Many carts over one catalog, packed into a single ``array('H')``.
+
+    Cart *i* is the slice ``qty[i * len(catalog):(i + 1) * len(catalog)]``,
+    so a million carts of a 4-item menu take 8 MB and no Python object per
+    cart.
+    """
+
+    __slots__ = ("catalog", "qty", "_width")
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self.qty = array("H")
+        self._width = len(catalog)
+
+    def __len__(self) -> int:
+        return len(self.qty) // self._width if self._width else 0
+
+    def append(self, quantities) -> int:
+        """Add a cart (a ``Cart`` or ``{name: qty}``) and return its index."""
+        if isinstance(quantities, Cart):
+            if quantities.catalog is not self.catalog:
+                raise ValueError("cart is for another catalog")
+            self.qty.extend(quantities.qty)
+        else:
+            self.qty.extend(self.catalog.cart(quantities).qty)
+        return len(self) - 1
+
+    def __getitem__(self, index: int) -> Cart:
+        if not -len(self) <= index < len(self):
+            raise IndexError("cart index out of range")
+        start = (index % len(self)) * self._width
+        return Cart(self.catalog, self.qty[start:start + self._width])
+
+    def quantities(self):
+        """Return the carts as an ``(n_carts, len(catalog))`` NumPy view."""
+        import numpy as np
+
+        return np.frombuffer(self.qty, dtype=np.uint16).reshape(len(self), self._width)
+
+
+class LineItem:
+    """
+    One priced cart line, in cents.
+
+    The fields are those of ``pricing.LINE_FIELDS`` with the item given by
+    its SKU id.
+    """
+
+    __slots__ = ("sku", "qty", "unit", "raw", "bulk_disc", "before_time_disc",
+                 "time_disc", "after_time_disc")
+
+    def __init__(self, sku, qty, unit, raw, bulk_disc, before_time_disc, time_disc,
+                 after_time_disc):
+        self.sku = sku
+        self.qty = qty
+        self.unit = unit
+        self.raw = raw
+        self.bulk_disc = bulk_disc
+        self.before_time_disc = before_time_disc
+        self.time_disc = time_disc
+        self.after_time_disc = after_time_disc
+
+    def as_dict(self, catalog: Catalog) -> dict:
+        """Return the line as a ``pricing.price_cart`` receipt row."""
+        return {
+            "item": catalog.names[self.sku], "qty": self.qty, "unit": self.unit,
+            "raw": self.raw, "bulk_disc": self.bulk_disc,
+            "before_time_disc": self.before_time_disc, "time_disc": self.time_disc,
+            "after_time_disc": self.after_time_disc,
+        }
+
+
+def normalize_name(name: str) -> str:
+    """Case-fold ``name`` and collapse its whitespace, for lookups."""
+    return " ".join(name.casefold().split())
+
+
+class MenuIndex:
+    """
+    Name lookup and prefix search over a catalog and its variants.
+
+    Parameters
+    ----------
+    catalog : Catalog
+    variants : dict, optional
+        ``{item name: [variant, ...]}``, e.g. the ``Type`` lists of
+        ``streamlit_app (1).py``.  A variant is named ``"<variant> <item>"``
+        ("Mocha Coffee") and resolves to the SKU id of its item.
+
+    ``lookup`` is a hash lookup of the exact name, then of the normalized
+    name, so its cost does not depend on the size of the menu.  ``search``
+    finds names with a word starting with the typed text by bisecting a
+    sorted list, so it costs O(log n) plus the number of results.  Two
+    names that normalize to the same text are a ``ValueError``.
+    """
+
+    def __init__(self, catalog: Catalog, variants: dict = None):
+        self.catalog = catalog
+        self.entries = {}  # display name -> (sku, variant or None)
+        for sku, name in enumerate(catalog.names):
+            self.entries[name] = (sku, None)
+        for name, kinds in (variants or {}).items():
+            sku = catalog.sku(name)
+            for variant in kinds:
+                self.entries[f"{variant} {name}"] = (sku, variant)
+        self._normalized = {normalize_name(name): entry for name, entry in self.entries.items()}
+        if len(self._normalized) != len(self.entries):
+            raise ValueError("item and variant names must be unique, ignoring case and spacing")
+        # (text from the start of each word, display name), sorted for bisect
+        keys = []
+        for name in self.entries:
+            words = normalize_name(name).split(" ")
+            for i in range(len(words)):
+                keys.append((" ".join(words[i:]), name))
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._names = [name for _, name in keys]
+
+    @classmethod
+    def from_menu(cls, menu) -> "MenuIndex":
+        """Index a menu list; ``Type``/``type`` lists become variants."""
+        catalog = Catalog.from_menu(menu)
+        variants = {}
+        for entry, name in zip(menu, catalog.names):
+            kinds = entry.get("Type", entry.get("type"))
+            if kinds:
+                variants[name] = kinds
+        return cls(catalog, variants)
+
+    def lookup(self, name: str):
+        """Return ``(sku, variant)`` for a menu or variant name, or None."""
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self._normalized.get(normalize_name(name))
+        return entry
+
+    def sku(self, name: str):
+        """Return the SKU id for a menu or variant name, or None."""
+        entry = self.lookup(name)
+        return None if entry is None else entry[0]
+
+    def search(self, text: str, limit: int = 10) -> list:
+        """
+        Return up to ``limit`` names with a word starting with ``text``,
+        in alphabetical order of the matched text.
+        """
+        prefix = normalize_name(text)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix) and len(found) < limit:
+            name = self._names[i]
+            if name not in seen:
+                seen.add(name)
+                found.append(name)
+            i += 1
+        return found
@@ -0,0 +1,331 @@
+"""
+Menu images
+-----------
+
+The menu tiles used to pass remote URLs straight to ``st.image``, so every
+page load waited on third-party hosts and pulled multi-megabyte originals.
+``AssetStore`` keeps a small, recompressed thumbnail of each image in a
+local directory instead::
+
+    menu_assets/
+        index.json          source URL (and thumbnail size) -> content hash
+        <sha256>.jpg        thumbnails, named by the hash of their bytes
+
+``get(url)`` returns thumbnail bytes for ``st.image``: from an in-memory
+cache (least recently used out first, bounded by ``memory_bytes``), else
+from disk, else by downloading the original once and resizing it.  If the
+source cannot be reached, or ``CAFE_OFFLINE`` is set, a placeholder is
+returned; a failed download is not retried for ``RETRY_SECONDS``, so reruns
+do not keep waiting on a host that is down.
+
+Fill the cache before going offline, and trim it, with::
+
+    python images.py fetch [url ...]        # default: MENU_IMAGE_URLS
+    python images.py prune --max-mb 20
+
+Pillow (installed with Streamlit) is imported only to resize an image or
+draw the placeholder.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from functools import lru_cache
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ASSET_DIR = "menu_assets"
+INDEX_FILE = "index.json"
+SUFFIX = ".jpg"
+THUMB_SIZE = (640, 480)  # a third of a wide layout, at twice the pixel density
+THUMB_QUALITY = 80
+BACKGROUND = (255, 255, 255)  # what transparent pixels become
+MEMORY_BYTES = 16 << 20  # thumbnails kept in memory per process
+FETCH_TIMEOUT = 5.0  # seconds
+MAX_SOURCE_BYTES = 32 << 20
+RETRY_SECONDS = 60.0
+PLACEHOLDER_COLOR = (238, 232, 224)
+PLACEHOLDER_TEXT = "Image unavailable"
+
+# Environment variable that turns downloads off
+OFFLINE_ENV = "CAFE_OFFLINE"
+
+# Every image the apps show, for ``python images.py fetch``
+MENU_IMAGE_URLS = (
+    "https://cdn.shopify.com/s/files/1/0669/0966/7619/files/espresso-shot-crema-in-white-cup-on-wood-table-wrexham-bean.webp?v=1745257519",
+    "https://emilylaurae.com/wp-content/uploads/2022/08/passion-fruit-juice-2.jpg",
+    "https://static.vecteezy.com/system/resources/previews/001/738/638/large_2x/chocolate-cake-slice-free-photo.jpg",
+    "https://farmtojar.com/wp-content/uploads/2016/11/5BA949BB-3B24-4216-B700-E5FE2AF12F7F.jpeg",
+    "https://www.livingnorth.com/images/media/articles/food-and-drink/eat-and-drink/coffee.png?",
+)
+
+
+def make_thumbnail(data: bytes, size=THUMB_SIZE, quality: int = THUMB_QUALITY) -> bytes:
+    """
+    Return image ``data`` shrunk to fit in ``size`` (never enlarged), turned
+    upright and recompressed as a progressive JPEG.
+
+    JPEG because ``st.image`` passes JPEG and PNG bytes through as they are
+    but decodes and re-encodes anything else (WebP included) on every rerun.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", size)  # JPEG: decode at a reduced scale already
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGBA")
+            flat = Image.new("RGB", image.size, BACKGROUND)
+            flat.paste(image, mask=image.getchannel("A"))
+            image = flat
+        image.thumbnail(size, Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def make_placeholder(size=THUMB_SIZE, text: str = PLACEHOLDER_TEXT) -> bytes:
+    """Return a plain tile with ``text`` in the middle, as JPEG."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", size, PLACEHOLDER_COLOR)
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), text)
+    draw.text(((size[0] - right + left) / 2, (size[1] - bottom + top) / 2), text,
+              fill=(120, 110, 100))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=THUMB_QUALITY)
+    return out.getvalue()
+
+
+def fetch(url: str, timeout: float = FETCH_TIMEOUT) -> bytes:
+    """Download ``url``; refuses bodies over ``MAX_SOURCE_BYTES``."""
+    request = urllib.request.Request(url, headers={"User-Agent": "cafe-menu-assets"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read(MAX_SOURCE_BYTES + 1)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ValueError(f"{url}: image larger than {MAX_SOURCE_BYTES} bytes")
+    return data
+
+
+class AssetStore:
+    """
+    Thumbnails of remote images, on disk and in memory.
+
+    Parameters
+    ----------
+    directory : str
+        Where thumbnails and ``index.json`` are kept; created if missing.
+    size : tuple
+        Box the thumbnails fit in, in pixels.
+    memory_bytes : int
+        Most thumbnail bytes kept in memory.
+    offline : bool, optional
+        Never download.  Defaults to whether ``CAFE_OFFLINE`` is set.
+    fetcher : callable, optional
+        ``fetcher(url) -> bytes``; defaults to ``fetch``.
+    """
+
+    def __init__(self, directory: str = DEFAULT_ASSET_DIR, size=THUMB_SIZE,
+                 memory_bytes: int = MEMORY_BYTES, offline: bool = None, fetcher=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.size = tuple(size)
+        self.memory_bytes = memory_bytes
+        self.offline = bool(os.environ.get(OFFLINE_ENV)) if offline is None else offline
+        self.fetcher = fetcher or fetch
+        self._memory = OrderedDict()  # content hash -> bytes, least recent first
+        self._memory_used = 0
+        self._failed = {}  # url -> monotonic time of the last failed download
+        self._placeholder = None
+        self._lock = threading.Lock()
+        self.index = self._read_index()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            log.warning("image index in %s unreadable, starting afresh", self.directory)
+            return {}
+
+    def _write_index(self) -> None:
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    def key(self, url: str) -> str:
+        """Return the index key of ``url`` at this store's thumbnail size."""
+        return f"{url} {self.size[0]}x{self.size[1]}"
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest + SUFFIX)
+
+    def get(self, url: str) -> bytes:
+        """Return the thumbnail of ``url``, or the placeholder if there is none."""
+        data = self.cached(url)
+        if data is not None:
+            return data
+        if self.offline:
+            return self.placeholder()
+        with self._lock:
+            failed_at = self._failed.get(url)
+        if failed_at is not None and time.monotonic() - failed_at < RETRY_SECONDS:
+            return self.placeholder()
+        try:
+            return self.add(url, self.fetcher(url))
+        except (OSError, ValueError) as exc:
+            # OSError covers URLError and timeouts; Pillow raises OSError for
+            # data it cannot decode
+            log.warning("image %s not available: %s", url, exc)
+            with self._lock:
+                self._failed[url] = time.monotonic()
+            return self.placeholder()
+
+    def cached(self, url: str):
+        """Return the stored thumbnail of ``url`` without downloading, or None."""
+        digest = self.index.get(self.key(url))
+        if digest is None:
+            return None
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return data
+        try:
+            with open(self.path(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._remember(digest, data)
+        return data
+
+    def add(self, url: str, original: bytes) -> bytes:
+        """Resize ``original`` (the image at ``url``), store it and return the thumbnail."""
+        data = make_thumbnail(original, self.size)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            self.index[self.key(url)] = digest
+            self._write_index()
+            self._failed.pop(url, None)
+        self._remember(digest, data)
+        return data
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                return
+            self._memory[digest] = data
+            self._memory_used += len(data)
+            while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+
+    def placeholder(self) -> bytes:
+        """Return the placeholder tile at this store's size."""
+        if self._placeholder is None:
+            self._placeholder = make_placeholder(self.size)
+        return self._placeholder
+
+    def prefetch(self, urls) -> dict:
+        """
+        Download and store every url not stored yet; returns ``{url: error}``
+        for the ones that failed.
+        """
+        errors = {}
+        for url in urls:
+            if self.cached(url) is not None:
+                continue
+            try:
+                self.add(url, self.fetcher(url))
+            except (OSError, ValueError) as exc:
+                errors[url] = str(exc)
+        return errors
+
+    def prune(self, max_bytes: int) -> int:
+        """
+        Delete thumbnails no longer in the index, then the oldest ones until
+        the directory holds at most ``max_bytes``.  Returns the files deleted.
+        """
+        with self._lock:
+            referenced = set(self.index.values())
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(SUFFIX):
+                    st = entry.stat()
+                    files.append((st.st_mtime, entry.name[:-len(SUFFIX)], st.st_size))
+            doomed = {digest for _, digest, _ in files if digest not in referenced}
+            used = sum(size for _, digest, size in files if digest not in doomed)
+            for _, digest, size in sorted(files):
+                if used <= max_bytes:
+                    break
+                if digest not in doomed:
+                    doomed.add(digest)
+                    used -= size
+            for digest in doomed:
+                os.remove(self.path(digest))
+                if digest in self._memory:
+                    self._memory_used -= len(self._memory.pop(digest))
+            self.index = {key: digest for key, digest in self.index.items()
+                          if digest not in doomed}
+            self._write_index()
+        return len(doomed)
+
+
+@lru_cache(maxsize=None)
+def shared_assets(path: str = DEFAULT_ASSET_DIR) -> AssetStore:
+    """
+    Return the process-wide asset store for ``path``.
+
+    Streamlit re-executes the app script on every rerun, but imported modules
+    stay loaded, so thumbnails are read or downloaded once per server process.
+    """
+    return AssetStore(path)
+
+
+def menu_image(url: str) -> bytes:
+    """Return the thumbnail of ``url`` for ``st.image``, from ``shared_assets()``."""
+    return shared_assets().get(url)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch or prune menu thumbnails")
+    parser.add_argument("--dir", default=DEFAULT_ASSET_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch_parser = commands.add_parser("fetch", help="download and resize menu images")
+    fetch_parser.add_argument("urls", nargs="*", default=list(MENU_IMAGE_URLS))
+    prune_parser = commands.add_parser("prune", help="trim the thumbnail directory")
+    prune_parser.add_argument("--max-mb", type=float, default=20.0)
+    args = parser.parse_args()
+
+    store = AssetStore(args.dir, offline=False)
+    if args.command == "fetch":
+        errors = store.prefetch(args.urls)
+        for url, error in errors.items():
+            print(f"failed: {url}: {error}")
+        print(f"{len(args.urls) - len(errors)} of {len(args.urls)} images stored in {args.dir}")
+    else:
+        deleted = store.prune(int(args.max_mb * (1 << 20)))
+        print(f"{deleted} thumbnails deleted from {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
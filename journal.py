@@ -0,0 +1,361 @@
+"""
+Order journal
+-------------
+
+An append-only record of every priced order, so checkouts are not forgotten
+once the receipt has been shown.
+
+The journal is a directory holding two files of fixed-width little-endian
+records:
+
+``orders.bin``
+    One ``ORDER`` record per order: id, timestamp, where its lines start in
+    ``lines.bin`` and how many there are, time band, voucher code, the
+    order totals and the version of the price list it was priced with (0 if
+    it was priced with the built-in rules, see price_lists.py).
+``lines.bin``
+    One ``LINE`` record per cart line: order id, item name, quantity and the
+    line amounts.
+
+All amounts are integer cents (see ``money.py``).  Because every record has
+the same size, record *n* lives at byte ``n * size`` and ``JournalReader`` can
+memory-map the files as NumPy structured arrays: replaying or aggregating
+millions of orders never builds a Python object per order.
+
+Durability
+~~~~~~~~~~
+
+``OrderJournal`` hands every append to the operating system before it
+returns, so a crash of the app loses nothing.  It calls ``fsync`` once every
+``sync_every`` orders, and no later than ``sync_interval`` seconds after an
+order (a timer covers the last order before a lull), and on ``sync``/
+``close``; a power failure or OS crash can lose at most that window.  When
+the journal is reopened, a torn record at the end of a file is cut off, and so is
+any trailing order whose lines did not all reach the disk.
+"""
+
+import os
+import struct
+import threading
+import time
+from functools import lru_cache
+
+from pricing import BANDS
+
+DEFAULT_JOURNAL_DIR = "order_journal"
+ORDERS_FILE = "orders.bin"
+LINES_FILE = "lines.bin"
+
+ITEM_BYTES = 24
+VOUCHER_BYTES = 16
+NO_BAND = 255
+
+# id, timestamp, first_line, n_lines, band, voucher, total_raw, bulk_disc,
+# time_disc, voucher_disc, promo_disc, grand_total, price_list
+ORDER = struct.Struct(f"<QdQIB{VOUCHER_BYTES}s3x6qI4x")
+# order_id, item, qty, unit, raw, bulk_disc, time_disc, total
+LINE = struct.Struct(f"<Q{ITEM_BYTES}sI4x5q")
+
+ORDER_FIELDS = ("order_id", "timestamp", "first_line", "n_lines", "band", "voucher",
+                "total_raw", "bulk_disc", "time_disc", "voucher_disc", "promo_disc",
+                "grand_total", "price_list")
+AMOUNT_FIELDS = ORDER_FIELDS[6:12]
+LINE_FIELDS = ("order_id", "item", "qty", "unit", "raw", "bulk_disc", "time_disc", "total")
+
+
+def record_dtypes() -> tuple:
+    """
+    Return ``(order_dtype, line_dtype)``: NumPy structured dtypes matching
+    ``ORDER`` and ``LINE``, with the fields in ``ORDER_FIELDS`` and
+    ``LINE_FIELDS``.
+    """
+    import numpy as np
+
+    order_dtype = np.dtype({
+        "names": ORDER_FIELDS,
+        "formats": ["<u8", "<f8", "<u8", "<u4", "u1", f"S{VOUCHER_BYTES}"] + ["<i8"] * 6
+                   + ["<u4"],
+        "offsets": [0, 8, 16, 24, 28, 29, 48, 56, 64, 72, 80, 88, 96],
+        "itemsize": ORDER.size,
+    })
+    line_dtype = np.dtype({
+        "names": LINE_FIELDS,
+        "formats": ["<u8", f"S{ITEM_BYTES}", "<u4"] + ["<i8"] * 5,
+        "offsets": [0, 8, 32, 40, 48, 56, 64, 72],
+        "itemsize": LINE.size,
+    })
+    return order_dtype, line_dtype
+
+
+def _whole_records(path: str, size: int) -> int:
+    """Cut a torn record off the end of ``path`` and return the record count."""
+    if not os.path.exists(path):
+        return 0
+    length = os.path.getsize(path)
+    if length % size:
+        with open(path, "r+b") as f:
+            f.truncate(length - length % size)
+    return length // size
+
+
+class OrderJournal:
+    """
+    Append priced orders to a journal directory.
+
+    Parameters
+    ----------
+    path : str
+        The journal directory.  It is created if it does not exist.
+    sync_every : int
+        fsync after this many appended orders.
+    sync_interval : float
+        ... or once this many seconds have passed since the last fsync.
+
+    The journal is safe to share between threads (Streamlit runs each browser
+    session in its own thread).  Item names and voucher codes longer than
+    their fields are cut at a character boundary.
+    """
+
+    def __init__(self, path: str, sync_every: int = 256, sync_interval: float = 1.0):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+
+        orders_path = os.path.join(path, ORDERS_FILE)
+        lines_path = os.path.join(path, LINES_FILE)
+        n_orders = _whole_records(orders_path, ORDER.size)
+        n_lines = _whole_records(lines_path, LINE.size)
+        self._next_line = 0
+        if n_orders:
+            with open(orders_path, "rb") as f:
+                # Drop trailing orders whose lines are not all on disk
+                while n_orders:
+                    f.seek((n_orders - 1) * ORDER.size)
+                    last = ORDER.unpack(f.read(ORDER.size))
+                    if last[2] + last[3] <= n_lines:
+                        self._next_line = last[2] + last[3]
+                        break
+                    n_orders -= 1
+        self._next_order = n_orders
+
+        self._orders = open(orders_path, "ab")
+        self._lines = open(lines_path, "ab")
+        self._orders.truncate(self._next_order * ORDER.size)
+        # Lines written after the last complete order are orphans
+        self._lines.truncate(self._next_line * LINE.size)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._timer = None  # pending fsync for the orders since the last one
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._next_order
+
+    def append(self, lines, band=None, voucher="", total_raw=0, bulk_disc=0, time_disc=0,
+               voucher_disc=0, promo_disc=0, grand_total=0, timestamp=None,
+               price_list=0) -> int:
+        """
+        Append one order and return its id.
+
+        Parameters
+        ----------
+        lines : iterable of tuple
+            ``(item, qty, unit, raw, bulk_disc, time_disc, total)`` per line,
+            amounts in cents.
+        band : str, optional
+            One of ``pricing.BANDS``, or None if the order has no band.
+        voucher : str
+            The voucher code used, if any.
+        total_raw, bulk_disc, time_disc, voucher_disc, promo_disc, grand_total : int
+            Order totals in cents.
+        timestamp : float, optional
+            Seconds since the epoch; defaults to now.
+        price_list : int
+            Version of the price list the order was priced with.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        band_id = NO_BAND if band is None else BANDS.index(band)
+        voucher_bytes = _fixed(voucher.strip().upper(), VOUCHER_BYTES)
+
+        with self._lock:
+            order_id = self._next_order
+            packed = [
+                LINE.pack(order_id, _fixed(item, ITEM_BYTES), qty, unit, raw, bulk, timed, total)
+                for item, qty, unit, raw, bulk, timed, total in lines
+            ]
+            self._lines.write(b"".join(packed))
+            self._orders.write(ORDER.pack(
+                order_id, timestamp, self._next_line, len(packed), band_id, voucher_bytes,
+                total_raw, bulk_disc, time_disc, voucher_disc, promo_disc, grand_total,
+                price_list,
+            ))
+            self._next_order += 1
+            self._next_line += len(packed)
+            # Lines first, as in _sync
+            self._lines.flush()
+            self._orders.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.sync_interval, self._sync_due)
+                self._timer.daemon = True
+                self._timer.start()
+        return order_id
+
+    def append_priced(self, priced: dict, band: str, timestamp=None) -> int:
+        """
+        Append an order priced by ``PricingTables.price_order``, with the
+        ``price_list`` version if ``priced`` has one.
+        """
+        lines = [
+            (item, qty, unit, raw, bulk, timed, after)
+            for item, qty, unit, raw, bulk, _, timed, after in priced["lines"]
+        ]
+        return self.append(
+            lines, band=band, total_raw=priced["total_raw"],
+            bulk_disc=priced["total_bulk_disc"], time_disc=priced["total_time_disc"],
+            grand_total=priced["grand_total"], timestamp=timestamp,
+            price_list=priced.get("price_list", 0),
+        )
+
+    def _sync(self) -> None:
+        # Lines first, so an order on disk never points past the lines file
+        for f in (self._lines, self._orders):
+            f.flush()
+            os.fsync(f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _sync_due(self) -> None:
+        # Timer thread: fsync the orders appended since the last fsync
+        with self._lock:
+            self._timer = None
+            if self._unsynced and not self._orders.closed:
+                self._sync()
+
+    def sync(self) -> None:
+        """Write everything appended so far to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        """Sync and close the journal files."""
+        with self._lock:
+            if self._orders.closed:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._sync()
+            self._orders.close()
+            self._lines.close()
+
+
+def _fixed(text: str, size: int) -> bytes:
+    # UTF-8, cut to ``size`` bytes without splitting a character
+    data = text.encode()
+    if len(data) > size:
+        data = data[:size].decode(errors="ignore").encode()
+    return data
+
+
+@lru_cache(maxsize=None)
+def shared_journal(path: str = DEFAULT_JOURNAL_DIR) -> OrderJournal:
+    """
+    Return the process-wide journal for ``path``.
+
+    Streamlit re-executes the app script on every rerun, but imported modules
+    stay loaded, so this opens each journal once per server process.
+    """
+    return OrderJournal(path)
+
+
+class JournalReader:
+    """
+    Read a journal without loading it into Python objects.
+
+    ``orders`` and ``lines`` are read-only NumPy memory maps with the fields
+    in ``ORDER_FIELDS`` and ``LINE_FIELDS``; column operations on them
+    (``reader.orders["grand_total"].sum()``) run at NumPy speed straight off
+    the page cache.  Orders appended after the reader was opened are not
+    seen; open a new reader to pick them up.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        self.order_dtype, self.line_dtype = record_dtypes()
+        orders = self._map(os.path.join(path, ORDERS_FILE), self.order_dtype)
+        lines = self._map(os.path.join(path, LINES_FILE), self.line_dtype)
+        # Only orders whose lines are all on disk (a writer may be mid-flush)
+        ends = orders["first_line"] + orders["n_lines"]
+        self.orders = orders[:int(np.searchsorted(ends, len(lines), side="right"))]
+        n_lines = int(ends[len(self.orders) - 1]) if len(self.orders) else 0
+        self.lines = lines[:n_lines]
+
+    @staticmethod
+    def _map(path, dtype):
+        import numpy as np
+
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if not count:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def order(self, order_id: int) -> dict:
+        """Return one order, with its lines, as plain Python values."""
+        record = self.orders[order_id]
+        first, count = int(record["first_line"]), int(record["n_lines"])
+        band = int(record["band"])
+        return {
+            "order_id": int(record["order_id"]),
+            "timestamp": float(record["timestamp"]),
+            "band": None if band == NO_BAND else BANDS[band],
+            "voucher": record["voucher"].decode(errors="replace"),
+            **{name: int(record[name]) for name in AMOUNT_FIELDS},
+            "price_list": int(record["price_list"]),
+            "lines": [
+                {
+                    "item": line["item"].decode(errors="replace"),
+                    **{name: int(line[name]) for name in LINE_FIELDS[2:]},
+                }
+                for line in self.lines[first:first + count]
+            ],
+        }
+
+    def replay(self, start: int = 0, stop: int = None):
+        """Yield orders as dicts (see ``order``), oldest first."""
+        for order_id in range(start, len(self) if stop is None else stop):
+            yield self.order(order_id)
+
+    def totals(self) -> dict:
+        """Sum every amount column over all orders (cents)."""
+        return {name: int(self.orders[name].sum()) for name in AMOUNT_FIELDS}
+
+    def revenue_by_item(self) -> dict:
+        """Return {item: (quantity sold, revenue in cents)} over all lines."""
+        import numpy as np
+
+        items, index = np.unique(self.lines["item"], return_inverse=True)
+        qty = np.zeros(len(items), dtype=np.int64)
+        revenue = np.zeros(len(items), dtype=np.int64)
+        np.add.at(qty, index, self.lines["qty"])
+        np.add.at(revenue, index, self.lines["total"])
+        return {
+            item.decode(errors="replace"): (int(q), int(r))
+            for item, q, r in zip(items, qty, revenue)
+        }
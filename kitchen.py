@@ -0,0 +1,349 @@
+"""
+Kitchen tickets
+---------------
+
+Once an order is paid, the items have to reach whoever makes them.
+``Kitchen`` is an in-process order queue that splits every order into one
+ticket per station (coffee bar, juice bar, cake counter, by the item's
+category as in ``CATEGORY``) and has asyncio workers work through each
+station's tickets.
+
+A worker that picks up a ticket also takes the tickets already waiting at
+its station, up to ``batch_items`` items, and makes them together: the
+set-up time of a batch (grinding, washing the blender) is paid once, so a
+station gets through a rush faster than one ticket at a time.  A ticket
+that would take the batch over ``batch_items`` starts the worker's next
+batch instead.  Prep times are simulated with ``asyncio.sleep`` unless a
+``prepare`` coroutine is given.  If ``prepare`` raises, the batch's orders
+are counted as failed and the worker goes on with the next batch.
+
+An order id can be in the kitchen only once: ``submit`` and ``send`` raise
+``ValueError`` for an id that is still queued or being made.
+
+The order queue and every station queue are bounded.  When a station falls
+behind, its queue fills, the dispatcher waits, the order queue fills, and
+``submit`` waits; ``send`` (for code outside the event loop) gives up after
+``timeout`` seconds with ``KitchenBusy``.  Memory stays bounded however many
+orders arrive.
+
+``stats`` reports queue depths, orders in progress and the quantiles of
+order latency (paid to last ticket ready) and of batch prep time per
+station.  ``shared_kitchen`` runs one kitchen per process in a background
+thread, for the Streamlit apps.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from rollups import TDigest
+
+# Item categories, as in ``streamlit_app (1).py``
+CATEGORY = {"Coffee": "coffee", "Fruit Juice": "juice", "Cake": "cake"}
+# The station that makes each category; anything else goes to the counter
+STATIONS = {"coffee": "coffee bar", "juice": "juice bar", "cake": "cake counter"}
+DEFAULT_STATION = "counter"
+# Seconds to set up a batch, and to make each item in it
+PREP_SECONDS = {
+    "coffee bar": (20.0, 40.0),
+    "juice bar": (30.0, 25.0),
+    "cake counter": (5.0, 10.0),
+    DEFAULT_STATION: (5.0, 15.0),
+}
+WORKERS = {"coffee bar": 2}  # workers per station, 1 if not listed
+ORDER_QUEUE_SIZE = 256
+STATION_QUEUE_SIZE = 64
+MAX_BATCH_ITEMS = 6
+SUBMIT_TIMEOUT = 2.0  # seconds ``send`` waits for room in the order queue
+QUANTILES = (0.5, 0.9, 0.99)
+
+log = logging.getLogger(__name__)
+
+
+class KitchenBusy(Exception):
+    """The order queue stayed full for the whole submit timeout."""
+
+
+class Ticket:
+    """The items of one order made at one station."""
+
+    __slots__ = ("order_id", "station", "items", "units", "received", "started", "ready",
+                 "failed")
+
+    def __init__(self, order_id, station, items, received):
+        self.order_id = order_id
+        self.station = station
+        self.items = items
+        self.units = sum(qty for _, qty in items)
+        self.received = received
+        self.started = None
+        self.ready = None
+        self.failed = False
+
+    def __repr__(self) -> str:
+        return f"Ticket({self.order_id}, {self.station!r}, {self.items!r})"
+
+
+class Kitchen:
+    """
+    Split paid orders into station tickets and work through them.
+
+    Parameters
+    ----------
+    categories : dict
+        Item name to category.
+    stations : dict
+        Category to station.
+    prep_seconds : dict
+        Station to ``(setup, per_item)`` seconds.
+    workers : dict
+        Station to number of workers; 1 if not listed.
+    queue_size, station_queue_size : int
+        Bounds of the order queue and of each station's ticket queue.
+    batch_items : int
+        Most items a worker starts on at once (a bigger ticket is made
+        alone).
+    time_scale : float
+        Multiplies every prep time, e.g. to simulate a day in seconds.
+    prepare : coroutine function, optional
+        ``await prepare(station, tickets, seconds)`` makes a batch; defaults
+        to sleeping for ``seconds``.
+    on_ready : callable, optional
+        Called with the order id once all its tickets are ready (not for
+        an order with a failed batch).  Exceptions it raises are logged.
+    """
+
+    def __init__(self, categories=CATEGORY, stations=STATIONS, prep_seconds=PREP_SECONDS,
+                 workers=WORKERS, queue_size: int = ORDER_QUEUE_SIZE,
+                 station_queue_size: int = STATION_QUEUE_SIZE,
+                 batch_items: int = MAX_BATCH_ITEMS, time_scale: float = 1.0,
+                 prepare=None, on_ready=None):
+        self.categories = categories
+        self.stations = stations
+        self.prep_seconds = prep_seconds
+        self.batch_items = batch_items
+        self.time_scale = time_scale
+        self.prepare = prepare or self._sleep
+        self.on_ready = on_ready
+        names = list(dict.fromkeys([*stations.values(), DEFAULT_STATION]))
+        self.workers = {station: workers.get(station, 1) for station in names}
+        self._orders = asyncio.Queue(queue_size)
+        self._tickets = {station: asyncio.Queue(station_queue_size) for station in names}
+        self._queued = set()  # order ids submitted but not yet dispatched
+        self._pending = {}  # order id -> [tickets not ready, received, failed]
+        self._busy = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()  # digests and counters are read from other threads
+        self._latency = TDigest()
+        self._prep = {station: TDigest() for station in names}
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self._loop = None
+        self._thread = None
+        self._tasks = []
+
+    def station_of(self, item: str) -> str:
+        """Return the station that makes ``item``."""
+        return self.stations.get(self.categories.get(item), DEFAULT_STATION)
+
+    async def submit(self, order_id: int, lines) -> None:
+        """
+        Queue an order of ``(item, qty)`` lines, waiting while the queue is
+        full.  Call from the kitchen's event loop.
+
+        Raises ``ValueError`` if ``order_id`` is already in the kitchen.
+        """
+        if order_id in self._queued or order_id in self._pending:
+            raise ValueError(f"order {order_id} is already in the kitchen")
+        self._queued.add(order_id)
+        try:
+            await self._orders.put((order_id, tuple(lines), time.monotonic()))
+        except BaseException:
+            # Timed out or cancelled while the queue was full
+            self._queued.discard(order_id)
+            raise
+
+    def send(self, order_id: int, lines, timeout: float = SUBMIT_TIMEOUT) -> int:
+        """
+        Queue an order from another thread, once ``start`` has been called.
+        Returns the number of orders waiting before it.
+
+        Raises ``KitchenBusy`` if the queue is still full after ``timeout``
+        seconds, and ``ValueError`` if ``order_id`` is already in the kitchen.
+        """
+        if self._loop is None:
+            raise RuntimeError("the kitchen is not running; call start() first")
+        ahead = self._orders.qsize()
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self.submit(order_id, lines), timeout), self._loop)
+        try:
+            future.result()
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise KitchenBusy(f"order {order_id}: kitchen queue full") from None
+        return ahead
+
+    async def run(self) -> None:
+        """Dispatch orders and run the station workers until cancelled."""
+        self._tasks = [asyncio.ensure_future(self._dispatch())]
+        for station, n_workers in self.workers.items():
+            self._tasks += [asyncio.ensure_future(self._work(station)) for _ in range(n_workers)]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    async def drain(self) -> None:
+        """Wait until every queued order has been dispatched and made."""
+        await self._orders.join()
+        for queue in self._tickets.values():
+            await queue.join()
+
+    def start(self) -> "Kitchen":
+        """Run the kitchen on its own event loop in a daemon thread."""
+        if self._thread is not None:
+            return self
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            self._loop = asyncio.get_event_loop()
+            started.set()
+            try:
+                self._loop.run_until_complete(self.run())
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="kitchen", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread started by ``start``; queued tickets are dropped."""
+        if self._thread is None:
+            return
+
+        def cancel():
+            for task in self._tasks:
+                task.cancel()
+
+        self._loop.call_soon_threadsafe(cancel)
+        self._thread.join()
+        self._thread = self._loop = None
+
+    async def _dispatch(self) -> None:
+        while True:
+            order_id, lines, received = await self._orders.get()
+            self._queued.discard(order_id)
+            by_station = {}
+            for item, qty in lines:
+                if qty > 0:
+                    by_station.setdefault(self.station_of(item), []).append((item, qty))
+            if by_station:
+                self._pending[order_id] = [len(by_station), received, False]
+            for station, items in by_station.items():
+                # Waits while the station is full: that is the backpressure
+                await self._tickets[station].put(
+                    Ticket(order_id, station, tuple(items), received))
+            self._orders.task_done()
+
+    async def _work(self, station: str) -> None:
+        queue = self._tickets[station]
+        setup, per_item = self.prep_seconds.get(station, PREP_SECONDS[DEFAULT_STATION])
+        held = None  # a ticket that did not fit the last batch: it starts the next
+        while True:
+            batch = [held or await queue.get()]
+            held = None
+            units = batch[0].units
+            while units < self.batch_items and not queue.empty():
+                ticket = queue.get_nowait()
+                if units + ticket.units > self.batch_items:
+                    held = ticket
+                    break
+                batch.append(ticket)
+                units += ticket.units
+            self._busy[station] += 1
+            started = time.monotonic()
+            failed = False
+            try:
+                await self.prepare(station, batch, (setup + per_item * units) * self.time_scale)
+            except Exception:
+                log.exception("%s: batch of %d tickets failed", station, len(batch))
+                failed = True
+            finally:
+                self._busy[station] -= 1
+            ready = time.monotonic()
+            if not failed:
+                with self._lock:
+                    self._prep[station].add(ready - started)
+            for ticket in batch:
+                ticket.started, ticket.ready, ticket.failed = started, ready, failed
+                self._ticket_ready(ticket)
+                queue.task_done()
+
+    def _ticket_ready(self, ticket: Ticket) -> None:
+        pending = self._pending[ticket.order_id]
+        pending[0] -= 1
+        pending[2] = pending[2] or ticket.failed
+        if pending[0]:
+            return
+        del self._pending[ticket.order_id]
+        if pending[2]:
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self._latency.add(ticket.ready - pending[1])
+            self.completed += 1
+        if self.on_ready is not None:
+            try:
+                self.on_ready(ticket.order_id)
+            except Exception:
+                # The order is made; a failing callback must not stop the worker
+                log.exception("on_ready failed for order %s", ticket.order_id)
+
+    @staticmethod
+    async def _sleep(station, tickets, seconds) -> None:
+        await asyncio.sleep(seconds)
+
+    def stats(self) -> dict:
+        """
+        Return queue depths, orders in progress, completed and failed, and
+        latency and prep-time quantiles in seconds (NaN before the first
+        order).
+        """
+        with self._lock:
+            latency = {q: self._latency.quantile(q) for q in QUANTILES}
+            prep = {station: {q: digest.quantile(q) for q in QUANTILES}
+                    for station, digest in self._prep.items()}
+            completed, rejected, failed = self.completed, self.rejected, self.failed
+        return {
+            "orders_waiting": self._orders.qsize(),
+            "tickets_waiting": {station: queue.qsize()
+                                for station, queue in self._tickets.items()},
+            "workers_busy": dict(self._busy),
+            "in_progress": len(self._pending),
+            "completed": completed,
+            "rejected": rejected,
+            "failed": failed,
+            "latency": latency,
+            "prep": prep,
+        }
+
+
+@lru_cache(maxsize=None)
+def shared_kitchen() -> Kitchen:
+    """
+    Return the process-wide kitchen, running in a background thread.
+
+    Streamlit re-executes the app script on every rerun, but imported modules
+    stay loaded, so every session sends its tickets to the same queue.
+    """
+    return Kitchen().start()
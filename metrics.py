@@ -0,0 +1,356 @@
+"""
+Metrics
+-------
+
+Timers and counters around the hot paths of the apps and the pricing
+service, cheap enough to leave on: a timed call costs two
+``perf_counter`` reads and a few dictionary updates under a lock (see
+``benchmarks/bench_metrics.py``).
+
+    from metrics import count, span, timed
+
+    @timed("cafe_app.calculate_totals")
+    def calculate_totals(cart, voucher_code): ...
+
+    with span("final.render.receipt"):
+        st.markdown(...)
+
+    count("final.checkouts")
+
+Every timer keeps a count, the total and largest duration and a histogram
+with the bucket bounds in ``BUCKETS``.  ``REGISTRY.snapshot()`` returns
+everything as a dict and ``REGISTRY.prometheus()`` in the Prometheus text
+format, as the ``cafe_duration_seconds`` histogram and the
+``cafe_events_total`` counter, labelled by name.
+
+The pricing service serves them at ``GET /metrics``.  The Streamlit apps
+call ``export_from_env()``, which reads:
+
+``CAFE_METRICS``
+    ``0`` turns the timers and counters off.
+``CAFE_METRICS_PORT``
+    Serve ``/metrics``, ``/metrics.json`` and ``/profile`` on this port
+    from a background thread.
+``CAFE_METRICS_DUMP``
+    Write the snapshot as JSON to this file every
+    ``CAFE_METRICS_DUMP_INTERVAL`` seconds (default 10).
+``CAFE_PROFILE``
+    Run the sampling profiler, one sample every this many milliseconds.
+
+The sampling profiler is opt-in: a thread that reads the stack of every
+other thread at a fixed interval (wall-clock time, so threads waiting on
+I/O or a sleep show up too) and counts them in the "folded" format of
+flamegraph.pl and speedscope.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+
+# json and logging are imported where a snapshot is written, so importing
+# the apps (which all import this module) stays cheap; see bench_import_time.
+
+# Upper bounds (seconds) of the histogram buckets; one more for the rest
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+PROFILE_INTERVAL = 0.01  # seconds between profiler samples (100 a second)
+PROFILE_MAX_DEPTH = 64
+PROFILE_TOP = 20  # functions listed in a snapshot
+DUMP_INTERVAL = 10.0
+
+METRICS_ENV = "CAFE_METRICS"
+PORT_ENV = "CAFE_METRICS_PORT"
+DUMP_ENV = "CAFE_METRICS_DUMP"
+DUMP_INTERVAL_ENV = "CAFE_METRICS_DUMP_INTERVAL"
+PROFILE_ENV = "CAFE_PROFILE"
+
+
+class Registry:
+    """
+    Named timers and counters, safe to update from any thread.
+
+    ``timers`` maps a name to ``[count, total seconds, max seconds, bucket
+    counts]``; ``counters`` maps a name to a number.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.timers = {}
+        self.counters = {}
+        self.profiler = None
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one timing of ``name``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = [0, 0.0, 0.0, [0] * (len(BUCKETS) + 1)]
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+            timer[3][bisect_left(BUCKETS, seconds)] += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Add ``n`` to the counter ``name``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self) -> None:
+        """Forget every timing and count."""
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+    def snapshot(self) -> dict:
+        """
+        Return ``{"timers": ..., "counters": ..., "profile": ...}``, timers
+        as count, total, mean and max seconds and cumulative bucket counts.
+        ``profile`` lists the functions seen most by the profiler, if it runs.
+        """
+        with self._lock:
+            timers = {name: (n, total, peak, list(buckets))
+                      for name, (n, total, peak, buckets) in self.timers.items()}
+            counters = dict(self.counters)
+        result = {"time": time.time(), "timers": {}, "counters": counters}
+        for name, (n, total, peak, buckets) in sorted(timers.items()):
+            cumulative, running = {}, 0
+            for bound, k in zip(BUCKETS + ("+Inf",), buckets):
+                running += k
+                cumulative[str(bound)] = running
+            result["timers"][name] = {"count": n, "total": total, "mean": total / n,
+                                      "max": peak, "buckets": cumulative}
+        if self.profiler is not None:
+            result["profile"] = {"samples": self.profiler.samples,
+                                 "top": self.profiler.top(PROFILE_TOP)}
+        return result
+
+    def prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        out = ["# HELP cafe_duration_seconds Time spent in instrumented code.",
+               "# TYPE cafe_duration_seconds histogram"]
+        for name, timer in snap["timers"].items():
+            label = _label(name)
+            for bound, k in timer["buckets"].items():
+                out.append(f'cafe_duration_seconds_bucket{{name="{label}",le="{bound}"}} {k}')
+            out.append(f'cafe_duration_seconds_sum{{name="{label}"}} {timer["total"]!r}')
+            out.append(f'cafe_duration_seconds_count{{name="{label}"}} {timer["count"]}')
+        out += ["# HELP cafe_events_total Events counted by the apps.",
+                "# TYPE cafe_events_total counter"]
+        for name, n in sorted(snap["counters"].items()):
+            out.append(f'cafe_events_total{{name="{_label(name)}"}} {n}')
+        if "profile" in snap:
+            out += ["# HELP cafe_profile_samples_total Samples taken by the profiler.",
+                    "# TYPE cafe_profile_samples_total counter",
+                    f"cafe_profile_samples_total {snap['profile']['samples']}"]
+        return "\n".join(out) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry(enabled=os.environ.get(METRICS_ENV, "1") != "0")
+
+
+class Timer:
+    """Times a block into a registry; use ``span`` to make one."""
+
+    __slots__ = ("name", "registry", "started")
+
+    def __init__(self, name: str, registry: Registry):
+        self.name = name
+        self.registry = registry
+        self.started = None
+
+    def start(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self) -> float:
+        """Record and return the seconds since ``start``."""
+        seconds = time.perf_counter() - self.started
+        self.registry.observe(self.name, seconds)
+        return seconds
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+
+
+def span(name: str, registry: Registry = None) -> Timer:
+    """Return a context manager that times its block as ``name``."""
+    return Timer(name, registry or REGISTRY)
+
+
+def timed(name: str, registry: Registry = None):
+    """Decorator timing every call of a function as ``name``."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                (registry or REGISTRY).observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add ``n`` to the counter ``name`` of the process-wide registry."""
+    REGISTRY.count(name, n)
+
+
+class SamplingProfiler:
+    """
+    Count the stacks of every other thread, sampled every ``interval``
+    seconds from a daemon thread.  ``busy`` is the CPU time the sampling
+    thread has used, in seconds.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, max_depth: int = PROFILE_MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.busy = 0.0
+        self._labels = {}  # code object -> "function (file:line)"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SamplingProfiler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop.clear()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            started = time.thread_time()
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = (f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                                                f":{code.co_firstlineno})")
+                    stack.append(label)
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self.busy += time.thread_time() - started
+
+    def folded(self) -> str:
+        """Return the stacks in folded format, one ``a;b;c count`` per line."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def top(self, n: int = PROFILE_TOP) -> list:
+        """Return ``[(function, samples)]`` for the innermost functions seen most."""
+        leaves = Counter()
+        for stack, k in list(self.stacks.items()):
+            leaves[stack.rpartition(";")[2]] += k
+        return leaves.most_common(n)
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", registry: Registry = None):
+    """
+    Serve ``/metrics`` (Prometheus text), ``/metrics.json`` and ``/profile``
+    (folded stacks) from a daemon thread.  Returns the server.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, kind = registry.prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, kind = json.dumps(registry.snapshot()), "application/json"
+            elif self.path == "/profile" and registry.profiler is not None:
+                body, kind = registry.profiler.folded(), "text/plain"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def dump_json(path: str, registry: Registry = None) -> None:
+    """Write a snapshot to ``path`` (atomically: a temporary file renamed)."""
+    import json
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump((registry or REGISTRY).snapshot(), f)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=None)
+def export_from_env() -> Registry:
+    """
+    Start the profiler, the HTTP endpoint and the JSON dump asked for by the
+    environment (see the module docstring), once per process.  Returns the
+    process-wide registry.
+    """
+    profile_ms = os.environ.get(PROFILE_ENV)
+    if profile_ms:
+        REGISTRY.profiler = SamplingProfiler(float(profile_ms) / 1000).start()
+    port = os.environ.get(PORT_ENV)
+    if port:
+        serve_metrics(int(port))
+    path = os.environ.get(DUMP_ENV)
+    if path:
+        interval = float(os.environ.get(DUMP_INTERVAL_ENV, DUMP_INTERVAL))
+
+        def run():
+            import logging
+
+            log = logging.getLogger(__name__)
+            while True:
+                time.sleep(interval)
+                try:
+                    dump_json(path)
+                except OSError as exc:
+                    log.warning("metrics not written to %s: %s", path, exc)
+
+        threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+    return REGISTRY
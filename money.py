@@ -0,0 +1,65 @@
+"""
+Money helpers for the cafe apps
+-------------------------------
+
+All amounts are handled as whole numbers of **cents** (plain ``int``), and
+discount rates as whole numbers of **basis points** (1 % = 100 bp).  Integer
+arithmetic is exact, so totals no longer drift by a cent when thousands of
+lines are added up, and there is no need to call ``round(..., 2)`` after every
+step.
+
+Rounding policy
+~~~~~~~~~~~~~~~
+
+A discount is the only step that can produce a fraction of a cent.  It is
+rounded **once**, to the nearest cent, with halves rounded away from zero
+(``ROUND_HALF_UP``, the usual till receipt rule).  The discounted amount is
+then ``amount - discount`` so the parts always add back up to the whole.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+BP_PER_UNIT = 10_000  # basis points in a rate of 1.0 (100 %)
+
+
+def to_cents(amount) -> int:
+    """
+    Convert a price in dollars to cents.
+
+    ``amount`` may be an int, float or str; floats are converted through their
+    shortest ``repr`` so ``4.35`` becomes ``435`` and not ``434``.
+    """
+    if isinstance(amount, int):
+        return amount * 100
+    cents = Decimal(str(amount)) * 100
+    return int(cents.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_bp(rate) -> int:
+    """Convert a fractional rate such as ``0.2`` to basis points (``2000``)."""
+    return int((Decimal(str(rate)) * BP_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def percent_of(cents: int, bp: int) -> int:
+    """Return ``bp`` basis points of ``cents``, rounded half up to the cent."""
+    product = cents * bp
+    if product >= 0:
+        return (product + BP_PER_UNIT // 2) // BP_PER_UNIT
+    return -((-product + BP_PER_UNIT // 2) // BP_PER_UNIT)
+
+
+def discounted(cents: int, bp: int) -> int:
+    """Return ``cents`` after taking off a discount of ``bp`` basis points."""
+    return cents - percent_of(cents, bp)
+
+
+def to_dollars(cents: int) -> float:
+    """Return ``cents`` as a float number of dollars, for tables and charts."""
+    return cents / 100
+
+
+def format_cents(cents: int, symbol: str = "$") -> str:
+    """Format ``cents`` for display, e.g. ``format_cents(1234) == '$12.34'``."""
+    sign = "-" if cents < 0 else ""
+    whole, part = divmod(abs(cents), 100)
+    return f"{sign}{symbol}{whole}.{part:02d}"
@@ -0,0 +1,295 @@
+"""
+Per-outlet price lists
+----------------------
+
+Menus and discount rules loaded from files, one per outlet, so prices can
+change without a redeploy.  A price list is a JSON file named
+``<outlet>.json``::
+
+    {
+      "version": 12,
+      "menu": [{"Name": "Coffee", "Price": 3, "Category": "coffee"}, ...],
+      "bulk_tiers": [[3, 0.10]],
+      "time_band_rules": [["morning", ["Coffee", "Cake"], true, 0.20], ...],
+      "combo_items": ["Coffee", "Cake"],
+      "vouchers": {"WELCOME10": 10}
+    }
+
+Everything but ``version`` and ``menu`` defaults to the rules in
+``pricing.py``; without ``vouchers`` an outlet takes the codes of
+``cafe_app.VOUCHERS``.  ``version`` is a positive integer that must go up with every
+change; it is stored with each journaled order (see journal.py), so an order
+can always be traced back to the prices it was charged.
+
+``PriceBook`` holds the compiled ``PriceList`` of every outlet in a
+dictionary that is never changed in place: ``reload`` compiles the files
+that changed into a new dictionary and swaps it in with one assignment.
+Pricing code takes ``book.get(outlet)`` once per order and keeps using that
+snapshot, so a reload never stalls or half-updates an order being priced.
+``watch`` polls the directory from a background thread and reloads when a
+file changes.  Write files with ``write_price_list`` (or any
+write-then-rename), so a half-written file is never read.
+"""
+
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+
+from money import to_bp, to_cents
+from pricing import BANDS, BULK_TIERS, COMBO_ITEMS, TIME_BAND_RULES, compile_rules
+
+log = logging.getLogger(__name__)
+
+SUFFIX = ".json"
+WATCH_INTERVAL = 1.0  # seconds between directory polls
+
+# Environment variables naming the price list directory and this server's outlet
+PRICE_LISTS_ENV = "CAFE_PRICE_LISTS"
+OUTLET_ENV = "CAFE_OUTLET"
+
+
+class PriceList:
+    """
+    One outlet's compiled price list.  Treat it as read-only.
+
+    ``tables`` are the ``PricingTables`` for its menu and rules; ``vouchers``
+    maps voucher codes to percentages, or is None if the file has none;
+    ``stamp`` is the ``(mtime_ns, size)`` of the file it was read from.
+    """
+
+    __slots__ = ("outlet", "version", "tables", "vouchers", "path", "stamp")
+
+    def __init__(self, outlet, version, tables, vouchers, path=None, stamp=None):
+        self.outlet = outlet
+        self.version = version
+        self.tables = tables
+        self.vouchers = vouchers
+        self.path = path
+        self.stamp = stamp
+
+    def price_order(self, order: tuple, band: str) -> dict:
+        """
+        ``PricingTables.price_order`` with this list, plus ``outlet`` and
+        ``price_list`` (the version) in the result.
+        """
+        priced = dict(self.tables.price_order(order, band))
+        priced["outlet"] = self.outlet
+        priced["price_list"] = self.version
+        return priced
+
+
+def parse_price_list(outlet: str, data: dict, path=None, stamp=None) -> PriceList:
+    """Compile the contents of a price list file (see the module docstring)."""
+    if not isinstance(data, dict) or not isinstance(data.get("menu"), list):
+        raise ValueError(f"{outlet}: a price list is an object with a menu list")
+    version = data.get("version")
+    if type(version) is not int or version <= 0:
+        raise ValueError(f"{outlet}: version must be a positive integer")
+    # Checked here so a bad value is a ValueError naming it, whatever it is
+    for entry in data["menu"]:
+        if not isinstance(entry, dict):
+            raise ValueError(f"{outlet}: menu entries must be objects")
+        price = entry.get("Price", entry.get("price"))
+        if isinstance(price, bool) or not isinstance(price, (int, float, str)):
+            raise ValueError(f"{outlet}: bad price {price!r}")
+        try:
+            to_cents(price)
+        except ArithmeticError:
+            raise ValueError(f"{outlet}: bad price {price!r}") from None
+    for _, rate in data.get("bulk_tiers", ()):
+        _check_rate(outlet, rate)
+    for *_, rate in data.get("time_band_rules", ()):
+        _check_rate(outlet, rate)
+    rules = [
+        (band, None if items is None else set(items), bool(needs_combo), rate)
+        for band, items, needs_combo, rate in data.get("time_band_rules", TIME_BAND_RULES)
+    ]
+    tables = compile_rules(
+        data["menu"],
+        bulk_tiers=[tuple(tier) for tier in data.get("bulk_tiers", BULK_TIERS)],
+        time_band_rules=rules,
+        bands=tuple(data.get("bands", BANDS)),
+        combo_items=tuple(data.get("combo_items", COMBO_ITEMS)),
+    )
+    vouchers = data.get("vouchers")
+    if vouchers is not None:
+        for code, percent in vouchers.items():
+            if type(percent) is not int or not 0 <= percent <= 100:
+                raise ValueError(f"{outlet}: voucher {code!r} must be a whole percentage")
+        vouchers = {code.strip().upper(): percent for code, percent in vouchers.items()}
+    return PriceList(outlet, version, tables, vouchers, path, stamp)
+
+
+def _check_rate(outlet: str, rate) -> None:
+    if isinstance(rate, bool) or not isinstance(rate, (int, float, str)):
+        raise ValueError(f"{outlet}: bad discount rate {rate!r}")
+    try:
+        to_bp(rate)
+    except ArithmeticError:
+        raise ValueError(f"{outlet}: bad discount rate {rate!r}") from None
+
+
+def load_price_list(path: str) -> PriceList:
+    """Read and compile one price list file; the outlet is the file name."""
+    outlet = os.path.basename(path)[:-len(SUFFIX)]
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = json.loads(f.read())
+    return parse_price_list(outlet, data, path, (st.st_mtime_ns, st.st_size))
+
+
+def write_price_list(directory: str, outlet: str, data: dict) -> str:
+    """
+    Write ``data`` as the price list of ``outlet``, atomically (a temporary
+    file renamed over the old one).  Returns the path.
+    """
+    path = os.path.join(directory, outlet + SUFFIX)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+class PriceBook:
+    """
+    The price lists of every outlet in a directory, reloadable while in use.
+
+    Parameters
+    ----------
+    directory : str
+        Holds one ``<outlet>.json`` per outlet.
+
+    ``errors`` maps outlets whose file could not be loaded on the last
+    reload to the reason; such an outlet keeps its previous price list.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lists = {}
+        self.errors = {}
+        self._refused = {}  # outlet -> stamp of a file that failed to load
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.reload()
+
+    def get(self, outlet: str) -> PriceList:
+        """Return the current price list of ``outlet`` (a stable snapshot)."""
+        try:
+            return self.lists[outlet]
+        except KeyError:
+            raise ValueError(f"no price list for outlet {outlet!r}") from None
+
+    def outlets(self) -> list:
+        """Return the outlets that have a price list, sorted."""
+        return sorted(self.lists)
+
+    def reload(self) -> list:
+        """
+        Load the files that are new or changed since the last reload and
+        swap in the result.  Returns the outlets whose price list changed.
+
+        A file whose version is not higher than the loaded one is refused
+        (and reported in ``errors``), so a version always names one set of
+        prices.  Outlets whose file was removed are dropped.
+        """
+        with self._reload_lock:
+            current = self.lists
+            lists, errors, refused, changed = {}, {}, {}, []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(SUFFIX) or not entry.is_file():
+                    continue
+                outlet = entry.name[:-len(SUFFIX)]
+                st = entry.stat()
+                old = current.get(outlet)
+                stamp = (st.st_mtime_ns, st.st_size)
+                if old is not None and old.stamp == stamp:
+                    lists[outlet] = old
+                    continue
+                if self._refused.get(outlet) == stamp:
+                    # Same bad file as last time: keep the error, do not retry
+                    errors[outlet] = self.errors[outlet]
+                    refused[outlet] = stamp
+                    if old is not None:
+                        lists[outlet] = old
+                    continue
+                try:
+                    new = load_price_list(entry.path)
+                    if old is not None and new.version <= old.version:
+                        raise ValueError(f"version {new.version} is not above the loaded"
+                                         f" version {old.version}")
+                except (OSError, ValueError, KeyError, TypeError, ArithmeticError) as exc:
+                    errors[outlet] = str(exc)
+                    refused[outlet] = stamp
+                    log.warning("price list %s not loaded: %s", entry.path, exc)
+                    if old is not None:
+                        lists[outlet] = old
+                    continue
+                lists[outlet] = new
+                changed.append(outlet)
+            changed += [outlet for outlet in current if outlet not in lists]
+            # One assignment: readers see either the old or the new dictionary
+            self.lists = lists
+            self.errors = errors
+            self._refused = refused
+            return changed
+
+    def watch(self, interval: float = WATCH_INTERVAL) -> None:
+        """Reload in a daemon thread whenever a file changes; idempotent."""
+        if self._watcher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    changed = self.reload()
+                except OSError as exc:
+                    log.warning("price list directory not readable: %s", exc)
+                    continue
+                except Exception:
+                    # Keep watching: the next change may well fix it
+                    log.exception("price list reload failed")
+                    continue
+                if changed:
+                    log.info("reloaded price lists: %s", ", ".join(changed))
+
+        self._watcher = threading.Thread(target=run, name="price-list-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        """Stop the watcher thread, if any."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        self._stop.clear()
+
+
+@lru_cache(maxsize=None)
+def shared_book():
+    """
+    Return the process-wide, watched ``PriceBook`` for the directory in
+    ``CAFE_PRICE_LISTS``, or None if it is not set.
+    """
+    directory = os.environ.get(PRICE_LISTS_ENV)
+    if not directory:
+        return None
+    book = PriceBook(directory)
+    book.watch()
+    return book
+
+
+def current_price_list(outlet: str = None):
+    """
+    Return the current price list of ``outlet`` (default ``CAFE_OUTLET``)
+    from ``shared_book()``, or None when no price list directory is set.
+    """
+    book = shared_book()
+    if book is None:
+        return None
+    return book.get(outlet or os.environ.get(OUTLET_ENV, ""))
@@ -0,0 +1,443 @@
+"""
+Pricing core for the cafe app (Final.py)
+----------------------------------------
+
+Everything needed to price an order, with no Streamlit or pandas import, so it
+can be used by ``Final.py``, by batch jobs and by the HTTP pricing service
+(``pricing_service.py``) alike.
+
+The discount rules used by ``Final.py`` are written down here as plain data
+(bulk tiers and time-band rules) and *compiled* once into lookup tables.
+Pricing a cart line is then a single table lookup instead of a scan of the
+menu followed by a chain of ``if``/``elif`` checks, so the cost per line stays
+the same no matter how many items or bands the menu grows to.
+
+The tables are indexed by (item, band, combo flag, quantity bucket) and each
+entry holds the unit price, the bulk multiplier and the time-band rate that
+apply to that combination.  Amounts are integer cents and rates are basis
+points (see ``money.py``).
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+
+from catalog import Catalog, LineItem
+from money import discounted, percent_of, to_bp, to_cents
+
+###############################################################################
+# Menu and time slots
+###############################################################################
+
+MENU = [
+    {'Name': 'Coffee', 'Price': 3},
+    {'Name': 'Fruit Juice', 'Price': 2},
+    {'Name': 'Cake', 'Price': 6},
+]
+
+# Time slots the cashier picks from, and the band each one falls in.
+SLOTS = ["09:00–11:59", "12:00–14:59", "15:00–17:59", "18:00–20:59"]
+
+
+def slot_to_band(s: str) -> str:
+    """Return the time band (morning, afternoon or evening) for a slot."""
+    if s == "09:00–11:59":
+        return "morning"
+    elif s in ("12:00–14:59", "15:00–17:59"):
+        return "afternoon"
+    else:
+        return "evening"
+
+
+###############################################################################
+# Rule definitions
+###############################################################################
+
+# Time bands, in the order they are offered to the user.
+BANDS = ("morning", "afternoon", "evening")
+
+# Bulk tiers as (minimum quantity, discount rate).  Buying three or more of the
+# same item gives 10 % off that line before any time discount.
+BULK_TIERS = [
+    (3, 0.10),
+]
+
+# Time-band rules as (band, items it applies to, needs combo, rate).  ``None``
+# for the items means "everything on the menu".  The first matching rule for a
+# line wins.
+TIME_BAND_RULES = [
+    ("morning", {"Coffee", "Cake"}, True, 0.20),
+    ("afternoon", {"Fruit Juice"}, False, 0.20),
+    ("evening", None, False, 0.30),
+]
+
+# Items that must all be in the order for the morning combo.
+COMBO_ITEMS = ("Coffee", "Cake")
+
+# How many distinct (order, band) results ``PricingTables.price_order`` keeps.
+PRICED_ORDER_CACHE_SIZE = 1024
+
+###############################################################################
+# Compiled tables
+###############################################################################
+
+
+class PricingTables:
+    """
+    Precomputed lookup tables for one menu and one set of rules.
+
+    Build it with ``compile_rules``.  Entries live in one flat list and the
+    position of (item, band, combo, bucket) in it is computed arithmetically,
+    so a lookup is a couple of dictionary hits and one list index.  Item ids
+    are the SKU ids of ``catalog``.
+    """
+
+    def __init__(self, catalog, band_ids, thresholds, entries, combo_items):
+        self.catalog = catalog
+        self.item_ids = catalog.ids
+        self.band_ids = band_ids
+        self.thresholds = thresholds
+        self.entries = entries
+        self.combo_items = combo_items
+        self._n_bands = len(band_ids)
+        self._n_buckets = len(thresholds) + 1
+        # None if some combo item is not on the menu (then there is no combo)
+        self._combo_skus = (None if any(name not in catalog for name in combo_items)
+                            else tuple(catalog.ids[name] for name in combo_items))
+        # Bounded LRU per set of tables, so recompiling drops the old results.
+        self.price_order = lru_cache(maxsize=PRICED_ORDER_CACHE_SIZE)(self._price_order)
+
+    def unit_price(self, item: str) -> int:
+        """Return the menu price of ``item`` in cents."""
+        return self.entries[self.item_ids[item] * self._n_bands * 2 * self._n_buckets][0]
+
+    def has_combo(self, order: dict) -> bool:
+        """Return True if every combo item is in the order."""
+        return all(order.get(name, 0) >= 1 for name in self.combo_items)
+
+    def lookup(self, item: str, band: str, combo: bool, qty: int) -> tuple:
+        """Return ``(unit_cents, bulk_bp, time_bp)`` for one line."""
+        bucket = bisect_right(self.thresholds, qty)
+        index = ((self.item_ids[item] * self._n_bands + self.band_ids[band]) * 2
+                 + bool(combo)) * self._n_buckets + bucket
+        return self.entries[index]
+
+    def price_line(self, item: str, qty: int, band: str, combo: bool) -> tuple:
+        """
+        Price one cart line.
+
+        Returns
+        -------
+        tuple
+            ``(unit, raw, bulk_disc, before_time_disc, time_disc,
+            after_time_disc)`` in cents.  Each discount is rounded half up
+            to the cent once; the other columns follow exactly from it.
+        """
+        return self.price_sku(self.item_ids[item], qty, self.band_ids[band], combo)
+
+    def price_sku(self, sku: int, qty: int, band_id: int, combo: bool) -> tuple:
+        """``price_line`` by SKU id and band id (see ``band_ids``)."""
+        index = ((sku * self._n_bands + band_id) * 2
+                 + bool(combo)) * self._n_buckets + bisect_right(self.thresholds, qty)
+        unit, bulk_bp, time_bp = self.entries[index]
+        raw = unit * qty
+        before_time_disc = discounted(raw, bulk_bp)
+        time_disc = percent_of(before_time_disc, time_bp)
+        after_time_disc = before_time_disc - time_disc
+        bulk_disc = raw - before_time_disc
+        return unit, raw, bulk_disc, before_time_disc, time_disc, after_time_disc
+
+    def combo_sensitive(self, band: str) -> frozenset:
+        """Return the items whose price in ``band`` depends on the combo."""
+        band_id = self.band_ids[band]
+        sensitive = set()
+        for item, item_id in self.item_ids.items():
+            base = ((item_id * self._n_bands + band_id) * 2) * self._n_buckets
+            without = self.entries[base:base + self._n_buckets]
+            with_combo = self.entries[base + self._n_buckets:base + 2 * self._n_buckets]
+            if without != with_combo:
+                sensitive.add(item)
+        return frozenset(sensitive)
+
+    def _price_order(self, order: tuple, band: str) -> dict:
+        """
+        Price a whole order.  Called through ``price_order``, which memoizes
+        the result on ``(order, band)``.
+
+        Parameters
+        ----------
+        order : tuple
+            ``(item, qty)`` pairs.  Items with a quantity of 0 are skipped.
+        band : str
+            The active time band.
+
+        Returns
+        -------
+        dict
+            ``lines`` (a tuple of ``(item, qty) + price_line(...)`` tuples),
+            ``combo`` and the cent totals ``total_raw``, ``total_bulk_disc``,
+            ``total_time_disc`` and ``grand_total``.  Treat it as read-only,
+            it is shared between callers.
+        """
+        combo = self.has_combo(dict(order))
+        lines = []
+        total_raw = total_bulk_disc = total_time_disc = grand_total = 0
+        for item, qty in order:
+            if qty <= 0:
+                continue
+            line = self.price_line(item, qty, band, combo)
+            lines.append((item, qty) + line)
+            total_raw += line[1]
+            total_bulk_disc += line[2]
+            total_time_disc += line[4]
+            grand_total += line[5]
+        return {
+            "lines": tuple(lines),
+            "combo": combo,
+            "total_raw": total_raw,
+            "total_bulk_disc": total_bulk_disc,
+            "total_time_disc": total_time_disc,
+            "grand_total": grand_total,
+        }
+
+    def price_cart_vector(self, cart, band: str) -> dict:
+        """
+        Price a ``catalog.Cart`` of ``self.catalog``.
+
+        Returns the same totals as ``price_order`` on ``cart.order()``, but
+        ``lines`` is a tuple of ``catalog.LineItem`` and nothing is cached.
+        """
+        if cart.catalog is not self.catalog:
+            raise ValueError("cart is for another catalog")
+        qty = cart.qty
+        combo = self._combo_skus is not None and all(qty[sku] for sku in self._combo_skus)
+        band_id = self.band_ids[band]
+        price_sku = self.price_sku
+        lines = []
+        total_raw = total_bulk_disc = total_time_disc = grand_total = 0
+        for sku, q in enumerate(qty):
+            if not q:
+                continue
+            line = LineItem(sku, q, *price_sku(sku, q, band_id, combo))
+            lines.append(line)
+            total_raw += line.raw
+            total_bulk_disc += line.bulk_disc
+            total_time_disc += line.time_disc
+            grand_total += line.after_time_disc
+        return {
+            "lines": tuple(lines),
+            "combo": combo,
+            "total_raw": total_raw,
+            "total_bulk_disc": total_bulk_disc,
+            "total_time_disc": total_time_disc,
+            "grand_total": grand_total,
+        }
+
+
+def _time_rate(item: str, band: str, combo: bool, rules) -> float:
+    for rule_band, items, needs_combo, rate in rules:
+        if rule_band != band:
+            continue
+        if items is not None and item not in items:
+            continue
+        if needs_combo and not combo:
+            continue
+        return rate
+    return 0.0
+
+
+def compile_rules(menu, bulk_tiers=BULK_TIERS, time_band_rules=TIME_BAND_RULES,
+                  bands=BANDS, combo_items=COMBO_ITEMS) -> PricingTables:
+    """
+    Compile a menu and its discount rules into ``PricingTables``.
+
+    Parameters
+    ----------
+    menu : list of dict
+        Menu items as used in ``Final.py``, e.g. ``{'Name': 'Coffee',
+        'Price': 3}`` (or any format ``Catalog.from_menu`` reads).
+    bulk_tiers : list of tuple
+        ``(minimum quantity, rate)`` pairs.
+    time_band_rules : list of tuple
+        ``(band, items, needs_combo, rate)`` rules, first match wins.
+    bands : sequence of str
+        Every band that can be looked up.
+    combo_items : sequence of str
+        Items that together make up the combo.
+
+    Returns
+    -------
+    PricingTables
+    """
+    tiers = sorted(bulk_tiers)
+    thresholds = [min_qty for min_qty, _ in tiers]
+    bulk_bps = [0] + [to_bp(rate) for _, rate in tiers]
+
+    catalog = Catalog.from_menu(menu)
+    entries = []
+    for item, unit in zip(catalog.names, catalog.prices):
+        for band in bands:
+            for combo in (False, True):
+                time_bp = to_bp(_time_rate(item, band, combo, time_band_rules))
+                for bulk_bp in bulk_bps:
+                    entries.append((unit, bulk_bp, time_bp))
+
+    band_ids = {band: i for i, band in enumerate(bands)}
+    return PricingTables(catalog, band_ids, thresholds, entries, tuple(combo_items))
+
+
+@lru_cache(maxsize=None)
+def default_tables() -> PricingTables:
+    """Return the tables for ``MENU`` and the default rules, compiled once."""
+    return compile_rules(MENU)
+
+
+###############################################################################
+# Incremental cart
+###############################################################################
+
+
+class BandCart:
+    """
+    A cart that keeps its priced lines and totals up to date as quantities
+    change, for large orders where repricing everything on each change is
+    too slow.
+
+    ``set_qty`` reprices only the line that changed and adjusts the running
+    totals, so it costs the same whatever the size of the cart.  The combo is
+    re-checked only when a combo item goes from zero to non-zero (or back),
+    and only then are the lines whose price depends on it repriced.  Changing
+    the band reprices every line.
+
+    The ``total_*``/``grand_total`` attributes and ``combo`` are always
+    current; ``priced()`` returns the same shape as
+    ``PricingTables.price_order``.
+    """
+
+    def __init__(self, tables: PricingTables, band: str):
+        self.tables = tables
+        self.band = band
+        self.qty = {}
+        self.lines = {}  # item -> price_line(...) tuple
+        self.total_raw = self.total_bulk_disc = self.total_time_disc = self.grand_total = 0
+        self.combo = False
+        self._combo_present = 0  # combo items with a quantity above zero
+        self._sensitive = tables.combo_sensitive(band)
+
+    def _reprice(self, item: str, qty: int) -> None:
+        old = self.lines.pop(item, None)
+        if old is not None:
+            self.total_raw -= old[1]
+            self.total_bulk_disc -= old[2]
+            self.total_time_disc -= old[4]
+            self.grand_total -= old[5]
+        if qty > 0:
+            line = self.tables.price_line(item, qty, self.band, self.combo)
+            self.lines[item] = line
+            self.total_raw += line[1]
+            self.total_bulk_disc += line[2]
+            self.total_time_disc += line[4]
+            self.grand_total += line[5]
+
+    def set_qty(self, item: str, qty: int) -> None:
+        """Set the quantity of ``item`` and update the totals."""
+        if item not in self.tables.item_ids:
+            raise ValueError(f"not on the menu: {item!r}")
+        old = self.qty.get(item, 0)
+        if qty == old:
+            return
+        if qty > 0:
+            self.qty[item] = qty
+        else:
+            self.qty.pop(item, None)
+
+        combo_changed = False
+        if item in self.tables.combo_items and (old > 0) != (qty > 0):
+            self._combo_present += 1 if qty > 0 else -1
+            combo = self._combo_present == len(self.tables.combo_items)
+            combo_changed = combo != self.combo
+            self.combo = combo
+
+        self._reprice(item, qty)
+        if combo_changed:
+            for other in self._sensitive:
+                if other != item and other in self.qty:
+                    self._reprice(other, self.qty[other])
+
+    def add(self, item: str, delta: int) -> None:
+        """Change the quantity of ``item`` by ``delta``."""
+        self.set_qty(item, max(0, self.qty.get(item, 0) + delta))
+
+    def set_band(self, band: str) -> None:
+        """Switch to another time band, repricing every line."""
+        if band == self.band:
+            return
+        self.band = band
+        self._sensitive = self.tables.combo_sensitive(band)
+        for item, qty in self.qty.items():
+            self._reprice(item, qty)
+
+    def priced(self) -> dict:
+        """Return the cart in the same shape as ``PricingTables.price_order``."""
+        return {
+            "lines": tuple(
+                (item, self.qty[item]) + self.lines[item]
+                for item in self.tables.item_ids if item in self.qty
+            ),
+            "combo": self.combo,
+            "total_raw": self.total_raw,
+            "total_bulk_disc": self.total_bulk_disc,
+            "total_time_disc": self.total_time_disc,
+            "grand_total": self.grand_total,
+        }
+
+
+###############################################################################
+# Receipts
+###############################################################################
+
+LINE_FIELDS = ("item", "qty", "unit", "raw", "bulk_disc", "before_time_disc",
+               "time_disc", "after_time_disc")
+
+
+def price_cart(items: dict, band: str, tables: PricingTables = None) -> dict:
+    """
+    Price a cart and return a receipt made of plain JSON types.
+
+    Parameters
+    ----------
+    items : dict
+        Mapping of item names to quantities.
+    band : str
+        The active time band.
+    tables : PricingTables, optional
+        Defaults to ``default_tables()``.
+
+    Returns
+    -------
+    dict
+        ``band``, ``combo``, ``lines`` (one dict per line with the fields in
+        ``LINE_FIELDS``) and the cent totals from ``price_order``.
+
+    Raises
+    ------
+    ValueError
+        If an item is not on the menu, a quantity is not a non-negative
+        integer or the band is unknown.
+    """
+    if tables is None:
+        tables = default_tables()
+    if band not in tables.band_ids:
+        raise ValueError(f"unknown band: {band!r}")
+    for item, qty in items.items():
+        if item not in tables.item_ids:
+            raise ValueError(f"not on the menu: {item!r}")
+        if type(qty) is not int or qty < 0:
+            raise ValueError(f"quantity for {item!r} must be a non-negative integer")
+
+    # Menu order, so the same cart always hits the same cache entry
+    order = tuple((item, items[item]) for item in tables.item_ids if items.get(item))
+    priced = tables.price_order(order, band)
+    receipt = {"band": band}
+    receipt.update(priced)
+    receipt["lines"] = [dict(zip(LINE_FIELDS, line)) for line in priced["lines"]]
+    return receipt
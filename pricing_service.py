@@ -0,0 +1,200 @@
+"""
+Cafe pricing service
+--------------------
+
+A small HTTP/1.1 server (standard library ``asyncio`` only) that prices carts
+with the same rules as ``Final.py``, for kiosks and delivery integrations that
+do not go through the Streamlit app.
+
+Run it with::
+
+    python pricing_service.py [--host 127.0.0.1] [--port 8502]
+
+Endpoints
+~~~~~~~~~
+
+``POST /price``
+    Body is one cart or a JSON list of carts.  A cart looks like
+    ``{"items": {"Coffee": 2, "Cake": 1}, "band": "morning"}``; ``"slot":
+    "09:00–11:59"`` (one of ``pricing.SLOTS``) may be given instead of
+    ``"band"``.  The reply is one
+    receipt (or a list of receipts, in the same order) as produced by
+    ``pricing.price_cart``.  All amounts are in cents.
+
+    If ``CAFE_PRICE_LISTS`` names a price list directory (see
+    price_lists.py), a cart may give an ``"outlet"`` (default
+    ``CAFE_OUTLET``) and is priced with that outlet's current price list;
+    the receipt then also has ``outlet`` and ``price_list`` (its version).
+
+``GET /health``
+    Returns ``{"status": "ok"}``.
+
+``GET /metrics``
+    Request counts and pricing times in the Prometheus text format (see
+    metrics.py).
+
+A cart that cannot be priced is answered with a 400 and ``{"error": ...}``;
+an unexpected failure with a 500, and the connection stays usable.
+Connections are kept alive, so a client can send many requests over one
+socket.  Sending a list of carts prices the whole batch in one request.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from metrics import REGISTRY, count, export_from_env, span
+from price_lists import current_price_list
+from pricing import SLOTS, price_cart, slot_to_band
+
+log = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class BadRequest(Exception):
+    """Raised for a request that cannot be priced; answered with a 400."""
+
+
+def price_request(payload):
+    """Price one cart (dict) or a batch of carts (list) from a JSON payload."""
+    if isinstance(payload, list):
+        return [price_request(cart) for cart in payload]
+    if not isinstance(payload, dict) or not isinstance(payload.get("items"), dict):
+        raise BadRequest('a cart must be an object with an "items" object')
+    outlet = payload.get("outlet")
+    if outlet is not None and not isinstance(outlet, str):
+        raise BadRequest('"outlet" must be a string')
+    band = payload.get("band")
+    if band is None:
+        slot = payload.get("slot")
+        if slot is None:
+            raise BadRequest('a cart needs a "band" or a "slot"')
+        # slot_to_band maps anything it does not know to the evening band
+        if not isinstance(slot, str) or slot not in SLOTS:
+            raise BadRequest(f"unknown slot {slot!r}, expected one of {SLOTS}")
+        band = slot_to_band(slot)
+    elif not isinstance(band, str):
+        raise BadRequest('"band" must be a string')
+    try:
+        # One snapshot for the whole cart, even if a reload happens meanwhile
+        price_list = current_price_list(outlet)
+        if price_list is None:
+            return price_cart(payload["items"], band)
+        receipt = price_cart(payload["items"], band, price_list.tables)
+    except ValueError as exc:
+        raise BadRequest(str(exc)) from None
+    receipt["outlet"] = price_list.outlet
+    receipt["price_list"] = price_list.version
+    return receipt
+
+
+def _response(status: int, body, keep_alive: bool) -> bytes:
+    # A str body is sent as plain text, anything else as JSON
+    if isinstance(body, str):
+        data, kind = body.encode(), "text/plain; version=0.0.4"
+    else:
+        data, kind = json.dumps(body, ensure_ascii=False).encode(), "application/json"
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: {kind}\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode() + data
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve requests on one connection until the client closes it."""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                writer.write(_response(400, {"error": "request head too large"}, False))
+                return
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, path, version = lines[0].split(" ", 2)
+            except ValueError:
+                writer.write(_response(400, {"error": "malformed request line"}, False))
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response(400, {"error": "bad Content-Length"}, False))
+                return
+            if length > MAX_BODY_BYTES:
+                writer.write(_response(413, {"error": "body too large"}, False))
+                return
+            try:
+                body = await reader.readexactly(length) if length else b""
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # The client closed before sending the whole body
+                return
+
+            if path == "/health":
+                status, reply = 200, {"status": "ok"}
+            elif path == "/metrics":
+                status, reply = 200, REGISTRY.prometheus()
+            elif path != "/price":
+                status, reply = 404, {"error": f"no such endpoint: {path}"}
+            elif method != "POST":
+                status, reply = 405, {"error": "use POST"}
+            else:
+                try:
+                    with span("pricing_service.price"):
+                        status, reply = 200, price_request(json.loads(body))
+                except json.JSONDecodeError as exc:
+                    status, reply = 400, {"error": f"invalid JSON: {exc}"}
+                except BadRequest as exc:
+                    status, reply = 400, {"error": str(exc)}
+                except Exception:
+                    log.exception("pricing request failed")
+                    status, reply = 500, {"error": "internal error"}
+
+            count(f"pricing_service.responses.{status}")
+            writer.write(_response(status, reply, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8502) -> None:
+    """Run the pricing service until cancelled."""
+    server = await asyncio.start_server(handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cafe pricing service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+    export_from_env()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
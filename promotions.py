@@ -0,0 +1,727 @@
+"""
+Promotion engine
+----------------
+
+Promotions written down as data instead of code.  A ``Promotion`` says what it
+takes off (a rate, or a fixed amount in cents), at which stage, on which
+lines, and what has to be in the cart for it to apply; a ``PromotionEngine``
+prices carts with a list of them.
+
+Stages
+~~~~~~
+
+Discounts are taken in three stages, in this order:
+
+``"bulk"``
+    Line discounts taken off the raw line amount (quantity tiers).
+``"time"``
+    Line discounts taken off what is left after the bulk stage (time bands,
+    category discounts).
+``"order"``
+    Discounts taken off the order total after the line stages (combos, flat
+    amounts off).
+
+Bundle deals (``Deal``) sit between the line stages and the order stage.
+Unlike promotions, a deal can be used several times in one order and each
+use takes its units out of the cart, so overlapping deals compete for the
+same units; ``solve_deals`` picks the uses that save the customer the most.
+
+Within a stage, the rules that match are tried in ``priority`` order (lower
+first, then the order they were given in).  The first one applies; after it,
+only ``stackable`` rules are applied, each on what is left by the previous
+one, and a rule that is not stackable ends the stage.  So a list of
+non-stackable rules behaves as "first match wins", like
+``pricing.TIME_BAND_RULES``.  Every discount is rounded half up to the cent
+once (see ``money.py``).
+
+Indexing
+~~~~~~~~
+
+Rules are indexed by what they trigger on: line rules by the items and
+categories they apply to, order rules by one of the items or categories they
+require.  Pricing a cart only looks at the rules filed under the items and
+categories in it (plus the few that apply to everything), so the cost of a
+cart depends on the cart and not on how many promotions are active.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+
+from money import percent_of, to_bp
+
+STAGES = ("bulk", "time", "order")
+LINE_STAGES = STAGES[:2]
+
+# How many distinct carts ``PromotionEngine.solve`` keeps the deals for.
+SOLVED_DEALS_CACHE_SIZE = 1024
+
+# Search nodes ``solve_deals`` may visit per cart; about 30 us each.
+DEAL_SEARCH_NODES = 1000
+LOCAL_SEARCH_PASSES = 10
+
+
+class Promotion:
+    """
+    One promotion rule.
+
+    Parameters
+    ----------
+    name : str
+        Shown on receipts, and must be unique within an engine.
+    stage : str
+        One of ``STAGES``.
+    rate : float, optional
+        Fraction taken off, e.g. ``0.10`` for 10 %.
+    amount : int, optional
+        Cents taken off the order (``"order"`` stage only); never more than
+        what is left of it.  Give exactly one of ``rate`` and ``amount``.
+    items, categories : iterable of str, optional
+        Line stages: the rule applies to lines of these items, or of items in
+        these categories.  Give neither for every line.
+    requires : iterable of str, optional
+        Items that must all be in the cart.
+    requires_categories : iterable of str, optional
+        Categories that must each have an item in the cart.
+    band : str, optional
+        The time band the rule is limited to; None for every band.
+    min_qty : int
+        Line stages: the smallest line quantity the rule applies to.
+        ``"order"`` stage: the smallest number of units in the cart.
+    priority : int
+        Lower priorities are tried first.
+    stackable : bool
+        Whether the rule combines with other stackable rules of its stage.
+    """
+
+    def __init__(self, name: str, stage: str, rate: float = None, amount: int = None,
+                 items=None, categories=None, requires=(), requires_categories=(),
+                 band: str = None, min_qty: int = 0, priority: int = 0,
+                 stackable: bool = False):
+        if stage not in STAGES:
+            raise ValueError(f"unknown stage {stage!r}, expected one of {STAGES}")
+        if (rate is None) == (amount is None):
+            raise ValueError(f"promotion {name!r} needs exactly one of rate and amount")
+        if amount is not None and stage != "order":
+            raise ValueError(f"promotion {name!r}: fixed amounts are for the order stage")
+        if stage == "order" and (items is not None or categories is not None):
+            raise ValueError(f"promotion {name!r}: order promotions apply to the whole "
+                             "order, use requires/requires_categories instead")
+        self.name = name
+        self.stage = stage
+        self.rate = rate
+        self.bp = None if rate is None else to_bp(rate)
+        self.amount = amount
+        self.items = None if items is None else frozenset(items)
+        self.categories = None if categories is None else frozenset(categories)
+        self.requires = tuple(requires)
+        self.requires_categories = tuple(requires_categories)
+        self.band = band
+        self.min_qty = min_qty
+        self.priority = priority
+        self.stackable = stackable
+
+    def __repr__(self) -> str:
+        return f"Promotion({self.name!r}, {self.stage!r})"
+
+    def applies_to_line(self, item: str, category: str) -> bool:
+        """Return True if the rule targets lines of ``item`` (line stages)."""
+        if self.items is None and self.categories is None:
+            return True
+        return ((self.items is not None and item in self.items)
+                or (self.categories is not None and category in self.categories))
+
+    def conditions_met(self, qty: int, band: str, present: set, present_categories: set) -> bool:
+        """
+        Return True if the cart meets the rule's conditions.
+
+        ``qty`` is the line quantity for line stages and the number of units
+        in the cart for the order stage.
+        """
+        return (qty >= self.min_qty
+                and (self.band is None or self.band == band)
+                and all(item in present for item in self.requires)
+                and all(cat in present_categories for cat in self.requires_categories))
+
+    def discount(self, cents: int) -> int:
+        """Return what the rule takes off ``cents``."""
+        if self.amount is not None:
+            return min(self.amount, cents)
+        return percent_of(cents, self.bp)
+
+
+def apply_stage(rules, cents: int, qty: int, band: str, present: set,
+                present_categories: set, applied: list) -> int:
+    """
+    Apply one stage of ``rules`` (already in priority order) to ``cents``.
+
+    Returns the total discount in cents and appends the name of every rule
+    used to ``applied``.
+    """
+    total = 0
+    stacking = False
+    for rule in rules:
+        if stacking and not rule.stackable:
+            continue
+        if not rule.conditions_met(qty, band, present, present_categories):
+            continue
+        off = rule.discount(cents)
+        cents -= off
+        total += off
+        applied.append(rule.name)
+        if not rule.stackable:
+            break
+        stacking = True
+    return total
+
+
+class PromotionEngine:
+    """
+    Price carts with a list of ``Promotion`` rules.
+
+    Parameters
+    ----------
+    prices : dict
+        Mapping of item names to unit prices in cents.
+    promotions : iterable of Promotion
+        The active promotions.
+    categories : dict, optional
+        Mapping of item names to categories.  Items without one can still be
+        targeted by name.
+    deals : iterable of Deal, optional
+        Bundle deals on offer.
+
+    The candidate rules for each (stage, band, item) are worked out the first
+    time they are needed and kept, so a line is priced from a short
+    pre-sorted list.
+    """
+
+    def __init__(self, prices: dict, promotions, categories: dict = None, deals=()):
+        self.prices = dict(prices)
+        self.categories = dict(categories or {})
+        self.promotions = list(promotions)
+        self.deals = list(deals)
+        names = [rule.name for rule in self.promotions + self.deals]
+        if len(set(names)) != len(names):
+            raise ValueError("promotion and deal names must be unique")
+        self._deal_items = {item for deal in self.deals for item in deal.items}
+        # Bounded LRU per engine, keyed on the cart's deal items only
+        self.solve = lru_cache(maxsize=SOLVED_DEALS_CACHE_SIZE)(self._solve)
+
+        # stage -> trigger key -> rules; the key None holds rules that apply
+        # to every line (line stages) or need nothing in particular (order).
+        self._index = {stage: defaultdict(list) for stage in STAGES}
+        for seq, rule in enumerate(self.promotions):
+            entry = (rule.priority, seq, rule)
+            index = self._index[rule.stage]
+            if rule.stage in LINE_STAGES:
+                if rule.items is None and rule.categories is None:
+                    index[None].append(entry)
+                for item in rule.items or ():
+                    index[("item", item)].append(entry)
+                for cat in rule.categories or ():
+                    index[("category", cat)].append(entry)
+            elif rule.requires:
+                # All of them are needed, so filing it under one is enough
+                index[("item", rule.requires[0])].append(entry)
+            elif rule.requires_categories:
+                index[("category", rule.requires_categories[0])].append(entry)
+            else:
+                index[None].append(entry)
+        self._line_rules = {}
+
+    def line_rules(self, stage: str, band: str, item: str) -> tuple:
+        """Return the rules of ``stage`` that can apply to ``item`` in ``band``."""
+        key = (stage, band, item)
+        rules = self._line_rules.get(key)
+        if rules is None:
+            index = self._index[stage]
+            entries = index.get(None, []) + index.get(("item", item), [])
+            category = self.categories.get(item)
+            if category is not None:
+                entries += index.get(("category", category), [])
+            rules = tuple(
+                rule for _, _, rule in sorted(set(entries), key=lambda e: e[:2])
+                if rule.band is None or rule.band == band
+            )
+            self._line_rules[key] = rules
+        return rules
+
+    def order_rules(self, band: str, present: set, present_categories: set) -> list:
+        """Return the order rules triggered by what is in the cart, in priority order."""
+        index = self._index["order"]
+        entries = list(index.get(None, ()))
+        for item in present:
+            entries += index.get(("item", item), ())
+        for cat in present_categories:
+            entries += index.get(("category", cat), ())
+        entries.sort(key=lambda e: e[:2])
+        return [rule for _, _, rule in entries if rule.band is None or rule.band == band]
+
+    def _solve(self, order: tuple) -> dict:
+        """
+        Solve the deals for ``order``, a sorted tuple of ``(item, qty)``
+        pairs.  Called through ``solve``, which memoizes the result.
+        """
+        return solve_deals(dict(order), self.deals, self.prices)
+
+    def price(self, cart: dict, band: str = None) -> dict:
+        """
+        Price a cart.
+
+        Parameters
+        ----------
+        cart : dict
+            Mapping of item names to quantities.  Items with a quantity of 0
+            are skipped.
+        band : str, optional
+            The active time band, if any.
+
+        Returns
+        -------
+        dict
+            ``lines`` (a tuple of ``(item, qty, unit, raw, bulk_disc,
+            before_time_disc, time_disc, after_time_disc)`` tuples, as in
+            ``pricing.PricingTables.price_order``), ``applied`` (the names of
+            the promotions and deals used), ``deals`` (the deal uses, see
+            ``solve_deals``), and the cent totals ``total_raw``,
+            ``total_bulk_disc``, ``total_time_disc``, ``deal_disc``,
+            ``order_disc`` and ``grand_total``.  Deals are valued at menu
+            prices and never take off more than is left after the lines.
+
+        Raises
+        ------
+        ValueError
+            If an item has no price.
+        """
+        order = [(item, qty) for item, qty in cart.items() if qty > 0]
+        present = {item for item, _ in order}
+        present_categories = {self.categories[item] for item in present
+                              if item in self.categories}
+        applied = []
+        lines = []
+        total_raw = total_bulk_disc = total_time_disc = after_lines = units = 0
+        for item, qty in order:
+            unit = self.prices.get(item)
+            if unit is None:
+                raise ValueError(f"not on the menu: {item!r}")
+            raw = unit * qty
+            bulk_disc = apply_stage(self.line_rules("bulk", band, item), raw, qty, band,
+                                    present, present_categories, applied)
+            before_time_disc = raw - bulk_disc
+            time_disc = apply_stage(self.line_rules("time", band, item), before_time_disc,
+                                    qty, band, present, present_categories, applied)
+            after_time_disc = before_time_disc - time_disc
+            lines.append((item, qty, unit, raw, bulk_disc, before_time_disc, time_disc,
+                          after_time_disc))
+            total_raw += raw
+            total_bulk_disc += bulk_disc
+            total_time_disc += time_disc
+            after_lines += after_time_disc
+            units += qty
+
+        deals = ()
+        deal_disc = 0
+        if self.deals:
+            solved = self.solve(tuple(sorted(
+                (item, qty) for item, qty in order if item in self._deal_items
+            )))
+            deals = solved["uses"]
+            deal_disc = min(solved["saving"], after_lines)
+            applied.extend(name for name, _, _ in deals)
+        after_deals = after_lines - deal_disc
+
+        order_disc = apply_stage(self.order_rules(band, present, present_categories),
+                                 after_deals, units, band, present, present_categories,
+                                 applied)
+        return {
+            "lines": tuple(lines),
+            "applied": tuple(dict.fromkeys(applied)),
+            "deals": deals,
+            "total_raw": total_raw,
+            "total_bulk_disc": total_bulk_disc,
+            "total_time_disc": total_time_disc,
+            "deal_disc": deal_disc,
+            "order_disc": order_disc,
+            "grand_total": after_deals - order_disc,
+        }
+
+    def order_discount(self, cart: dict, cents: int, band: str = None) -> int:
+        """Return what the order promotions take off ``cents`` for ``cart``."""
+        present = {item for item, qty in cart.items() if qty > 0}
+        present_categories = {self.categories[item] for item in present
+                              if item in self.categories}
+        units = sum(qty for qty in cart.values() if qty > 0)
+        return apply_stage(self.order_rules(band, present, present_categories), cents,
+                           units, band, present, present_categories, [])
+
+
+def promotions_from_rules(bulk_tiers, time_band_rules, combo_items) -> list:
+    """
+    Translate the rule tables of ``pricing.py`` into promotions.
+
+    Bulk tiers become ``"bulk"`` rules (the highest tier reached wins) and
+    time-band rules become ``"time"`` rules, first match winning as before.
+    """
+    promotions = [
+        Promotion(f"Bulk {min_qty}+", "bulk", rate=rate, min_qty=min_qty, priority=-min_qty)
+        for min_qty, rate in bulk_tiers
+    ]
+    for priority, (band, items, needs_combo, rate) in enumerate(time_band_rules):
+        promotions.append(Promotion(
+            f"{band.title()} {rate:.0%}" + (" combo" if needs_combo else ""), "time",
+            rate=rate, items=items, band=band,
+            requires=combo_items if needs_combo else (), priority=priority,
+        ))
+    return promotions
+
+
+###############################################################################
+# Bundle deals
+###############################################################################
+
+
+class Deal:
+    """
+    A bundle deal that can be used several times in one order.
+
+    Each use takes a fixed set of units out of the cart (``items``), and a
+    unit can be part of only one deal, so overlapping deals compete for the
+    same units.  ``solve_deals`` picks the uses that save the customer the
+    most.
+
+    Parameters
+    ----------
+    name : str
+        Shown on receipts.
+    items : dict
+        Units taken by one use, e.g. ``{"Coffee": 1, "Muffin": 1}``.
+    amount : int, optional
+        Cents off per use.
+    price : int, optional
+        Price of the bundle in cents; the saving is the bundle at menu prices
+        minus this.
+    rate : float, optional
+        Fraction off the bundle at menu prices.
+    max_uses : int, optional
+        The most times the deal may be used in one order.
+
+    Give exactly one of ``amount``, ``price`` and ``rate``.
+    """
+
+    def __init__(self, name: str, items: dict, amount: int = None, price: int = None,
+                 rate: float = None, max_uses: int = None):
+        if sum(x is not None for x in (amount, price, rate)) != 1:
+            raise ValueError(f"deal {name!r} needs exactly one of amount, price and rate")
+        if not items or any(n <= 0 for n in items.values()):
+            raise ValueError(f"deal {name!r} needs a positive quantity of each item")
+        self.name = name
+        self.items = dict(items)
+        self.amount = amount
+        self.price = price
+        self.bp = None if rate is None else to_bp(rate)
+        self.max_uses = max_uses
+
+    def __repr__(self) -> str:
+        return f"Deal({self.name!r}, {self.items!r})"
+
+    def saving(self, prices: dict) -> int:
+        """Return the saving in cents of one use at menu ``prices``."""
+        if self.amount is not None:
+            return self.amount
+        full = sum(prices[item] * n for item, n in self.items.items())
+        if self.price is not None:
+            return full - self.price
+        return percent_of(full, self.bp)
+
+
+def _components(candidates) -> list:
+    # Group deals that share an item; groups are solved independently.
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for deal, _ in candidates:
+        first, *rest = deal.items
+        for item in rest:
+            parent[find(item)] = find(first)
+    groups = defaultdict(list)
+    for deal, saving in candidates:
+        groups[find(next(iter(deal.items)))].append((deal, saving))
+    return list(groups.values())
+
+
+def _deal_order(candidates) -> list:
+    # Order deals so that the ones sharing items are next to each other: the
+    # set of items already touched and still wanted by a later deal (the
+    # search "frontier") stays small, and so do the memo keys.
+    by_item = defaultdict(list)
+    for pos, (deal, _) in enumerate(candidates):
+        for item in deal.items:
+            by_item[item].append(pos)
+    placed = [False] * len(candidates)
+    order = []
+    for start in sorted(range(len(candidates)), key=lambda p: -candidates[p][1]):
+        if placed[start]:
+            continue
+        queue = [start]
+        placed[start] = True
+        while queue:
+            pos = queue.pop(0)
+            order.append(candidates[pos])
+            for item in candidates[pos][0].items:
+                for other in by_item[item]:
+                    if not placed[other]:
+                        placed[other] = True
+                        queue.append(other)
+    return order
+
+
+def _greedy_counts(candidates, stock: dict) -> list:
+    # Best saving per unit first, then repeatedly give up one use of a deal
+    # and let the deals sharing its items take the freed units, keeping the
+    # change when it saves more.  A good first solution to prune against.
+    n = len(candidates)
+    ranked = sorted(range(n), key=lambda p: -candidates[p][1] / sum(candidates[p][0].items.values()))
+    by_item = defaultdict(list)
+    for pos in ranked:
+        for item in candidates[pos][0].items:
+            by_item[item].append(pos)
+    rank = {pos: r for r, pos in enumerate(ranked)}
+    neighbours = [sorted({q for item in candidates[p][0].items for q in by_item[item]} - {p},
+                         key=rank.__getitem__) for p in range(n)]
+    left = dict(stock)
+    counts = [0] * n
+
+    def take(pos, limit=None):
+        deal = candidates[pos][0]
+        more = min(left[item] // k for item, k in deal.items.items())
+        if deal.max_uses is not None:
+            more = min(more, deal.max_uses - counts[pos])
+        if limit is not None:
+            more = min(more, limit)
+        for item, k in deal.items.items():
+            left[item] -= more * k
+        counts[pos] += more
+        return more
+
+    for pos in ranked:
+        take(pos)
+    improved = True
+    passes = 0
+    while improved and passes < LOCAL_SEARCH_PASSES:
+        improved = False
+        passes += 1
+        for pos in ranked:
+            if not counts[pos]:
+                continue
+            take(pos, -1)
+            gain = -candidates[pos][1]
+            taken = []
+            for other in neighbours[pos]:
+                more = take(other)
+                if more:
+                    taken.append((other, more))
+                    gain += more * candidates[other][1]
+            if gain > 0:
+                improved = True
+                continue
+            for other, more in taken:
+                take(other, -more)
+            take(pos, 1)
+    return counts
+
+
+def _item_prices(uses, savings, cap, start, target, rounds=20) -> list:
+    # Subgradient descent on the Lagrangian dual of "use each item at most
+    # ``start`` times": look for item prices y >= 0 making
+    #   sum(start[j] * y[j]) + sum(most[d] * max(0, savings[d] - units of d at y))
+    # small, where ``most[d]`` is how often deal d fits in ``start``.
+    most = [min(min(start[j] // k for j, k in use), c) for use, c in zip(uses, cap)]
+    y = [0.0] * len(start)
+    for use, saving in zip(uses, savings):
+        rate = saving / sum(k for _, k in use)
+        for j, _ in use:
+            y[j] = max(y[j], rate)
+    best_y, best_value = list(y), None
+    for _ in range(rounds):
+        grad = list(start)
+        value = sum(s * p for s, p in zip(start, y))
+        for d, use in enumerate(uses):
+            reduced = savings[d] - sum(k * y[j] for j, k in use)
+            if reduced > 0 and most[d]:
+                value += most[d] * reduced
+                for j, k in use:
+                    grad[j] -= most[d] * k
+        if best_value is None or value < best_value:
+            best_y, best_value = list(y), value
+        norm = sum(g * g for g in grad)
+        if not norm or value - target < 1:
+            break
+        step = (value - target) / norm
+        y = [max(0.0, p - step * g) for p, g in zip(y, grad)]
+    return best_y
+
+
+def _solve_component(candidates, stock: dict, max_nodes: int) -> tuple:
+    # Depth-first branch and bound over how many times each deal is used.
+    # A node (deal index, units left of the frontier items) reached again
+    # with no more saving than before is pruned: that is the memo.  Returns
+    # the uses and the number of nodes visited; if that reached
+    # ``max_nodes`` the search stopped early.
+    candidates = _deal_order(candidates)
+    n = len(candidates)
+    items = sorted({item for deal, _ in candidates for item in deal.items})
+    col = {item: j for j, item in enumerate(items)}
+    uses = [tuple((col[item], k) for item, k in deal.items.items()) for deal, _ in candidates]
+    savings = [saving for _, saving in candidates]
+    limits = [deal.max_uses for deal, _ in candidates]
+    start = [stock[item] for item in items]
+
+    # Upper bound at deal i: every unit still wanted by a deal from i on
+    # earns the best saving per unit any of those deals gives its item.
+    # Items nobody has touched yet are still at ``start``, so only the
+    # frontier needs adding up at search time.
+    per_unit = [None] * (n + 1)
+    per_unit[n] = {}
+    for i in range(n - 1, -1, -1):
+        rates = dict(per_unit[i + 1])
+        rate = savings[i] / sum(k for _, k in uses[i])
+        for j, _ in uses[i]:
+            if rate > rates.get(j, 0):
+                rates[j] = rate
+        per_unit[i] = rates
+    full_bound = [sum(start[j] * rate for j, rate in rates.items()) for rates in per_unit]
+    touched = set()
+    frontier = []
+    for i in range(n + 1):
+        frontier.append(tuple(sorted(touched & per_unit[i].keys())))
+        if i < n:
+            touched.update(j for j, _ in uses[i])
+    # A deal that shares nothing with the deals after it is simply used as
+    # often as possible.
+    alone = [not any(j in per_unit[i + 1] for j, _ in uses[i]) for i in range(n)]
+
+    greedy = _greedy_counts(candidates, stock)
+    best = [sum(c * s for c, s in zip(greedy, savings)), greedy]
+
+    # A second bound from item prices: if each unit of item j is "worth"
+    # prices[j], the deals from i on can save at most what their units are
+    # worth, plus whatever a deal saves above the worth of its units times
+    # the number of times it fits in the cart.  Any prices give a valid
+    # bound; ``_item_prices`` looks for low ones.
+    cap = [limits[d] if limits[d] is not None else max(start) for d in range(n)]
+    prices = _item_prices(uses, savings, cap, start, best[0])
+    above = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        reduced = savings[i] - sum(k * prices[j] for j, k in uses[i])
+        most = min(min(start[j] // k for j, k in uses[i]), cap[i])
+        above[i] = above[i + 1] + max(0.0, reduced) * most
+    item_bound = [sum(start[j] * prices[j] for j in per_unit[i]) + above[i]
+                  for i in range(n + 1)]
+    counts = [0] * n
+    seen = {}
+    nodes = 0
+    left = list(start)
+
+    def search(i, saving):
+        nonlocal nodes
+        if saving > best[0]:
+            best[0], best[1] = saving, counts[:i] + [0] * (n - i)
+        if i == n or nodes >= max_nodes:
+            return
+        nodes += 1
+        key = (i,) + tuple(left[j] for j in frontier[i])
+        if seen.get(key, -1) >= saving:
+            return
+        seen[key] = saving
+        rates = per_unit[i]
+        bound = full_bound[i] - sum((start[j] - left[j]) * rates[j] for j in frontier[i])
+        if saving + bound < best[0] + 1 - 1e-6:  # savings are whole cents
+            return
+        bound = item_bound[i] - sum((start[j] - left[j]) * prices[j] for j in frontier[i])
+        if saving + bound < best[0] + 1 - 1e-6:  # savings are whole cents
+            return
+        most = min(left[j] // k for j, k in uses[i])
+        if limits[i] is not None:
+            most = min(most, limits[i])
+        for count in (range(most, -1, -1) if not alone[i] else (most,)):
+            for j, k in uses[i]:
+                left[j] -= count * k
+            counts[i] = count
+            search(i + 1, saving + count * savings[i])
+            for j, k in uses[i]:
+                left[j] += count * k
+        counts[i] = 0
+
+    search(0, 0)
+    chosen = [(deal, count, saving)
+              for (deal, saving), count in zip(candidates, best[1]) if count]
+    return chosen, nodes
+
+
+def solve_deals(cart: dict, deals, prices: dict, max_nodes: int = DEAL_SEARCH_NODES) -> dict:
+    """
+    Pick the combination of deal uses that saves the customer the most.
+
+    Deals that share no item are solved separately, so a large catering cart
+    splits into many small problems.  Each is searched by branch and bound,
+    starting from the greedy pick (best saving per unit first), so the
+    answer is never worse than greedy.
+
+    Parameters
+    ----------
+    cart : dict
+        Mapping of item names to quantities.
+    deals : iterable of Deal
+        The deals on offer.
+    prices : dict
+        Menu prices in cents, used to value ``price`` and ``rate`` deals.
+    max_nodes : int
+        Search budget for the whole cart.  If it runs out, the best
+        combination found so far is used for the groups not yet proved.
+
+    Returns
+    -------
+    dict
+        ``saving`` (total cents off), ``uses`` (a tuple of ``(deal name,
+        times used, cents off)`` in the order the deals were given),
+        ``units`` (how many units of each item the deals took) and
+        ``optimal`` (False if the search budget ran out).
+    """
+    candidates = []
+    for deal in deals:
+        if any(cart.get(item, 0) < k for item, k in deal.items.items()):
+            continue
+        saving = deal.saving(prices)
+        if saving > 0:
+            candidates.append((deal, saving))
+
+    chosen = {}
+    optimal = True
+    # Small groups first, so a big one cannot use up the budget of the rest
+    for component in sorted(_components(candidates), key=len):
+        stock = {item: cart[item] for deal, _ in component for item in deal.items}
+        component_uses, nodes = _solve_component(component, stock, max_nodes)
+        optimal = optimal and nodes < max_nodes
+        max_nodes = max(0, max_nodes - nodes)
+        for deal, count, saving in component_uses:
+            chosen[deal.name] = (deal, count, saving)
+
+    uses = []
+    units = defaultdict(int)
+    for deal, _ in candidates:
+        if deal.name in chosen:
+            _, count, saving = chosen[deal.name]
+            uses.append((deal.name, count, count * saving))
+            for item, k in deal.items.items():
+                units[item] += count * k
+    return {
+        "saving": sum(off for _, _, off in uses),
+        "uses": tuple(uses),
+        "units": dict(units),
+        "optimal": optimal,
+    }
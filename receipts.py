@@ -0,0 +1,195 @@
+"""
+Receipt rendering
+-----------------
+
+Formats priced cart lines straight into an HTML table, a dict of columns, or
+plain text and ESC/POS bytes for a thermal printer, without building a
+pandas DataFrame on every rerun.
+
+Lines are tuples in ``pricing.LINE_FIELDS`` order, as returned by
+``PricingTables.price_order`` and ``BandCart.priced`` (the first field is the
+item name), or ``catalog.LineItem`` records (the item is a SKU id, resolved
+through the renderer's catalog).  ``cafe_app.receipt_lines`` converts a
+``calculate_totals`` result to that shape.  Amounts are cents.
+
+A ``ReceiptRenderer`` is built once per set of columns.  It keeps each item's
+formatted (and HTML-escaped) name and the formatted text of the amounts it
+has seen, so rendering a receipt is mostly string joins.
+"""
+
+from html import escape
+
+from money import format_cents
+from pricing import LINE_FIELDS
+
+# (header, field) pairs; the fields are those of pricing.LINE_FIELDS
+BREAKDOWN_COLUMNS = (
+    ("Item", "item"),
+    ("Qty", "qty"),
+    ("Unit", "unit"),
+    ("Raw", "raw"),
+    ("Bulk −", "bulk_disc"),
+    ("Before time discount", "before_time_disc"),
+    ("Time disc −", "time_disc"),
+    ("After time discount", "after_time_disc"),
+)
+ITEM_COLUMNS = (
+    ("Item", "item"),
+    ("Quantity", "qty"),
+    ("Price per item", "unit"),
+    ("Subtotal", "raw"),
+)
+
+# Receipt width in characters: 32 for 58 mm paper, 48 for 80 mm (font A)
+TEXT_WIDTH = 32
+# Distinct amounts whose text is kept; the cache is cleared when it fills up
+MONEY_CACHE_SIZE = 4096
+
+# ESC/POS commands
+ESC_INIT = b"\x1b@"
+ESC_BOLD_ON, ESC_BOLD_OFF = b"\x1bE\x01", b"\x1bE\x00"
+ESC_CENTER, ESC_LEFT = b"\x1ba\x01", b"\x1ba\x00"
+ESC_FEED_CUT = b"\x1bd\x03\x1dV\x00"  # feed three lines, full cut
+
+
+class ReceiptRenderer:
+    """
+    Render priced lines with a fixed set of columns.
+
+    Parameters
+    ----------
+    columns : sequence of tuple
+        ``(header, field)`` pairs, e.g. ``BREAKDOWN_COLUMNS``.
+    symbol : str
+        Currency symbol for amounts.
+    catalog : catalog.Catalog, optional
+        Needed to name ``LineItem`` lines, which carry a SKU id.
+    """
+
+    def __init__(self, columns=BREAKDOWN_COLUMNS, symbol: str = "$", catalog=None):
+        self.headers = tuple(header for header, _ in columns)
+        self.fields = tuple(LINE_FIELDS.index(field) for _, field in columns)
+        self.symbol = symbol
+        self.catalog = catalog
+        self._amount = self.fields[-1]  # the column shown on printed receipts
+        self._header_html = "<tr>" + "".join(f"<th>{escape(h)}</th>" for h in self.headers) + "</tr>"
+        self._names = {}  # item name or SKU id -> name
+        self._names_html = {}
+        self._money = {}
+
+    def _name(self, item) -> str:
+        name = self._names.get(item)
+        if name is None:
+            name = self.catalog.names[item] if isinstance(item, int) else item
+            self._names[item] = name
+            self._names_html[item] = escape(name)
+        return name
+
+    def _format(self, cents: int) -> str:
+        text = self._money.get(cents)
+        if text is None:
+            if len(self._money) >= MONEY_CACHE_SIZE:
+                self._money.clear()
+            text = self._money[cents] = format_cents(cents, self.symbol)
+        return text
+
+    def _tuples(self, lines):
+        for line in lines:
+            if isinstance(line, tuple):
+                yield line
+            else:
+                yield (line.sku, line.qty, line.unit, line.raw, line.bulk_disc,
+                       line.before_time_disc, line.time_disc, line.after_time_disc)
+
+    def rows(self, lines) -> list:
+        """Return one list of cell strings per line."""
+        fields = self.fields
+        rows = []
+        for line in self._tuples(lines):
+            row = [None] * len(fields)
+            for col, field in enumerate(fields):
+                value = line[field]
+                if field == 0:
+                    row[col] = self._name(value)
+                elif field == 1:
+                    row[col] = str(value)
+                else:
+                    row[col] = self._format(value)
+            rows.append(row)
+        return rows
+
+    def table(self, lines) -> dict:
+        """Return ``{header: column of strings}``, e.g. for ``st.table``."""
+        rows = self.rows(lines)
+        return {header: [row[col] for row in rows] for col, header in enumerate(self.headers)}
+
+    def html(self, lines, totals=()) -> str:
+        """
+        Return an HTML table of the lines.
+
+        ``totals`` is a sequence of ``(label, cents)`` rows added below the
+        lines, in the last column.
+        """
+        fields = self.fields
+        parts = ["<table class='cafe-receipt'><thead>", self._header_html, "</thead><tbody>"]
+        for line in self._tuples(lines):
+            parts.append("<tr>")
+            for field in fields:
+                value = line[field]
+                if field == 0:
+                    self._name(value)
+                    parts.append(f"<td>{self._names_html[value]}</td>")
+                elif field == 1:
+                    parts.append(f"<td>{value}</td>")
+                else:
+                    parts.append(f"<td align='right'>{self._format(value)}</td>")
+            parts.append("</tr>")
+        span = len(fields) - 1
+        for label, cents in totals:
+            parts.append(f"<tr><th colspan='{span}' align='right'>{escape(label)}</th>"
+                         f"<td align='right'>{self._format(cents)}</td></tr>")
+        parts.append("</tbody></table>")
+        return "".join(parts)
+
+    def text(self, lines, totals=(), width: int = TEXT_WIDTH) -> str:
+        """
+        Return a plain-text receipt ``width`` characters wide.
+
+        Each line shows the item, ``x qty`` and the last column's amount,
+        followed by the ``(label, cents)`` totals.
+        """
+        out = []
+        for line in self._tuples(lines):
+            amount = self._format(line[self._amount])
+            room = width - len(amount) - 1
+            left = f"{self._name(line[0])} x{line[1]}"[:room]
+            out.append(left.ljust(room) + " " + amount)
+        if totals:
+            out.append("-" * width)
+            for label, cents in totals:
+                amount = self._format(cents)
+                out.append(label[:width - len(amount) - 1].ljust(width - len(amount)) + amount)
+        return "\n".join(out)
+
+    def escpos(self, lines, totals=(), title: str = "", width: int = TEXT_WIDTH,
+               encoding: str = "cp437") -> bytes:
+        """
+        Return the receipt as ESC/POS bytes for a thermal printer: centred
+        bold ``title``, the ``text`` body, the last total in bold, then feed
+        and cut.  Characters the printer's code page lacks become ``?``.
+        """
+        def encode(text):
+            return text.encode(encoding, "replace")
+
+        out = [ESC_INIT]
+        if title:
+            out += [ESC_CENTER, ESC_BOLD_ON, encode(title[:width]), b"\n", ESC_BOLD_OFF, ESC_LEFT]
+        body = self.text(lines, totals, width).split("\n")
+        last = len(body) - 1 if totals else None
+        for i, row in enumerate(body):
+            if i == last:
+                out += [ESC_BOLD_ON, encode(row), b"\n", ESC_BOLD_OFF]
+            else:
+                out += [encode(row), b"\n"]
+        out.append(ESC_FEED_CUT)
+        return b"".join(out)
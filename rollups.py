@@ -0,0 +1,408 @@
+"""
+End-of-day rollups
+------------------
+
+Daily sales figures computed in one pass over the priced orders, in memory
+that does not grow with the number of orders:
+
+* revenue and units by item, and orders and revenue by time band;
+* discount totals split into bulk, time-band, voucher and combo;
+* orders and revenue per hour of the day;
+* approximate quantiles of basket size (units per order) and ticket value,
+  from a t-digest.
+
+Orders can be fed one at a time (``DailyRollup.add``, e.g. from
+``read_jsonl`` or ``JournalReader.replay``) or a whole order journal can be
+read in fixed-size chunks of columns (``DailyRollup.add_journal``), which is
+much faster for millions of orders.  Rollups of different shards or days
+can be merged.
+
+The journal is append-only and holds every day, so a rollup only counts the
+orders in its ``[start, end)`` timestamp range (``day_bounds`` gives the
+range of a local calendar day).  Hours of the day are local time as of each
+order, so orders on either side of a daylight-saving change land in the
+right hour.  Amounts are summed as integer cents.
+
+Run it on a journal or a JSON-lines file of orders with::
+
+    python rollups.py order_journal [--day 2025-06-30 | --all]
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from collections import defaultdict
+
+from journal import LINES_FILE, NO_BAND, ORDERS_FILE, record_dtypes
+from pricing import BANDS
+
+TDIGEST_COMPRESSION = 100
+JOURNAL_CHUNK_ORDERS = 1 << 18
+QUANTILES = (0.5, 0.9, 0.99)
+NO_BAND_NAME = "none"
+OFFSET_STEP = 900  # seconds; UTC offsets and their changes are whole quarter hours
+
+
+def day_bounds(day: str = None) -> tuple:
+    """
+    Return the ``(start, end)`` timestamps of a local calendar day,
+    ``"YYYY-MM-DD"`` (today by default).  A day is 23 or 25 hours long when
+    the clocks change.
+    """
+    if day is None:
+        day = time.strftime("%Y-%m-%d")
+    year, month, date = (int(part) for part in day.split("-"))
+    start = time.mktime((year, month, date, 0, 0, 0, 0, 0, -1))
+    end = time.mktime((year, month, date + 1, 0, 0, 0, 0, 0, -1))
+    return start, end
+
+
+class TDigest:
+    """
+    A merging t-digest (Dunning & Ertl) for approximate quantiles.
+
+    Values are buffered and merged into at most about ``compression * pi / 2``
+    centroids, which are small near the ends of the distribution, so the
+    tail quantiles stay accurate.  Memory is fixed whatever the number of
+    values added.
+    """
+
+    def __init__(self, compression: int = TDIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffer_limit = 5 * compression
+
+    def add(self, value, weight=1) -> None:
+        self._buffer.append((value, weight))
+        if len(self._buffer) >= self._buffer_limit:
+            self._flush()
+
+    def add_many(self, values, weights) -> None:
+        """Add ``values`` with the matching ``weights`` (e.g. counts)."""
+        self._buffer.extend(zip(values, weights))
+        if len(self._buffer) >= self._buffer_limit:
+            self._flush()
+
+    def merge(self, other: "TDigest") -> None:
+        """Add every centroid of ``other`` to this digest."""
+        other._flush()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._flush()
+
+    def _k_to_q(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _q_to_k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        for value, _ in self._buffer:
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        means, weights = [], []
+        mean, weight = points[0]
+        done = 0
+        limit = total * self._k_to_q(self._q_to_k(0) + 1)
+        for value, w in points[1:]:
+            if done + weight + w <= limit:
+                weight += w
+                mean += (value - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                done += weight
+                limit = total * self._k_to_q(self._q_to_k(done / total) + 1)
+                mean, weight = value, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights, self.total = means, weights, total
+
+    def quantile(self, q: float) -> float:
+        """Return the approximate ``q`` quantile, or NaN if nothing was added."""
+        self._flush()
+        if not self.means:
+            return math.nan
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * self.total
+        # Each centroid sits at the middle of its weight; interpolate
+        # between neighbours, and towards min/max at the ends.
+        cumulative = 0
+        previous_mid, previous_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            mid = cumulative + weight / 2
+            if target < mid:
+                if mid == previous_mid:
+                    return mean
+                share = (target - previous_mid) / (mid - previous_mid)
+                return previous_mean + share * (mean - previous_mean)
+            previous_mid, previous_mean = mid, mean
+            cumulative += weight
+        if cumulative == previous_mid:
+            return self.max
+        share = (target - previous_mid) / (cumulative - previous_mid)
+        return previous_mean + min(1.0, share) * (self.max - previous_mean)
+
+    def summary(self) -> dict:
+        """Mean, min, max and ``QUANTILES`` of what was added."""
+        self._flush()
+        if not self.total:
+            return {"count": 0}
+        mean = sum(m * w for m, w in zip(self.means, self.weights)) / self.total
+        result = {"count": self.total, "mean": mean, "min": self.min, "max": self.max}
+        for q in QUANTILES:
+            result[f"p{round(q * 100)}"] = self.quantile(q)
+        return result
+
+
+class DailyRollup:
+    """
+    Incremental end-of-day figures.
+
+    Parameters
+    ----------
+    utc_offset : float, optional
+        Seconds added to timestamps before taking the hour of the day.
+        Defaults to the local time zone's offset at each order's time.
+    start, end : float, optional
+        Only orders with ``start <= timestamp < end`` are counted; see
+        ``day_bounds``.  Unbounded by default.
+
+    Orders are dictionaries shaped like ``JournalReader.order``: ``band``,
+    ``timestamp``, the cent totals ``bulk_disc``, ``time_disc``,
+    ``voucher_disc``, ``promo_disc`` and ``grand_total``, and ``lines`` with
+    ``item``, ``qty`` and ``total``.  The combo discount is ``promo_disc``.
+    """
+
+    def __init__(self, utc_offset: float = None, start: float = None, end: float = None):
+        self.utc_offset = utc_offset
+        self.start = -math.inf if start is None else start
+        self.end = math.inf if end is None else end
+        self.orders = 0
+        self.units = 0
+        self.revenue = 0
+        self.item_qty = defaultdict(int)
+        self.item_revenue = defaultdict(int)
+        self.band_orders = defaultdict(int)
+        self.band_revenue = defaultdict(int)
+        self.discounts = {"bulk": 0, "time": 0, "voucher": 0, "combo": 0}
+        self.hour_orders = [0] * 24
+        self.hour_revenue = [0] * 24
+        self.basket_size = TDigest()
+        self.ticket_value = TDigest()
+
+    def add(self, order: dict) -> None:
+        """Add one priced order, if it is in the rollup's time range."""
+        timestamp = order["timestamp"]
+        if not self.start <= timestamp < self.end:
+            return
+        units = 0
+        for line in order["lines"]:
+            self.item_qty[line["item"]] += line["qty"]
+            self.item_revenue[line["item"]] += line["total"]
+            units += line["qty"]
+        total = order["grand_total"]
+        band = order.get("band") or NO_BAND_NAME
+        if self.utc_offset is None:
+            hour = time.localtime(timestamp).tm_hour
+        else:
+            hour = int((timestamp + self.utc_offset) // 3600) % 24
+        self.orders += 1
+        self.units += units
+        self.revenue += total
+        self.band_orders[band] += 1
+        self.band_revenue[band] += total
+        self.discounts["bulk"] += order["bulk_disc"]
+        self.discounts["time"] += order["time_disc"]
+        self.discounts["voucher"] += order["voucher_disc"]
+        self.discounts["combo"] += order["promo_disc"]
+        self.hour_orders[hour] += 1
+        self.hour_revenue[hour] += total
+        self.basket_size.add(units)
+        self.ticket_value.add(total)
+
+    def add_orders(self, orders) -> None:
+        """Add every order from an iterable (consumed lazily)."""
+        for order in orders:
+            self.add(order)
+
+    def add_journal(self, path: str, chunk_orders: int = JOURNAL_CHUNK_ORDERS) -> None:
+        """
+        Add every complete order in the journal at ``path`` that is in the
+        rollup's time range.
+
+        The files are read sequentially, ``chunk_orders`` orders (and their
+        lines) at a time, and each chunk is aggregated with NumPy, so memory
+        use depends on the chunk size and not on the journal size.
+        """
+        import numpy as np
+
+        order_dtype, line_dtype = record_dtypes()
+        n_lines = os.path.getsize(os.path.join(path, LINES_FILE)) // line_dtype.itemsize
+        with open(os.path.join(path, ORDERS_FILE), "rb") as orders_file, \
+                open(os.path.join(path, LINES_FILE), "rb") as lines_file:
+            lines_read = 0
+            while True:
+                orders = np.fromfile(orders_file, dtype=order_dtype, count=chunk_orders)
+                if not len(orders):
+                    break
+                ends = orders["first_line"] + orders["n_lines"]
+                # Stop at orders whose lines are not all on disk yet
+                complete = int(np.searchsorted(ends, n_lines, side="right"))
+                orders = orders[:complete]
+                if not len(orders):
+                    break
+                count = int(ends[complete - 1]) - lines_read
+                lines = np.fromfile(lines_file, dtype=line_dtype, count=count)
+                lines_read += count
+                self._add_columns(np, orders, lines)
+                if complete < chunk_orders:
+                    break
+
+    def _hours(self, np, timestamps):
+        if self.utc_offset is not None:
+            return ((timestamps + self.utc_offset) // 3600 % 24).astype(np.intp)
+        # The local offset of each quarter hour the chunk covers, looked up once
+        steps, inverse = np.unique(timestamps // OFFSET_STEP, return_inverse=True)
+        offsets = np.array([time.localtime(step * OFFSET_STEP).tm_gmtoff
+                            for step in steps.tolist()], dtype=np.float64)
+        return ((timestamps + offsets[inverse]) // 3600 % 24).astype(np.intp)
+
+    def _add_columns(self, np, orders, lines) -> None:
+        n_lines = orders["n_lines"].astype(np.int64)
+        timestamps = orders["timestamp"]
+        keep = (timestamps >= self.start) & (timestamps < self.end)
+        if not keep.all():
+            lines = lines[np.repeat(keep, n_lines)]
+            orders, n_lines = orders[keep], n_lines[keep]
+        n = len(orders)
+        if not n:
+            return
+        order_index = np.repeat(np.arange(n), n_lines)
+        qty, line_totals = lines["qty"].astype(np.int64), lines["total"].astype(np.int64)
+        units = np.zeros(n, dtype=np.int64)
+        np.add.at(units, order_index, qty)
+        totals = orders["grand_total"].astype(np.int64)
+
+        items, inverse = np.unique(lines["item"], return_inverse=True)
+        item_qty = np.zeros(len(items), dtype=np.int64)
+        revenue = np.zeros(len(items), dtype=np.int64)
+        np.add.at(item_qty, inverse, qty)
+        np.add.at(revenue, inverse, line_totals)
+        for item, q, r in zip(items, item_qty, revenue):
+            name = item.decode()
+            self.item_qty[name] += int(q)
+            self.item_revenue[name] += int(r)
+
+        bands = orders["band"].astype(np.intp)
+        band_orders = np.bincount(bands, minlength=NO_BAND + 1)
+        band_revenue = np.zeros(NO_BAND + 1, dtype=np.int64)
+        np.add.at(band_revenue, bands, totals)
+        for band_id in np.flatnonzero(band_orders):
+            band = NO_BAND_NAME if band_id == NO_BAND else BANDS[band_id]
+            self.band_orders[band] += int(band_orders[band_id])
+            self.band_revenue[band] += int(band_revenue[band_id])
+
+        hours = self._hours(np, orders["timestamp"])
+        hour_orders = np.bincount(hours, minlength=24)
+        hour_revenue = np.zeros(24, dtype=np.int64)
+        np.add.at(hour_revenue, hours, totals)
+        for hour in range(24):
+            self.hour_orders[hour] += int(hour_orders[hour])
+            self.hour_revenue[hour] += int(hour_revenue[hour])
+
+        self.orders += n
+        self.units += int(units.sum())
+        self.revenue += int(totals.sum())
+        self.discounts["bulk"] += int(orders["bulk_disc"].sum())
+        self.discounts["time"] += int(orders["time_disc"].sum())
+        self.discounts["voucher"] += int(orders["voucher_disc"].sum())
+        self.discounts["combo"] += int(orders["promo_disc"].sum())
+        # Basket sizes and cent totals repeat a lot: add each distinct value once
+        for digest, values in ((self.basket_size, units), (self.ticket_value, totals)):
+            distinct, counts = np.unique(values, return_counts=True)
+            digest.add_many(distinct.tolist(), counts.tolist())
+
+    def merge(self, other: "DailyRollup") -> None:
+        """Add the figures of another rollup (e.g. another till) to this one."""
+        self.orders += other.orders
+        self.units += other.units
+        self.revenue += other.revenue
+        for mine, theirs in ((self.item_qty, other.item_qty),
+                             (self.item_revenue, other.item_revenue),
+                             (self.band_orders, other.band_orders),
+                             (self.band_revenue, other.band_revenue),
+                             (self.discounts, other.discounts)):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+        for hour in range(24):
+            self.hour_orders[hour] += other.hour_orders[hour]
+            self.hour_revenue[hour] += other.hour_revenue[hour]
+        self.basket_size.merge(other.basket_size)
+        self.ticket_value.merge(other.ticket_value)
+
+    def report(self) -> dict:
+        """Return the figures as plain JSON types (amounts in cents)."""
+        return {
+            "orders": self.orders,
+            "units": self.units,
+            "revenue": self.revenue,
+            "by_item": {
+                item: {"qty": self.item_qty[item], "revenue": self.item_revenue[item]}
+                for item in sorted(self.item_revenue, key=self.item_revenue.get, reverse=True)
+            },
+            "by_band": {
+                band: {"orders": self.band_orders[band], "revenue": self.band_revenue[band]}
+                for band in self.band_orders
+            },
+            "discounts": dict(self.discounts),
+            "hourly": [
+                {"hour": hour, "orders": self.hour_orders[hour],
+                 "revenue": self.hour_revenue[hour]}
+                for hour in range(24) if self.hour_orders[hour]
+            ],
+            "basket_size": self.basket_size.summary(),
+            "ticket_value": self.ticket_value.summary(),
+        }
+
+
+def read_jsonl(path: str):
+    """Yield orders from a file with one JSON order per line."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-of-day sales rollup")
+    parser.add_argument("source", help="an order journal directory or a .jsonl file")
+    parser.add_argument("--day", help="local date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--all", action="store_true", help="every order, whatever the day")
+    args = parser.parse_args()
+    rollup = DailyRollup() if args.all else DailyRollup(None, *day_bounds(args.day))
+    if os.path.isdir(args.source):
+        rollup.add_journal(args.source)
+    else:
+        rollup.add_orders(read_jsonl(args.source))
+    print(json.dumps(rollup.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
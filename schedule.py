@@ -0,0 +1,258 @@
+"""
+Time-band schedule
+------------------
+
+Which time band (and happy-hour rate) applies at a given moment, for one
+outlet.  The apps still let the cashier pick a slot by hand (``SLOTS`` in
+``pricing.py``); a ``Schedule`` works the band out from the clock instead.
+
+A schedule is a list of ``ScheduleEntry`` intervals of the day: a band
+(``"evening"``), optionally a rate, the days of the week it runs on and a
+priority.  Holidays are a day type of their own, so "no happy hour on public
+holidays" or "evening prices all day on Christmas" are just entries for
+``HOLIDAY``.  Entries may overlap; every active entry is returned, highest
+priority first.
+
+On construction the entries of each day type are swept into one sorted list
+of boundaries (seconds since midnight) and the entries active between each
+pair, with equal neighbours merged.  ``resolve`` is then one bisect, and it
+also returns when the answer next changes, so ``BandClock`` only resolves
+again once that moment has passed.
+"""
+
+import time
+from bisect import bisect_right
+
+DAY_SECONDS = 86_400
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+HOLIDAY = 7  # day type used on holidays instead of the weekday
+ALL_DAYS = frozenset(range(7))
+
+
+def parse_time(text: str) -> int:
+    """Return ``"HH:MM"`` (or ``"HH:MM:SS"``) as seconds since midnight."""
+    parts = [int(part) for part in text.strip().split(":")]
+    if len(parts) == 2:
+        parts.append(0)
+    hours, minutes, seconds = parts
+    if not (0 <= hours <= 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+        raise ValueError(f"not a time of day: {text!r}")
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def slot_interval(slot: str) -> tuple:
+    """
+    Return a slot label such as ``"09:00–11:59"`` as ``(start, end)``
+    seconds, the end being exclusive (``12:00``).
+    """
+    start, end = slot.replace("–", "-").split("-")
+    return parse_time(start), parse_time(end) + 60
+
+
+def parse_days(days) -> frozenset:
+    """
+    Return day types from day names (``"mon"``..``"sun"``, ``"holiday"``) or
+    numbers (0 = Monday, ``HOLIDAY``).  None means every weekday.
+    """
+    if days is None:
+        return ALL_DAYS
+    result = set()
+    for day in days:
+        if isinstance(day, str):
+            day = day.strip().lower()[:3]
+            day = HOLIDAY if day == "hol" else DAY_NAMES.index(day)
+        if not 0 <= day <= HOLIDAY:
+            raise ValueError(f"not a day type: {day!r}")
+        result.add(day)
+    return frozenset(result)
+
+
+class ScheduleEntry:
+    """
+    A band that applies between two times of day.
+
+    Parameters
+    ----------
+    band : str
+        The time band, e.g. one of ``pricing.BANDS``.
+    start, end : int or str
+        Seconds since midnight or ``"HH:MM"``.  ``end`` is exclusive and may
+        be ``"24:00"``; an entry that runs past midnight is two entries.
+    days : iterable, optional
+        Day types it runs on (see ``parse_days``).  Defaults to every weekday
+        but not holidays.
+    rate : float, optional
+        A rate that comes with the band, e.g. a happy-hour discount.
+    name : str, optional
+        A label, e.g. the slot shown to the cashier.
+    priority : int
+        Higher priorities come first among overlapping entries.
+    """
+
+    __slots__ = ("band", "start", "end", "days", "rate", "name", "priority")
+
+    def __init__(self, band, start, end, days=None, rate=None, name=None, priority=0):
+        self.band = band
+        self.start = parse_time(start) if isinstance(start, str) else start
+        self.end = parse_time(end) if isinstance(end, str) else end
+        self.days = parse_days(days)
+        self.rate = rate
+        self.name = name if name is not None else band
+        self.priority = priority
+        if not 0 <= self.start < self.end <= DAY_SECONDS:
+            raise ValueError(f"{self.name}: need 0 <= start < end <= 24:00")
+
+    def __repr__(self) -> str:
+        return (f"ScheduleEntry({self.band!r}, {self.start}, {self.end}, "
+                f"days={sorted(self.days)}, rate={self.rate!r}, name={self.name!r})")
+
+
+class Resolution:
+    """
+    The answer of ``Schedule.resolve``: the active ``entries`` (highest
+    priority first) and ``next_change``, the timestamp at which they change.
+    """
+
+    __slots__ = ("entries", "next_change")
+
+    def __init__(self, entries, next_change):
+        self.entries = entries
+        self.next_change = next_change
+
+    @property
+    def band(self):
+        """The band of the highest-priority active entry, or None."""
+        return self.entries[0].band if self.entries else None
+
+    @property
+    def bands(self) -> tuple:
+        """Every active band, highest priority first, without repeats."""
+        return tuple(dict.fromkeys(entry.band for entry in self.entries))
+
+
+def _timeline(entries) -> tuple:
+    # Sweep the interval ends once, keeping the active set; consecutive
+    # segments with the same entries are merged.
+    events = sorted([(e.start, 1, i) for i, e in enumerate(entries)]
+                    + [(e.end, -1, i) for i, e in enumerate(entries)])
+    order = sorted(range(len(entries)), key=lambda i: (-entries[i].priority, i))
+    rank = {i: r for r, i in enumerate(order)}
+    bounds, segments = [0], [()]
+    active = set()
+    k = 0
+    while k < len(events):
+        at = events[k][0]
+        while k < len(events) and events[k][0] == at:
+            _, kind, i = events[k]
+            if kind > 0:
+                active.add(i)
+            else:
+                active.discard(i)
+            k += 1
+        segment = tuple(entries[i] for i in sorted(active, key=rank.__getitem__))
+        if at == bounds[-1]:
+            segments[-1] = segment
+        elif segment != segments[-1]:
+            bounds.append(at)
+            segments.append(segment)
+    return bounds, segments
+
+
+class Schedule:
+    """
+    Resolve timestamps to the active schedule entries.
+
+    Parameters
+    ----------
+    entries : iterable of ScheduleEntry
+    holidays : iterable of datetime.date, optional
+        Days that use the ``HOLIDAY`` entries instead of their weekday's.
+    utc_offset : float, optional
+        Seconds added to timestamps to get local time.  Defaults to the
+        local time zone when the schedule is built (a DST change needs a new
+        schedule).
+    """
+
+    def __init__(self, entries, holidays=(), utc_offset: float = None):
+        if utc_offset is None:
+            utc_offset = time.localtime().tm_gmtoff
+        self.entries = list(entries)
+        self.utc_offset = utc_offset
+        # Days since the epoch, so a holiday check is a set lookup
+        self.holidays = {day.toordinal() - 719163 for day in holidays}
+        self.timelines = [
+            _timeline([entry for entry in self.entries if day in entry.days])
+            for day in range(HOLIDAY + 1)
+        ]
+
+    @classmethod
+    def from_slots(cls, slots, slot_to_band, **kwargs) -> "Schedule":
+        """
+        Build a schedule from slot labels such as ``pricing.SLOTS``, every
+        day including holidays, naming each entry after its slot.
+        """
+        entries = []
+        for slot in slots:
+            start, end = slot_interval(slot)
+            entries.append(ScheduleEntry(slot_to_band(slot), start, end,
+                                         days=ALL_DAYS | {HOLIDAY}, name=slot))
+        return cls(entries, **kwargs)
+
+    def day_type(self, day: int) -> int:
+        """Return the day type of ``day`` (days since the epoch, local)."""
+        if day in self.holidays:
+            return HOLIDAY
+        return (day + 3) % 7  # 1970-01-01 was a Thursday
+
+    def resolve(self, timestamp: float = None) -> Resolution:
+        """Return the entries active at ``timestamp`` (default: now)."""
+        if timestamp is None:
+            timestamp = time.time()
+        local = timestamp + self.utc_offset
+        day, seconds = divmod(local, DAY_SECONDS)
+        bounds, segments = self.timelines[self.day_type(int(day))]
+        i = bisect_right(bounds, seconds) - 1
+        # At midnight the day type changes, so resolve again then at the latest
+        end = bounds[i + 1] if i + 1 < len(bounds) else DAY_SECONDS
+        return Resolution(segments[i], timestamp + (end - seconds))
+
+
+def schedules_by_outlet(rows, holidays=(), utc_offset: float = None) -> dict:
+    """
+    Build one ``Schedule`` per outlet from plain rows, e.g. read from JSON
+    or CSV.
+
+    Each row is a dict with ``outlet``, ``band``, ``start`` and ``end`` and
+    optionally ``days``, ``rate``, ``name`` and ``priority`` (see
+    ``ScheduleEntry``).  Returns ``{outlet: Schedule}``.
+    """
+    by_outlet = {}
+    for row in rows:
+        entry = ScheduleEntry(row["band"], row["start"], row["end"], days=row.get("days"),
+                              rate=row.get("rate"), name=row.get("name"),
+                              priority=row.get("priority", 0))
+        by_outlet.setdefault(row["outlet"], []).append(entry)
+    return {outlet: Schedule(entries, holidays, utc_offset)
+            for outlet, entries in by_outlet.items()}
+
+
+class BandClock:
+    """
+    The current resolution of a schedule, resolved again only when its
+    ``next_change`` has passed (or the clock went backwards).
+    """
+
+    def __init__(self, schedule: Schedule):
+        self.schedule = schedule
+        self._resolution = None
+        self._resolved_at = None
+
+    def current(self, now: float = None) -> Resolution:
+        """Return the resolution for ``now`` (default: the current time)."""
+        if now is None:
+            now = time.time()
+        resolution = self._resolution
+        if resolution is None or not self._resolved_at <= now < resolution.next_change:
+            resolution = self._resolution = self.schedule.resolve(now)
+            self._resolved_at = now
+        return resolution
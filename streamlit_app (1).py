@@ -1,11 +1,21 @@
 import streamlit as st
-import pandas as pd
 import time
 
+from images import menu_image
+from metrics import export_from_env, span, timed
+from money import discounted, format_cents, percent_of
+from receipts import ITEM_COLUMNS, ReceiptRenderer
+from variants import VariantCatalog
+
 ## LIST OF PRODUCTS ------------------------------------------------------------------------
-coffee = {'Name' : 'Coffee', 'Price' : 3,'Type' : ['Mocha', 'Latte', 'Cappuccino']}
-frjuice = {'Name' : 'Fruit Juice', 'Price' : 2, 'Type' : ['Apple', 'Lemon', 'Watermelon']}
-cake = {'Name' : 'Cake', 'Price' : 6, 'Type' : ['Chocolate', 'Vanilla', 'Cheese']}
+coffee = {'Name' : 'Coffee', 'Price' : 3, 'Category' : 'coffee', 'Type' : ['Mocha', 'Latte', 'Cappuccino'],
+          'Modifiers' : ['Size', 'Milk', 'Extra shot']}
+frjuice = {'Name' : 'Fruit Juice', 'Price' : 2, 'Category' : 'juice', 'Type' : ['Apple', 'Lemon', 'Watermelon'],
+           'Modifiers' : ['Size']}
+cake = {'Name' : 'Cake', 'Price' : 6, 'Category' : 'cake', 'Type' : ['Chocolate', 'Vanilla', 'Cheese']}
+
+## Every type/size/milk combination with its price, by SKU id (see variants.py)
+VARIANTS = VariantCatalog([coffee, frjuice, cake])
 ## -----------------------------------------------------------------------------------------
 
 ## INITIALISE VARIABLES --------------------------------------------------------------------
@@ -14,25 +24,44 @@ prod2 = 0
 prod3 = 0
 ## -----------------------------------------------------------------------------------------
 
+## TIMERS (see metrics.py for where they are exposed) ---------------------------------------
+export_from_env()
+rerun_timer = span("streamlit_app.rerun").start()
+## -----------------------------------------------------------------------------------------
+
 ## SHOW PRODUCTS AS MENU -------------------------------------------------------------------
+menu_timer = span("streamlit_app.render.menu").start()
 st.title('Welcome to our Cafe interface! :coffee:')
 st.write('Please select your order:')
 
+## Type and modifier pickers for one product, returns the name of the chosen variant
+def choose(product, key):
+  groups = VARIANTS.options(product['Name'])
+  kind = st.selectbox("Type", groups[0].labels[1:], key=f"{key}_type")
+  picked = [st.selectbox(group.name, group.labels, key=f"{key}_{group.name}") for group in groups[1:]]
+  sku = VARIANTS.resolve(f"{kind} {product['Name']}", picked)
+  st.caption(f"{VARIANTS.name(sku)}  >>>  {format_cents(VARIANTS.price(sku))} each")
+  return VARIANTS.name(sku)
+
 ## Seperating one line into the columns
 col1, col2, col3 = st.columns(3)
 
 ## Assigning to different columns
 with col1:
-  st.image('https://cdn.shopify.com/s/files/1/0669/0966/7619/files/espresso-shot-crema-in-white-cup-on-wood-table-wrexham-bean.webp?v=1745257519')
-  st.number_input("Coffee  >>>  $3.00 each", min_value=0, max_value=10, step=1, key="prod1")
+  st.image(menu_image('https://cdn.shopify.com/s/files/1/0669/0966/7619/files/espresso-shot-crema-in-white-cup-on-wood-table-wrexham-bean.webp?v=1745257519'))
+  choice1 = choose(coffee, "prod1")
+  st.number_input("Coffee  >>>  quantity", min_value=0, max_value=10, step=1, key="prod1")
 
 with col2:
-  st.image('https://farmtojar.com/wp-content/uploads/2016/11/5BA949BB-3B24-4216-B700-E5FE2AF12F7F.jpeg')
-  st.number_input("Fruit Juice  >>>  $2.00 each", min_value=0, max_value=10, step=1, key="prod2")
+  st.image(menu_image('https://farmtojar.com/wp-content/uploads/2016/11/5BA949BB-3B24-4216-B700-E5FE2AF12F7F.jpeg'))
+  choice2 = choose(frjuice, "prod2")
+  st.number_input("Fruit Juice  >>>  quantity", min_value=0, max_value=10, step=1, key="prod2")
 
 with col3:
-  st.image('https://www.livingnorth.com/images/media/articles/food-and-drink/eat-and-drink/coffee.png?')
-  st.number_input("Cake Slice  >>>  $6.00 each", min_value=0, max_value=10, step=1, key="prod3")
+  st.image(menu_image('https://www.livingnorth.com/images/media/articles/food-and-drink/eat-and-drink/coffee.png?'))
+  choice3 = choose(cake, "prod3")
+  st.number_input("Cake Slice  >>>  quantity", min_value=0, max_value=10, step=1, key="prod3")
+menu_timer.stop()
 ## ------------------TIME SLOT-----------------
 SLOTS = ["09:00–11:59", "12:00–14:59", "15:00–17:59", "18:00–20:59"]
 
@@ -71,76 +100,71 @@ if st.button('CHECKOUT'):
   total = price1 + price2 + price3
 '''
 ## ---------------------------discount engine setup-Andy--------------------------------------------------
-MENU = {
-    "Coffee": coffee["Price"],
-    "Fruit Juice": frjuice["Price"],
-    "Cake": cake["Price"],
-}
-CATEGORY = {"Coffee": "coffee", "Fruit Juice": "juice", "Cake": "cake"}
-
+## Items are variant names ("Mocha Coffee, Large"), priced and categorised through VARIANTS
 def has_combo(order_dict) -> bool:
-    has_coffee = any(CATEGORY[i] == "coffee" for i, q in order_dict.items() if q > 0)
-    has_cake   = any(CATEGORY[i] == "cake"   for i, q in order_dict.items() if q > 0)
-    return has_coffee and has_cake
+    cats = {VARIANTS.category(VARIANTS.sku(i)) for i, q in order_dict.items() if q > 0}
+    return "coffee" in cats and "cake" in cats
 
+@timed("streamlit_app.line_total_with_discounts")
 def line_total_with_discounts(item: str, qty: int, band: str, combo: bool):
     """
-    Returns (line_before_time, time_discount_amount, line_after_time)
+    Returns (line_before_time, time_discount_amount, line_after_time) in cents
       - Bulk: qty >= 3 → 10% off BEFORE time-based discount
       - Evening: 30% off everything
       - Afternoon: 20% off juices
       - Morning: 20% off coffee + cake IF combo active
+    Discounts are in basis points and rounded half up to the cent (money.py)
     """
-    unit = MENU[item]
+    sku = VARIANTS.sku(item)
+    unit = VARIANTS.price(sku)
     line = unit * qty
     if qty >= 3:
-        line *= 0.90  # bulk first
+        line = discounted(line, 1000)  # bulk first
 
-    pct = 0.0
-    cat = CATEGORY[item]
+    bp = 0
+    cat = VARIANTS.category(sku)
     if band == "evening":
-        pct = 0.30
+        bp = 3000
     elif band == "afternoon" and cat == "juice":
-        pct = 0.20
+        bp = 2000
     elif band == "morning" and combo and cat in {"coffee", "cake"}:
-        pct = 0.20
+        bp = 2000
 
-    time_disc = round(line * pct, 2)
-    after = round(line - time_disc, 2)
-    return round(line, 2), time_disc, after
+    time_disc = percent_of(line, bp)
+    after = line - time_disc
+    return line, time_disc, after
 
 ## DISPLAYING RECEIPT AS A TABLE (KHANSKY) -------------------------------------------------
-menu = [coffee, frjuice, cake]
-
-#just for the prices individually bruh
+#just for the prices individually bruh (any variant, e.g. "Mocha Coffee, Large, Oat milk"), in cents
 def find_price(item_name):
-    for category in menu:
-        if item_name in category['Name']:
-            return category['Price']
+    sku = VARIANTS.lookup(item_name)
+    if sku is not None:
+        return VARIANTS.price(sku)
+
+#the table is formatted straight from the lines, no DataFrame per rerun (see receipts.py)
+@st.cache_resource
+def load_renderer():
+    return ReceiptRenderer(ITEM_COLUMNS)
 
 #actual main command that you use to pull
+@timed("streamlit_app.receipt")
 def receipt(full_list):
-    #creates new list that willo be used to combine allat
-    idlist = []
-    quantitylist = []
-    pricelist = []
-    subtotal = []
-
-    #seperates the full_list into 4 seperate columns: id, qty, price, sub
+    #one line per item in pricing.LINE_FIELDS order: item, qty, price, subtotal (no discounts here)
+    lines = []
     for individual_items, individual_qty in full_list:
         price = find_price(individual_items)
-        idlist.append(individual_items)
-        quantitylist.append(individual_qty)
-        pricelist.append(price)
-        subtotal.append(individual_qty*price)
-
-    #panda that into something pandable
-    fullframe = pd.DataFrame({'Item':idlist, 'Quantity':quantitylist, 'Price per Item($)':pricelist, 'Subtotal($)':subtotal})
+        sub = individual_qty*price
+        lines.append((individual_items, individual_qty, price, sub, 0, sub, 0, sub))
 
     #return allat work
-    return fullframe
+    return load_renderer().html(lines)
 
 
-full_list = [(coffee['Name'], prod1), (frjuice['Name'], prod2), (cake['Name'], prod3)]
-st.write(receipt(full_list))
+prod1 = int(st.session_state.prod1)
+prod2 = int(st.session_state.prod2)
+prod3 = int(st.session_state.prod3)
+full_list = [(choice1, prod1), (choice2, prod2), (choice3, prod3)]
+with span("streamlit_app.render.receipt"):
+  st.markdown(receipt(full_list), unsafe_allow_html=True)
+rerun_timer.stop()
 ## -----------------------------------------------------------------------------------------
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+import cafe_app
+from cafe_app import (MENU, VoucherCart, calculate_totals, calculate_totals_batch,
+                      encode_voucher_column)
+
+NAMES = [item["name"] for item in MENU]
+CODES = ["", "WELCOME10", "friend5", " welcome10 ", "BOGUS"]
+TOTALS = ("bulk_total", "after_voucher", "promo_discount", "final_total")
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(16)
+    quantities = rng.integers(0, 6, size=(2000, len(MENU)))
+    codes = [CODES[i] for i in rng.integers(0, len(CODES), size=len(quantities))]
+    voucher_ids, distinct = encode_voucher_column(codes)
+    batch = calculate_totals_batch(quantities, voucher_ids, distinct)
+    for row, (qty, code) in enumerate(zip(quantities.tolist(), codes)):
+        scalar = calculate_totals(dict(zip(NAMES, qty)), code)
+        assert [int(batch[key][row]) for key in TOTALS] == [scalar[key] for key in TOTALS]
+
+
+def test_batch_without_vouchers():
+    quantities = np.array([[1] + [2] * (len(MENU) - 1), [0] * len(MENU)])
+    batch = calculate_totals_batch(quantities)
+    for row, qty in enumerate(quantities.tolist()):
+        scalar = calculate_totals(dict(zip(NAMES, qty)), "")
+        assert int(batch["final_total"][row]) == scalar["final_total"]
+
+
+def test_voucher_cart_matches_calculate_totals():
+    rng = random.Random(9)
+    cart = VoucherCart()
+    quantities = dict.fromkeys(NAMES, 0)
+    for _ in range(2000):
+        name = rng.choice(NAMES)
+        quantities[name] = rng.choice((0, 0, 1, 2, 3, 5))
+        cart.set_qty(name, quantities[name])
+        code = rng.choice(CODES)
+        expected = calculate_totals({k: v for k, v in quantities.items() if v}, code)
+        assert {key: cart.totals(code)[key] for key in TOTALS} == \
+            {key: expected[key] for key in TOTALS}
+
+
+@pytest.fixture
+def voucher_db(tmp_path, monkeypatch):
+    from vouchers import open_store
+
+    path = str(tmp_path / "vouchers.db")
+    open_store(path).add_codes([("ONCE50", 50)], single_use=True)
+    open_store(path).add_codes([("ALWAYS5", 5)], single_use=False)
+    monkeypatch.setenv(cafe_app.VOUCHER_DB_ENV, path)
+    return path
+
+
+def test_single_use_voucher_is_redeemed_once(voucher_db):
+    assert not cafe_app.voucher_used("ONCE50")
+    assert cafe_app.redeem_voucher("once50")
+    assert cafe_app.voucher_used("ONCE50")
+    assert not cafe_app.redeem_voucher("ONCE50")
+    assert not cafe_app.redeem_voucher(" once50 ")
+
+
+def test_reusable_and_unknown_vouchers_are_never_refused(voucher_db):
+    for _ in range(3):
+        assert cafe_app.redeem_voucher("ALWAYS5")
+        assert cafe_app.redeem_voucher("WELCOME10")
+        assert cafe_app.redeem_voucher("NO-SUCH-CODE")
+        assert cafe_app.redeem_voucher("")
+    assert not cafe_app.voucher_used("ALWAYS5")
@@ -0,0 +1,73 @@
+import os
+
+from journal import LINES_FILE, ORDER, ORDERS_FILE, JournalReader, OrderJournal
+
+LINES = [("Coffee", 3, 300, 900, 90, 0, 810), ("Cake", 1, 600, 600, 0, 120, 480)]
+
+
+def test_append_and_read_back(tmp_path):
+    with OrderJournal(str(tmp_path)) as journal:
+        first = journal.append(LINES, band="morning", voucher=" welcome10 ", total_raw=1500,
+                               bulk_disc=90, time_disc=120, grand_total=1290,
+                               timestamp=1_700_000_000.5, price_list=7)
+        second = journal.append([("Fruit Juice", 2, 200, 400, 0, 0, 400)], grand_total=400,
+                                timestamp=1_700_000_060.0)
+    assert (first, second) == (0, 1)
+
+    reader = JournalReader(str(tmp_path))
+    assert len(reader) == 2
+    order = reader.order(0)
+    assert order["timestamp"] == 1_700_000_000.5
+    assert order["band"] == "morning"
+    assert order["voucher"] == "WELCOME10"
+    assert (order["total_raw"], order["bulk_disc"], order["time_disc"], order["grand_total"]) \
+        == (1500, 90, 120, 1290)
+    assert order["price_list"] == 7
+    assert [(line["item"], line["qty"], line["total"]) for line in order["lines"]] == \
+        [("Coffee", 3, 810), ("Cake", 1, 480)]
+    assert reader.order(1)["band"] is None
+    assert reader.totals()["grand_total"] == 1690
+    assert reader.revenue_by_item() == {"Cake": (1, 480), "Coffee": (3, 810),
+                                        "Fruit Juice": (2, 400)}
+    assert [order["order_id"] for order in reader.replay()] == [0, 1]
+
+
+def test_reader_sees_appends_before_close(tmp_path):
+    journal = OrderJournal(str(tmp_path), sync_every=1000)
+    try:
+        journal.append(LINES, grand_total=1290)
+        assert len(JournalReader(str(tmp_path))) == 1
+    finally:
+        journal.close()
+
+
+def test_reopen_continues_ids_and_drops_a_torn_record(tmp_path):
+    path = str(tmp_path)
+    with OrderJournal(path) as journal:
+        journal.append(LINES, grand_total=1290)
+    with open(os.path.join(path, ORDERS_FILE), "ab") as f:
+        f.write(b"\0" * (ORDER.size // 2))
+    with OrderJournal(path) as journal:
+        assert journal.append(LINES, grand_total=1290) == 1
+    assert os.path.getsize(os.path.join(path, ORDERS_FILE)) == 2 * ORDER.size
+    assert [order["order_id"] for order in JournalReader(path).replay()] == [0, 1]
+
+
+def test_order_without_its_lines_is_not_read(tmp_path):
+    path = str(tmp_path)
+    with OrderJournal(path) as journal:
+        journal.append(LINES, grand_total=1290)
+        journal.append(LINES, grand_total=1290)
+    # As if the last line never reached the disk
+    lines_path = os.path.join(path, LINES_FILE)
+    with open(lines_path, "r+b") as f:
+        f.truncate(os.path.getsize(lines_path) - 1)
+    assert len(JournalReader(path)) == 1
+
+
+def test_long_text_is_cut_on_a_character_boundary(tmp_path):
+    with OrderJournal(str(tmp_path)) as journal:
+        journal.append([("Café crème brûlée " * 3, 1, 500, 500, 0, 0, 500)], grand_total=500)
+    item = JournalReader(str(tmp_path)).order(0)["lines"][0]["item"]
+    assert "�" not in item
+    assert ("Café crème brûlée " * 3).startswith(item)
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from kitchen import Kitchen
+
+
+def run_kitchen(kitchen, orders):
+    """Submit ``{order id: lines}`` to a running kitchen and wait until made."""
+    async def main():
+        task = asyncio.ensure_future(kitchen.run())
+        for order_id, lines in orders.items():
+            await kitchen.submit(order_id, lines)
+        await asyncio.wait_for(kitchen.drain(), 5)
+        assert not task.done(), "the kitchen stopped"
+        task.cancel()
+
+    asyncio.run(main())
+
+
+def test_orders_are_made():
+    ready = []
+    kitchen = Kitchen(time_scale=0, on_ready=ready.append)
+    run_kitchen(kitchen, {1: [("Coffee", 2), ("Cake", 1)], 2: [("Fruit Juice", 1)]})
+    assert sorted(ready) == [1, 2]
+    assert kitchen.stats()["completed"] == 2
+    assert kitchen.stats()["in_progress"] == 0
+
+
+def test_duplicate_order_id_is_rejected():
+    kitchen = Kitchen(time_scale=0)
+
+    async def main():
+        await kitchen.submit(1, [("Coffee", 1)])
+        with pytest.raises(ValueError):
+            await kitchen.submit(1, [("Cake", 1)])
+
+    asyncio.run(main())
+
+
+def test_order_id_can_be_reused_once_made():
+    kitchen = Kitchen(time_scale=0)
+
+    async def main():
+        task = asyncio.ensure_future(kitchen.run())
+        for _ in range(2):
+            await kitchen.submit(1, [("Coffee", 1)])
+            await asyncio.wait_for(kitchen.drain(), 5)
+        task.cancel()
+
+    asyncio.run(main())
+    assert kitchen.stats()["completed"] == 2
+
+
+def test_failed_batch_keeps_the_worker_alive():
+    async def prepare(station, tickets, seconds):
+        if any(ticket.order_id == 1 for ticket in tickets):
+            raise RuntimeError("the grinder jammed")
+
+    ready = []
+    kitchen = Kitchen(time_scale=0, batch_items=1, prepare=prepare, on_ready=ready.append)
+    run_kitchen(kitchen, {1: [("Coffee", 1), ("Cake", 1)], 2: [("Coffee", 1)]})
+    stats = kitchen.stats()
+    assert (stats["failed"], stats["completed"]) == (1, 1)
+    assert ready == [2]
+
+
+def test_failing_on_ready_keeps_the_worker_alive():
+    def on_ready(order_id):
+        raise RuntimeError("boom")
+
+    kitchen = Kitchen(time_scale=0, on_ready=on_ready)
+    run_kitchen(kitchen, {1: [("Coffee", 1)], 2: [("Coffee", 1)]})
+    stats = kitchen.stats()
+    assert stats["completed"] == 2
+    assert stats["orders_waiting"] == 0
+
+
+def test_batches_stay_within_the_unit_budget():
+    batches = []
+
+    async def prepare(station, tickets, seconds):
+        batches.append(sum(ticket.units for ticket in tickets))
+
+    kitchen = Kitchen(time_scale=0, batch_items=4, prepare=prepare)
+    run_kitchen(kitchen, {order_id: [("Coffee", 3)] for order_id in range(6)})
+    assert batches and max(batches) <= 4
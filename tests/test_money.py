@@ -0,0 +1,40 @@
+import pytest
+
+from money import discounted, format_cents, percent_of, to_bp, to_cents
+
+
+@pytest.mark.parametrize("amount, cents", [
+    (3, 300), (4.35, 435), ("4.35", 435), (0.1, 10), (2.675, 268), ("0.005", 1),
+])
+def test_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+
+@pytest.mark.parametrize("rate, bp", [(0.2, 2000), (0.1, 1000), (0.075, 750), (0.00005, 1)])
+def test_to_bp(rate, bp):
+    assert to_bp(rate) == bp
+
+
+@pytest.mark.parametrize("cents, bp, expected", [
+    (1000, 2000, 200),
+    (5, 1000, 1),      # 0.5 cent rounds up
+    (4, 1000, 0),      # 0.4 cent rounds down
+    (15, 3000, 5),     # 4.5 cents rounds up
+    (-5, 1000, -1),    # halves round away from zero
+    (-15, 3000, -5),
+    (0, 3000, 0),
+])
+def test_percent_of_rounds_half_up(cents, bp, expected):
+    assert percent_of(cents, bp) == expected
+
+
+def test_discount_parts_add_up():
+    for cents in range(0, 2000, 7):
+        for bp in (1000, 2000, 3000, 1250):
+            assert discounted(cents, bp) + percent_of(cents, bp) == cents
+
+
+def test_format_cents():
+    assert format_cents(1234) == "$12.34"
+    assert format_cents(5, "S$") == "S$0.05"
+    assert format_cents(-250) == "-$2.50"
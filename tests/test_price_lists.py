@@ -0,0 +1,95 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from price_lists import PriceBook, parse_price_list, write_price_list
+
+MENU = [{"Name": "Coffee", "Price": 3, "Category": "coffee"},
+        {"Name": "Cake", "Price": 6, "Category": "cake"}]
+# Each write gets a later mtime, so a reload always sees the change
+MTIMES = itertools.count(1_700_000_000 * 10**9, 10**9)
+
+
+def write(directory, outlet, data):
+    path = os.path.join(directory, outlet + ".json")
+    if isinstance(data, str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        write_price_list(directory, outlet, data)
+    mtime = next(MTIMES)
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def book(tmp_path):
+    write(str(tmp_path), "north", {"version": 1, "menu": MENU})
+    return PriceBook(str(tmp_path))
+
+
+def test_loads_every_outlet(book):
+    assert book.outlets() == ["north"]
+    price_list = book.get("north")
+    assert price_list.version == 1
+    assert price_list.tables.unit_price("Coffee") == 300
+    assert price_list.vouchers is None
+
+
+def test_higher_version_is_swapped_in(book):
+    old = book.get("north")
+    write(book.directory, "north", {"version": 2, "menu": [{**MENU[0], "Price": 3.5}],
+                                    "vouchers": {" staff20 ": 20}})
+    assert book.reload() == ["north"]
+    assert book.get("north").version == 2
+    assert book.get("north").tables.unit_price("Coffee") == 350
+    assert book.get("north").vouchers == {"STAFF20": 20}
+    # A snapshot taken before the reload is unchanged
+    assert old.tables.unit_price("Coffee") == 300
+
+
+@pytest.mark.parametrize("version", [1, 0])
+def test_same_or_lower_version_is_refused(book, version):
+    write(book.directory, "north", {"version": version, "menu": [{**MENU[0], "Price": 9}]})
+    assert book.reload() == []
+    assert book.get("north").tables.unit_price("Coffee") == 300
+    assert "north" in book.errors
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({"menu": MENU}),
+    json.dumps({"version": "3", "menu": MENU}),
+    json.dumps({"version": 3, "menu": [{"Name": "Coffee", "Price": "3,5"}]}),
+    json.dumps({"version": 3, "menu": [{"Name": "Coffee", "Price": None}]}),
+    json.dumps({"version": 3, "menu": MENU, "bulk_tiers": [[3, "lots"]]}),
+    json.dumps({"version": 3, "menu": MENU, "vouchers": {"HALF": 50.5}}),
+    json.dumps([1, 2, 3]),
+])
+def test_bad_file_is_refused_and_the_old_list_kept(book, content):
+    write(book.directory, "north", content)
+    assert book.reload() == []
+    assert book.get("north").version == 1
+    assert "north" in book.errors
+    # The same bad file is not retried; a fixed one is loaded
+    assert book.reload() == []
+    write(book.directory, "north", {"version": 3, "menu": MENU})
+    assert book.reload() == ["north"]
+    assert book.get("north").version == 3
+    assert "north" not in book.errors
+
+
+def test_new_and_removed_outlets(book):
+    write(book.directory, "south", {"version": 1, "menu": MENU})
+    assert book.reload() == ["south"]
+    os.remove(os.path.join(book.directory, "north.json"))
+    assert book.reload() == ["north"]
+    assert book.outlets() == ["south"]
+    with pytest.raises(ValueError):
+        book.get("north")
+
+
+def test_parse_rejects_bad_vouchers():
+    with pytest.raises(ValueError):
+        parse_price_list("north", {"version": 1, "menu": MENU, "vouchers": {"X": 101}})
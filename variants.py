@@ -0,0 +1,236 @@
+"""
+Menu variants and modifiers
+---------------------------
+
+``streamlit_app (1).py`` lists a ``Type`` for each item (Mocha, Latte or
+Cappuccino coffee) and a counter also sells sizes, milks and extra shots,
+each with its own price.  Walking the option lists to price a drink costs a
+loop per option on every line of every rerun, so ``VariantCatalog`` expands
+every combination up front:
+
+* each item gets a block of SKU ids, one per combination of its type and
+  modifiers, numbered in mixed radix: the SKU id of a drink is the block's
+  offset plus ``choice * stride`` for each option group;
+* the price (in cents) and category code of every combination are
+  precomputed into one ``array('i')`` and one ``array('H')``, so pricing a
+  drink is ``prices[sku]``, one lookup however many options it has.
+
+No name is stored per combination: a name such as
+``"Mocha Coffee, Large, Oat milk"`` is resolved with one lookup of the item
+and type in a ``catalog.MenuIndex`` and one dictionary lookup per option
+given (exact, then case-folded), and ``name(sku)`` rebuilds it by division.
+Resolved names are cached, up to ``NAME_CACHE`` of them (the cache is
+emptied when it fills up), so a name the app prices on every rerun is one
+lookup.  The price and category of a combination take six bytes.
+
+Menu entries use the apps' format, with two optional keys:
+
+* ``Type``: a list of variant names (no price difference) or a dict of
+  variant name to price difference in dollars;
+* ``Modifiers``: the names of the option groups in ``modifiers`` that apply.
+
+An option group is a dict of choice to price difference in dollars; its first
+choice is the default and is left out of names.  An item is also sold plain
+("Coffee"), without a type.
+"""
+
+from array import array
+from bisect import bisect_right
+
+from catalog import Catalog, MenuIndex, normalize_name
+from money import to_cents
+
+NAME_CACHE = 10_000  # resolved names kept; the cache is emptied when full
+
+MODIFIERS = {
+    "Size": {"Regular": 0, "Small": -0.5, "Large": 0.75},
+    "Milk": {"Whole milk": 0, "Oat milk": 0.6, "Almond milk": 0.6, "No milk": 0},
+    "Extra shot": {"No extra shot": 0, "Extra shot": 0.8},
+}
+
+
+class OptionGroup:
+    """
+    The choices of one option, with their price differences in cents.
+
+    Parameters
+    ----------
+    name : str
+    options : dict
+        ``{choice: price difference in dollars}``; the first is the default.
+    """
+
+    __slots__ = ("name", "labels", "deltas")
+
+    def __init__(self, name: str, options: dict):
+        if not options:
+            raise ValueError(f"option group {name!r} has no choices")
+        self.name = name
+        self.labels = tuple(options)
+        self.deltas = array("i", (to_cents(delta) for delta in options.values()))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class VariantCatalog:
+    """
+    Every combination of item, type and modifiers, by SKU id.
+
+    Parameters
+    ----------
+    menu : list of dict
+        Menu entries (``Name``/``Price``/``Category``, or lower case), with
+        optional ``Type`` and ``Modifiers``; see the module docstring.
+    modifiers : dict, optional
+        ``{group name: {choice: price difference}}``; ``MODIFIERS`` by
+        default.
+    """
+
+    def __init__(self, menu, modifiers: dict = None):
+        modifiers = MODIFIERS if modifiers is None else modifiers
+        groups = {name: OptionGroup(name, options) for name, options in modifiers.items()}
+        # The items themselves: item id = SKU id in the catalog
+        catalog = Catalog.from_menu(menu)
+        self.names = catalog.names
+        self.category_names = catalog.category_names
+        self.groups = []        # item id -> tuple of OptionGroup, the type first
+        self.strides = []       # item id -> tuple of strides, one per group
+        self.offsets = array("i")  # first SKU id of each item
+        self.prices = array("i")
+        self.category_codes = array("H")
+        self._kinds = []        # item id -> {type: type choice}
+        # Keyed by the exact and the normalized choice
+        self._choices = []      # item id -> {choice: (group position, choice)}
+        self._resolved = {}     # name -> SKU id, see sku()
+        variants = {}
+        for item, entry in enumerate(menu):
+            name = self.names[item]
+            kinds = entry.get("Type", entry.get("type")) or ()
+            if not isinstance(kinds, dict):
+                kinds = dict.fromkeys(kinds, 0)
+
+            item_groups = [OptionGroup("Type", {"": 0, **kinds})]
+            for group in entry.get("Modifiers", entry.get("modifiers")) or ():
+                if group not in groups:
+                    raise ValueError(f"unknown option group {group!r} for {name!r}")
+                item_groups.append(groups[group])
+            strides = [1] * len(item_groups)
+            for i in range(len(item_groups) - 2, -1, -1):
+                strides[i] = strides[i + 1] * len(item_groups[i + 1])
+            self.groups.append(tuple(item_groups))
+            self.strides.append(tuple(strides))
+
+            variants[name] = item_groups[0].labels[1:]
+            self._kinds.append({kind: choice
+                                for choice, kind in enumerate(item_groups[0].labels[1:], 1)})
+            choices = {}
+            for position, group in enumerate(item_groups[1:], 1):
+                for choice, label in enumerate(group.labels):
+                    found = choices.setdefault(normalize_name(label), (position, choice))
+                    if found != (position, choice):
+                        raise ValueError(f"choice {label!r} is in two option groups of {name!r}")
+                    choices[label] = found
+            self._choices.append(choices)
+
+            # The block in SKU order: the last group varies fastest
+            block = [catalog.prices[item]]
+            for group in item_groups:
+                block = [total + delta for total in block for delta in group.deltas]
+            self.offsets.append(len(self.prices))
+            self.prices.extend(block)
+            self.category_codes.extend(array("H", [catalog.category_codes[item]]) * len(block))
+        # "<type> <item>" -> (item id, type or None)
+        self.index = MenuIndex(catalog, variants)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def item_id(self, item: str) -> int:
+        """Return the item id of an item name (without type)."""
+        entry = self.index.lookup(item)
+        if entry is None or entry[1] is not None:
+            raise ValueError(f"not on the menu: {item!r}")
+        return entry[0]
+
+    def resolve(self, item: str, options=()) -> int:
+        """
+        Return the SKU id of ``item`` ("Coffee" or "Mocha Coffee") with the
+        choices in ``options`` ("Large", "Oat milk"); groups not given take
+        their default.
+        """
+        entry = self.index.lookup(item)
+        if entry is None:
+            raise ValueError(f"not on the menu: {item!r}")
+        item_id, kind = entry
+        kind = 0 if kind is None else self._kinds[item_id][kind]
+        strides = self.strides[item_id]
+        choices = self._choices[item_id]
+        sku = self.offsets[item_id] + kind * strides[0]
+        seen = 0  # bit per group position
+        for label in options:
+            found = choices.get(label) or choices.get(normalize_name(label))
+            if found is None:
+                raise ValueError(f"{label.strip()!r} is not an option for {self.names[item_id]!r}")
+            position, choice = found
+            if seen >> position & 1:
+                raise ValueError(f"two choices for {self.groups[item_id][position].name!r}")
+            seen |= 1 << position
+            sku += choice * strides[position]
+        return sku
+
+    def sku(self, name: str) -> int:
+        """Return the SKU id of a name as made by ``name()``."""
+        sku = self._resolved.get(name)
+        if sku is None:
+            item, *options = name.split(", ")
+            sku = self.resolve(item, options)
+            if len(self._resolved) >= NAME_CACHE:
+                self._resolved.clear()
+            self._resolved[name] = sku
+        return sku
+
+    def lookup(self, name: str):
+        """Return the SKU id of ``name``, or None if it is not on the menu."""
+        try:
+            return self.sku(name)
+        except ValueError:
+            return None
+
+    def decode(self, sku: int) -> tuple:
+        """Return ``(item id, choices)`` of ``sku``, one choice per option group."""
+        if not 0 <= sku < len(self.prices):
+            raise ValueError(f"no SKU {sku}")
+        item_id = bisect_right(self.offsets, sku) - 1
+        rest = sku - self.offsets[item_id]
+        choices = []
+        for stride in self.strides[item_id]:
+            choice, rest = divmod(rest, stride)
+            choices.append(choice)
+        return item_id, tuple(choices)
+
+    def name(self, sku: int) -> str:
+        """Return the name of ``sku``, e.g. ``"Mocha Coffee, Large, Oat milk"``."""
+        item_id, choices = self.decode(sku)
+        groups = self.groups[item_id]
+        kind = groups[0].labels[choices[0]]
+        parts = [f"{kind} {self.names[item_id]}" if kind else self.names[item_id]]
+        parts.extend(group.labels[choice]
+                     for group, choice in zip(groups[1:], choices[1:]) if choice)
+        return ", ".join(parts)
+
+    def item(self, sku: int) -> str:
+        """Return the name of the item ``sku`` is a combination of."""
+        return self.names[bisect_right(self.offsets, sku) - 1]
+
+    def price(self, sku: int) -> int:
+        """Return the price of ``sku`` in cents."""
+        return self.prices[sku]
+
+    def category(self, sku: int) -> str:
+        """Return the category of ``sku``."""
+        return self.category_names[self.category_codes[sku]]
+
+    def options(self, item: str) -> tuple:
+        """Return the option groups of ``item``, the type first."""
+        return self.groups[self.item_id(item)]
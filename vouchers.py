@@ -0,0 +1,240 @@
+"""
+Voucher store
+-------------
+
+``cafe_app.VOUCHERS`` is fine for a couple of shop-wide codes, but marketing
+campaigns issue millions of unique, single-use codes.  Loading those into a
+dictionary would cost gigabytes, so they live in an SQLite file instead:
+
+* an on-disk B-tree index (the ``code`` primary key) answers lookups;
+* a Bloom filter, kept in memory and saved next to the codes, rejects most
+  invalid codes without touching the disk (about 2.4 bytes per code, as it
+  is sized with room for the store to double);
+* a small LRU cache keeps the codes used recently;
+* ``redeem`` marks a single-use code as used in one atomic ``UPDATE``, so two
+  tills racing on the same code cannot both get the discount.
+
+Codes are case-insensitive and surrounding spaces are ignored, as in
+``cafe_app.apply_voucher_discount``.
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+HOT_CACHE_SIZE = 4096
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vouchers (
+    code TEXT PRIMARY KEY,
+    percent INTEGER NOT NULL,
+    single_use INTEGER NOT NULL,
+    redeemed_at REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+
+def normalize(code: str) -> str:
+    """Return ``code`` the way it is stored: stripped and upper case."""
+    return code.strip().upper()
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over strings.
+
+    ``might_contain`` never says no for a string that was added, and says yes
+    for a string that was not with probability about ``fp_rate``.
+    """
+
+    def __init__(self, n_bits: int, n_hashes: int, capacity: int, bits: bytes = None):
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.capacity = capacity
+        self.bits = bytearray(bits) if bits is not None else bytearray((n_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float = BLOOM_FALSE_POSITIVE_RATE):
+        """Size a filter for ``capacity`` items at ``fp_rate`` false positives."""
+        capacity = max(capacity, 1)
+        n_bits = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        n_hashes = max(1, round(n_bits / capacity * math.log(2)))
+        return cls(n_bits, n_hashes, capacity)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        header = (self.n_bits.to_bytes(8, "little") + self.n_hashes.to_bytes(4, "little")
+                  + self.capacity.to_bytes(8, "little"))
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        return cls(int.from_bytes(data[:8], "little"), int.from_bytes(data[8:12], "little"),
+                   int.from_bytes(data[12:20], "little"), data[20:])
+
+
+class VoucherStore:
+    """
+    Voucher codes in an SQLite file, with a Bloom filter and a hot cache.
+
+    Parameters
+    ----------
+    path : str
+        The SQLite database file.  It is created if it does not exist.
+    cache_size : int
+        How many recently used codes to keep in memory.
+
+    One store can be shared by all Streamlit sessions; each thread gets its
+    own SQLite connection.
+    """
+
+    def __init__(self, path: str, cache_size: int = HOT_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        db = self._db()
+        db.executescript(SCHEMA)
+        row = db.execute("SELECT value FROM meta WHERE key = 'bloom'").fetchone()
+        self.bloom = BloomFilter.from_bytes(row[0]) if row else None
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def __len__(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM vouchers").fetchone()[0]
+
+    def add_codes(self, codes, percent: int = None, single_use: bool = True) -> None:
+        """
+        Add voucher codes and update the Bloom filter.
+
+        ``codes`` is an iterable of codes (all worth ``percent``) or of
+        ``(code, percent)`` pairs.  Existing codes are replaced.  The filter
+        is extended in place while it has room, and rebuilt with twice the
+        capacity when it runs out.
+        """
+        bloom = self.bloom
+
+        def rows():
+            for entry in codes:
+                code, pct = (entry, percent) if isinstance(entry, str) else entry
+                code = normalize(code)
+                if bloom is not None:
+                    bloom.add(code)
+                yield code, pct, int(single_use)
+
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO vouchers (code, percent, single_use, redeemed_at) "
+                "VALUES (?, ?, ?, NULL)",
+                rows(),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if bloom is not None and len(self) <= bloom.capacity:
+            self._save_bloom()
+        else:
+            self.rebuild_bloom()
+        with self._cache_lock:
+            self._cache.clear()
+
+    def rebuild_bloom(self) -> None:
+        """Rebuild the Bloom filter from every code in the store and save it."""
+        bloom = BloomFilter.for_capacity(2 * len(self))
+        for (code,) in self._db().execute("SELECT code FROM vouchers"):
+            bloom.add(code)
+        self.bloom = bloom
+        self._save_bloom()
+
+    def _save_bloom(self) -> None:
+        self._db().execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bloom', ?)",
+                           (self.bloom.to_bytes(),))
+
+    def lookup(self, code: str):
+        """
+        Return the discount percentage for ``code``, or None if it does not
+        exist.  Single-use codes are returned even once redeemed; use
+        ``redeem`` to claim one.
+        """
+        if not code:
+            return None
+        code = normalize(code)
+        with self._cache_lock:
+            if code in self._cache:
+                self._cache.move_to_end(code)
+                return self._cache[code]
+        if self.bloom is not None and not self.bloom.might_contain(code):
+            return None
+        row = self._db().execute(
+            "SELECT percent FROM vouchers WHERE code = ?", (code,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._cache_lock:
+            self._cache[code] = row[0]
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return row[0]
+
+    def redeem(self, code: str):
+        """
+        Claim ``code`` for one order.
+
+        Returns the discount percentage, or None if the code does not exist or
+        is single-use and has already been redeemed.  Claiming is atomic.
+        """
+        percent = self.lookup(code)
+        if percent is None:
+            return None
+        cursor = self._db().execute(
+            "UPDATE vouchers SET redeemed_at = ? "
+            "WHERE code = ? AND (single_use = 0 OR redeemed_at IS NULL)",
+            (time.time(), normalize(code)),
+        )
+        return percent if cursor.rowcount == 1 else None
+
+    def is_redeemed(self, code: str) -> bool:
+        """Return True if a single-use ``code`` has been used."""
+        row = self._db().execute(
+            "SELECT single_use, redeemed_at FROM vouchers WHERE code = ?", (normalize(code),)
+        ).fetchone()
+        return bool(row and row[0] and row[1] is not None)
+
+
+@lru_cache(maxsize=None)
+def open_store(path: str) -> VoucherStore:
+    """Return the process-wide ``VoucherStore`` for ``path``."""
+    return VoucherStore(path)